@@ -1,38 +1,768 @@
-from typing import Dict, List, Any, Optional
+from typing import Callable, Dict, List, Any, Iterator, Optional, Sequence, Set, Tuple
 import uuid
+from array import array
 from enum import Enum
 from dataclasses import dataclass
+from collections import deque
+from collections.abc import MutableMapping
+from heapq import merge
+from bisect import bisect_left, bisect_right, insort
+from operator import itemgetter
 class ColumnType(Enum):
     BOOLEAN ="boolean"
     INT = "int"
     DOUBLE = "double"
     STRING = "string"
 
+# Value type check per column type; ints are accepted for double columns
+VALUE_VALIDATORS: Dict[ColumnType, Callable[[Any], bool]] = {
+    ColumnType.BOOLEAN: lambda value: isinstance(value, bool),
+    ColumnType.INT: lambda value: isinstance(value, int),
+    ColumnType.DOUBLE: lambda value: isinstance(value, (int, float)),
+    ColumnType.STRING: lambda value: isinstance(value, str),
+}
+
 @dataclass
 class Column:
+    __slots__ = ("name", "type", "index", "validate")
     name:str
     type:ColumnType
+    index: int
+    validate: Callable[[Any], bool]
 
-@dataclass
 class Cell:
-    value:Any
-    is_lookup: bool = False
-    lookup_column: Optional[str] = None
-    lookup_row: Optional[str] = None
-    dependents: List[tuple]  = None
+    """
+    A cell kept as an object: lookup cells, and values a column's typed buffer cannot hold.
+    lookup_key is the cell key of the lookup target, or None for a plain value.
+    source_key shortcuts a lookup cell's chain to the plain (or unwritten) cell at its
+    end; None until it is first resolved.
+    """
+    __slots__ = ("value", "lookup_key", "resolved_value", "source_key")
+
+    def __init__(self, value: Any, lookup_key: Optional[int] = None, resolved_value: Any = None):
+        self.value = value
+        self.lookup_key = lookup_key
+        self.resolved_value = value if lookup_key is None else resolved_value
+        self.source_key: Optional[int] = None
+
+    @property
+    def is_lookup(self) -> bool:
+        return self.lookup_key is not None
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Cell):
+            return NotImplemented
+        return (self.value, self.lookup_key, self.resolved_value) == (other.value, other.lookup_key, other.resolved_value)
+
+    def __repr__(self) -> str:
+        return f"Cell(value={self.value!r}, lookup_key={self.lookup_key!r}, resolved_value={self.resolved_value!r})"
+
+
+# A cell key packs the column index and the row into one int: (column_index << ROW_BITS) | row
+ROW_BITS = 32
+MAX_ROW = (1 << ROW_BITS) - 1
+
+
+def make_cell_key(column_index: int, row: int) -> int:
+    return (column_index << ROW_BITS) | row
+
+
+def split_cell_key(cell_key: int) -> Tuple[int, int]:
+    return cell_key >> ROW_BITS, cell_key & MAX_ROW
+
+
+# Rows per storage block. Blocks are allocated on first write, so sparse rows stay cheap.
+BLOCK_SIZE = 1024
+
+# Rough in-memory size of one side-table cell, one lookup graph entry and one change log entry, for memory accounting
+SPARSE_CELL_BYTES = 238
+GRAPH_ENTRY_BYTES = 120
+CHANGE_ENTRY_BYTES = 80
+
+# Most recent changes each sheet remembers (see Sheet.changes_since)
+CHANGE_LOG_SIZE = 4096
+
+# array typecodes of the typed buffers, also the value layout of sheet files (see
+# Repository/sheet_file.py); string columns keep a plain list per block
+TYPECODES = {
+    ColumnType.INT: "q",
+    ColumnType.DOUBLE: "d",
+    ColumnType.BOOLEAN: "b",
+}
+
+# Value types each column type's typed buffer holds; ColumnStore._to_buffer_value per value
+_BUFFER_TYPES = {
+    ColumnType.INT: {int},
+    ColumnType.DOUBLE: {float},
+    ColumnType.BOOLEAN: {bool},
+    ColumnType.STRING: {str},
+}
+
+
+def buffer_values(column_type: ColumnType, values: Sequence[Any]) -> Optional[Any]:
+    """
+    values in buffer form, as ColumnStore.set_values takes them, or None when any of
+    them has to go to the side table (wrong type, int beyond 64 bits, int in a double
+    column). Checks the types in one pass over the values and the ranges
+    in the array conversion.
+    """
+    value_types = set(map(type, values))
+    if not value_types <= _BUFFER_TYPES[column_type]:
+        return None
+    typecode = TYPECODES.get(column_type)
+    if typecode is None:
+        return list(values)
+    try:
+        buffered = array(typecode, values)
+    except OverflowError:
+        return None
+    return buffered
+
+
+# Set bit positions of each validity bitmap byte value
+_SET_BITS = [tuple(bit for bit in range(8) if byte & (1 << bit)) for byte in range(256)]
+
+
+class ColumnBlock:
+    """BLOCK_SIZE consecutive rows of one column: a typed value buffer and a validity bitmap."""
+    __slots__ = ("values", "validity", "count")
+
+    def __init__(self, column_type: ColumnType):
+        typecode = TYPECODES.get(column_type)
+        self.values = array(typecode, [0]) * BLOCK_SIZE if typecode else [None] * BLOCK_SIZE
+        self.validity = bytearray(BLOCK_SIZE // 8)
+        self.count = 0
+
+    def is_valid(self, index: int) -> bool:
+        return bool(self.validity[index >> 3] & (1 << (index & 7)))
+
+    def set_valid(self, index: int):
+        if not self.is_valid(index):
+            self.validity[index >> 3] |= 1 << (index & 7)
+            self.count += 1
+
+    def set_valid_range(self, start: int, end: int):
+        """Mark the indexes in [start, end) valid, a whole bitmap at a time."""
+        bits = int.from_bytes(self.validity, "little") | (((1 << (end - start)) - 1) << start)
+        self.validity[:] = bits.to_bytes(len(self.validity), "little")
+        self.count = bin(bits).count("1")
+
+    def clear_valid(self, index: int):
+        if self.is_valid(index):
+            self.validity[index >> 3] &= ~(1 << (index & 7))
+            self.count -= 1
+
+    def valid_indexes(self, start: int = 0, end: int = BLOCK_SIZE) -> Iterator[int]:
+        """Yield the set indexes in [start, end), skipping empty bitmap bytes."""
+        for byte_index in range(start >> 3, (end + 7) >> 3):
+            byte = self.validity[byte_index]
+            if byte:
+                for bit in range(8):
+                    if byte & (1 << bit):
+                        index = (byte_index << 3) | bit
+                        if start <= index < end:
+                            yield index
+
+    def nbytes(self) -> int:
+        if isinstance(self.values, array):
+            return len(self.values) * self.values.itemsize + len(self.validity)
+        return len(self.values) * 8 + len(self.validity)
+
+
+class ColumnStore:
+    """
+    Columnar storage for the cells of one column.
+    Plain values live in typed blocks; lookup cells, and values the typed buffer cannot
+    represent exactly (ints outside int64, bools in an int column), live in a sparse
+    side table of Cell objects.
+    Sorted indexes of the block ids and side-table rows let row ranges be read
+    without touching the rest of the column.
+    """
+
+    def __init__(self, column_type: ColumnType):
+        self.type = column_type
+        self.blocks: Dict[int, ColumnBlock] = {}
+        self.sparse: Dict[int, Cell] = {}
+        self._block_ids: List[int] = []
+        self._sparse_rows: List[int] = []
+
+    @classmethod
+    def from_parts(cls, column_type: ColumnType, blocks: Dict[int, ColumnBlock], sparse: Dict[int, Cell]) -> "ColumnStore":
+        """Build a store around already filled blocks and side-table cells, e.g. when loading from disk."""
+        store = cls(column_type)
+        store.blocks = blocks
+        store.sparse = sparse
+        store._block_ids = sorted(blocks)
+        store._sparse_rows = sorted(sparse)
+        return store
+
+    def set_value(self, row: int, value: Any):
+        block_id, index = divmod(row, BLOCK_SIZE)
+        buffered = self._to_buffer_value(value)
+        if buffered is None:
+            self._clear_buffer(block_id, index)
+            self._set_sparse(row, Cell(value=value))
+            return
+
+        block = self.blocks.get(block_id)
+        if block is None:
+            block = self.blocks[block_id] = ColumnBlock(self.type)
+            insort(self._block_ids, block_id)
+        block.values[index] = buffered
+        block.set_valid(index)
+        self._remove_sparse(row)
+
+    def set_values(self, start_row: int, values: Any):
+        """
+        Set consecutive rows from start_row, a block slice at a time. values must already
+        be in buffer form: an array of the column's typecode, or a list of strings for a
+        string column. Other sequences are set row by row.
+        """
+        typecode = TYPECODES.get(self.type)
+        if typecode is not None and not (isinstance(values, array) and values.typecode == typecode):
+            for row, value in zip(range(start_row, start_row + len(values)), values):
+                self.set_value(row, value)
+            return
+
+        position = 0
+        while position < len(values):
+            row = start_row + position
+            block_id, index = divmod(row, BLOCK_SIZE)
+            count = min(BLOCK_SIZE - index, len(values) - position)
+            block = self.blocks.get(block_id)
+            if block is None:
+                block = self.blocks[block_id] = ColumnBlock(self.type)
+                insort(self._block_ids, block_id)
+            block.values[index:index + count] = values[position:position + count]
+            block.set_valid_range(index, index + count)
+            first = bisect_left(self._sparse_rows, row)
+            last = bisect_left(self._sparse_rows, row + count)
+            if first < last:
+                for sparse_row in self._sparse_rows[first:last]:
+                    del self.sparse[sparse_row]
+                del self._sparse_rows[first:last]
+            position += count
+
+    def set_cell(self, row: int, cell: Cell):
+        self._clear_buffer(*divmod(row, BLOCK_SIZE))
+        self._set_sparse(row, cell)
+
+    def remove(self, row: int):
+        self._clear_buffer(*divmod(row, BLOCK_SIZE))
+        self._remove_sparse(row)
+
+    def get_cell(self, row: int) -> Optional[Cell]:
+        found, value = self._get_buffered(row)
+        if found:
+            return Cell(value=value)
+        return self.sparse.get(row)
+
+    def get_lookup_cell(self, row: int) -> Optional[Cell]:
+        cell = self.sparse.get(row)
+        return cell if cell is not None and cell.is_lookup else None
+
+    def get_resolved_value(self, row: int) -> Any:
+        found, value = self._get_buffered(row)
+        if found:
+            return value
+        cell = self.sparse.get(row)
+        return cell.resolved_value if cell is not None else None
+
+    def __contains__(self, row: int) -> bool:
+        return self._get_buffered(row)[0] or row in self.sparse
+
+    def __len__(self) -> int:
+        return sum(block.count for block in self.blocks.values()) + len(self.sparse)
+
+    def rows(self, start_row: int = 0, end_row: Optional[int] = None) -> Iterator[int]:
+        """Yield the rows holding a cell, in order, from start_row up to and including end_row."""
+        first = bisect_left(self._sparse_rows, start_row)
+        last = len(self._sparse_rows) if end_row is None else bisect_left(self._sparse_rows, end_row + 1)
+        sparse_rows = self._sparse_rows[first:last]
+        return merge(self._buffered_rows(start_row, end_row), sparse_rows)
+
+    def items(self, start_row: int = 0, end_row: Optional[int] = None) -> Iterator[Tuple[int, Any]]:
+        """Yield (row, resolved value) in row order, from start_row up to and including end_row."""
+        for row in self.rows(start_row, end_row):
+            yield row, self.get_resolved_value(row)
+
+    def item_list(self, start_row: int = 0, end_row: Optional[int] = None) -> List[Tuple[int, Any]]:
+        """
+        The (row, resolved value) pairs of items() as a list, read a whole block at a time
+        rather than row by row; much faster for whole columns and wide row ranges.
+        """
+        last_row = MAX_ROW if end_row is None else end_row
+        items = []
+        for block_id in self._block_ids[bisect_left(self._block_ids, start_row // BLOCK_SIZE):]:
+            base = block_id * BLOCK_SIZE
+            if base > last_row:
+                break
+            block = self.blocks[block_id]
+            values = block.values.tolist() if isinstance(block.values, array) else block.values
+            if self.type == ColumnType.BOOLEAN:
+                values = [bool(value) for value in values]
+            if block.count == BLOCK_SIZE:
+                block_items = list(zip(range(base, base + BLOCK_SIZE), values))
+            else:
+                indexes = [
+                    offset + bit
+                    for offset, byte in zip(range(0, BLOCK_SIZE, 8), block.validity) if byte
+                    for bit in _SET_BITS[byte]
+                ]
+                block_items = [(base + index, values[index]) for index in indexes]
+            if base < start_row or base + BLOCK_SIZE > last_row + 1:
+                block_items = [item for item in block_items if start_row <= item[0] <= last_row]
+            items.extend(block_items)
+
+        sparse_rows = self._sparse_rows[bisect_left(self._sparse_rows, start_row):bisect_right(self._sparse_rows, last_row)]
+        if sparse_rows:
+            items.extend((row, self.sparse[row].resolved_value) for row in sparse_rows)
+            items.sort(key=itemgetter(0))
+        return items
+
+    def sparse_items(self, start_row: int = 0, end_row: Optional[int] = None) -> List[Tuple[int, Cell]]:
+        """(row, cell) of the side-table cells from start_row up to and including end_row, in row order."""
+        last = len(self._sparse_rows) if end_row is None else bisect_right(self._sparse_rows, end_row)
+        return [(row, self.sparse[row]) for row in self._sparse_rows[bisect_left(self._sparse_rows, start_row):last]]
+
+    def last_row(self) -> int:
+        """The highest row holding a cell, or 0 when the column is empty."""
+        last_row = self._sparse_rows[-1] if self._sparse_rows else 0
+        for block_id in reversed(self._block_ids):
+            block = self.blocks[block_id]
+            if block.count:
+                bits = int.from_bytes(block.validity, "little")
+                return max(last_row, block_id * BLOCK_SIZE + bits.bit_length() - 1)
+        return last_row
+
+    def raw_items(self) -> Iterator[Tuple[int, Any, Optional[int]]]:
+        """Yield (row, value as written, lookup target key or None) in row order."""
+        for row in self.rows():
+            found, value = self._get_buffered(row)
+            if found:
+                yield row, value, None
+                continue
+            cell = self.sparse.get(row)
+            if cell is not None:
+                yield row, cell.value, cell.lookup_key
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the store; every block of a column has the same size."""
+        block_bytes = 0
+        for block in self.blocks.values():
+            block_bytes = block.nbytes()
+            break
+        return len(self.blocks) * block_bytes + len(self.sparse) * SPARSE_CELL_BYTES
+
+    def _buffered_rows(self, start_row: int = 0, end_row: Optional[int] = None) -> Iterator[int]:
+        first_block_id = start_row // BLOCK_SIZE
+        last_block_id = None if end_row is None else end_row // BLOCK_SIZE
+        # walk a snapshot so blocks created or dropped while iterating are tolerated
+        block_ids = self._block_ids[bisect_left(self._block_ids, first_block_id):]
+        for block_id in block_ids:
+            if last_block_id is not None and block_id > last_block_id:
+                return
+            block = self.blocks.get(block_id)
+            if block is None:
+                continue
+            base = block_id * BLOCK_SIZE
+            start = max(start_row - base, 0)
+            end = BLOCK_SIZE if end_row is None else min(end_row - base + 1, BLOCK_SIZE)
+            for index in block.valid_indexes(start, end):
+                yield base + index
+
+    def _get_buffered(self, row: int) -> Tuple[bool, Any]:
+        block_id, index = divmod(row, BLOCK_SIZE)
+        block = self.blocks.get(block_id)
+        if block is None or not block.is_valid(index):
+            return False, None
+        value = block.values[index]
+        if self.type == ColumnType.BOOLEAN:
+            return True, bool(value)
+        return True, value
+
+    def _to_buffer_value(self, value: Any) -> Any:
+        """Return the value as stored in the typed buffer, or None when it has to go to the side table."""
+        if self.type == ColumnType.INT:
+            if type(value) is not int or not -2 ** 63 <= value < 2 ** 63:
+                return None
+            return value
+        if self.type == ColumnType.DOUBLE:
+            # ints stay in the side table, so they read back as the ints written
+            return value if type(value) is float else None
+        if self.type == ColumnType.BOOLEAN:
+            return int(value) if type(value) is bool else None
+        return value if isinstance(value, str) else None
+
+    def _clear_buffer(self, block_id: int, index: int):
+        block = self.blocks.get(block_id)
+        if block is None:
+            return
+        block.clear_valid(index)
+        if block.count == 0:
+            del self.blocks[block_id]
+            del self._block_ids[bisect_left(self._block_ids, block_id)]
+
+    def _set_sparse(self, row: int, cell: Cell):
+        if row not in self.sparse:
+            insort(self._sparse_rows, row)
+        self.sparse[row] = cell
+
+    def _remove_sparse(self, row: int):
+        if self.sparse.pop(row, None) is not None:
+            del self._sparse_rows[bisect_left(self._sparse_rows, row)]
+
+
+class SheetCells(MutableMapping):
+    """Dict-style view of a sheet's cells keyed by cell key."""
+
+    def __init__(self, sheet: "Sheet"):
+        self._sheet = sheet
+
+    def __getitem__(self, cell_key: int) -> Cell:
+        cell = self._sheet.get_cell(cell_key)
+        if cell is None:
+            raise KeyError(cell_key)
+        return cell
+
+    def __setitem__(self, cell_key: int, cell: Cell):
+        if cell.is_lookup:
+            self._sheet.set_lookup_cell(cell_key, cell)
+        else:
+            self._sheet.set_value(cell_key, cell.value)
+
+    def __delitem__(self, cell_key: int):
+        if not self._sheet.has_cell(cell_key):
+            raise KeyError(cell_key)
+        self._sheet.remove_cell(cell_key)
+
+    def __contains__(self, cell_key) -> bool:
+        return self._sheet.has_cell(cell_key)
+
+    def __iter__(self) -> Iterator[int]:
+        for column_index, store in self._sheet.column_stores.items():
+            for row in store.rows():
+                yield make_cell_key(column_index, row)
+
+    def __len__(self) -> int:
+        return sum(len(store) for store in self._sheet.column_stores.values())
 
-    def __post_init__(self):
-        if self.dependents is None:
-            self.dependents = []
 
 class Sheet:
-    def __init__(self, columns: List[Dict[str, str]]):
-        self.id = str(uuid.uuid4())
+    def __init__(self, columns: List[Dict[str, str]], sheet_id: Optional[str] = None):
+        self.id = sheet_id or str(uuid.uuid4())
         self.columns = columns
-        self.cells = {}
-    
+        self._column_index: Dict[str, Column] = {}
+        # len(self.columns) when the index was last built
+        self._indexed_columns = 0
+        # one columnar store per column index, created on its first write
+        self.column_stores: Dict[int, ColumnStore] = {}
+        # reverse lookup edges: the cells that look up a given cell (written or not yet),
+        # kept as insertion-ordered sets; the forward edge is each lookup cell's lookup_key
+        self.dependents: Dict[int, Dict[int, None]] = {}
+        # lookup targets always sit before the cells that look them up
+        self.topological_order: Dict[int, int] = {}
+        self.lowest_order = 0
+        self.highest_order = 0
+        # keys written since the last save; only tracked once a repository that logs changes sets it
+        self.dirty_keys: Optional[Set[int]] = None
+        # bumped by every change; version_epoch tells this in-memory copy apart from
+        # any other copy of the sheet (e.g. one loaded again after a restart or a spill)
+        self.version = 0
+        self.version_epoch = uuid.uuid4().hex
+        # (version, cell key) of the last CHANGE_LOG_SIZE changes, oldest first
+        self.change_log: deque = deque(maxlen=CHANGE_LOG_SIZE)
+
     def get_id(self) -> str:
         return self.id
-    
+
     def get_columns(self) -> List[Dict[str, str]]:
-        return self.columns
\ No newline at end of file
+        return self.columns
+
+    @property
+    def cells(self) -> SheetCells:
+        return SheetCells(self)
+
+    def get_column(self, column: str) -> Optional[Column]:
+        """Look a column up by name in O(1); the index is rebuilt if columns were added since.
+
+        When two columns share a name, the first one is returned.
+        """
+        column_def = self._column_index.get(column)
+        if column_def is None and self._indexed_columns != len(self.columns):
+            self._build_column_index()
+            column_def = self._column_index.get(column)
+        return column_def
+
+    def column_index(self, column: str) -> int:
+        column_def = self.get_column(column)
+        if column_def is None:
+            raise KeyError(column)
+        return column_def.index
+
+    def column_name(self, column_index: int) -> str:
+        return self.columns[column_index]["name"]
+
+    def cell_key(self, column: str, row: int) -> int:
+        return make_cell_key(self.column_index(column), row)
+
+    def get_cell(self, cell_key: int) -> Optional[Cell]:
+        column_index, row = split_cell_key(cell_key)
+        store = self.column_stores.get(column_index)
+        return store.get_cell(row) if store is not None else None
+
+    def get_lookup_cell(self, cell_key: int) -> Optional[Cell]:
+        column_index, row = split_cell_key(cell_key)
+        store = self.column_stores.get(column_index)
+        return store.get_lookup_cell(row) if store is not None else None
+
+    def get_resolved_value(self, cell_key: int) -> Any:
+        column_index, row = split_cell_key(cell_key)
+        store = self.column_stores.get(column_index)
+        return store.get_resolved_value(row) if store is not None else None
+
+    def has_cell(self, cell_key: int) -> bool:
+        column_index, row = split_cell_key(cell_key)
+        store = self.column_stores.get(column_index)
+        return store is not None and row in store
+
+    def set_value(self, cell_key: int, value: Any):
+        column_index, row = split_cell_key(cell_key)
+        self._get_or_create_store(column_index).set_value(row, value)
+        self.record_change(cell_key)
+        if self.dirty_keys is not None:
+            self.dirty_keys.add(cell_key)
+
+    def set_lookup_cell(self, cell_key: int, cell: Cell):
+        column_index, row = split_cell_key(cell_key)
+        self._get_or_create_store(column_index).set_cell(row, cell)
+        self.record_change(cell_key)
+        if self.dirty_keys is not None:
+            self.dirty_keys.add(cell_key)
+
+    def set_values(self, column_index: int, start_row: int, values: Any):
+        """set_value for consecutive rows of one column from start_row; see ColumnStore.set_values."""
+        self._get_or_create_store(column_index).set_values(start_row, values)
+        first_key = make_cell_key(column_index, start_row)
+        cell_keys = range(first_key, first_key + len(values))
+        self.record_changes(cell_keys)
+        if self.dirty_keys is not None:
+            self.dirty_keys.update(cell_keys)
+
+    def remove_cell(self, cell_key: int):
+        column_index, row = split_cell_key(cell_key)
+        store = self.column_stores.get(column_index)
+        if store is not None:
+            store.remove(row)
+        self.record_change(cell_key)
+        if self.dirty_keys is not None:
+            self.dirty_keys.add(cell_key)
+
+    @property
+    def version_token(self) -> str:
+        """The version as an opaque token that is only ever valid for this in-memory copy."""
+        return f"{self.version_epoch}-{self.version}"
+
+    def record_change(self, cell_key: int):
+        """
+        Bump the version and log the cell as changed. The writes above call it; callers
+        that change a lookup cell's resolved value in place call it themselves.
+        """
+        self.version += 1
+        self.change_log.append((self.version, cell_key))
+
+    def record_changes(self, cell_keys: Sequence[int]):
+        """record_change for many cells; only the changes the log can hold are appended."""
+        logged = cell_keys[-CHANGE_LOG_SIZE:]
+        self.change_log.extend(zip(range(self.version + len(cell_keys) - len(logged) + 1, self.version + len(cell_keys) + 1), logged))
+        self.version += len(cell_keys)
+
+    def last_row(self) -> int:
+        """The highest row holding a cell in any column, or 0 for an empty sheet."""
+        return max((store.last_row() for store in self.column_stores.values()), default=0)
+
+    def changes_since(self, version: int) -> Optional[List[int]]:
+        """
+        Cell keys changed after version, in cell key order, or None when the change log
+        no longer reaches back that far.
+        """
+        log = self.change_log
+        if version > self.version:
+            return None
+        if len(log) == log.maxlen and version < log[0][0] - 1:
+            return None
+        changed = set()
+        for change_version, cell_key in reversed(log):
+            if change_version <= version:
+                break
+            changed.add(cell_key)
+        return sorted(changed)
+
+    def get_raw_cell(self, cell_key: int) -> Optional[Tuple[Any, Optional[int]]]:
+        """Return (value as written, lookup target key or None), or None if the cell is empty."""
+        cell = self.get_cell(cell_key)
+        return (cell.value, cell.lookup_key) if cell is not None else None
+
+    def iter_cells(self, start_key: int = 0) -> Iterator[Tuple[str, int, Any]]:
+        """
+        Yield (column, row, resolved value) for every cell, column by column in row order,
+        starting at the cell key start_key.
+        """
+        start_column_index, start_row = split_cell_key(start_key)
+        for column_index in range(start_column_index, len(self.columns)):
+            store = self.column_stores.get(column_index)
+            if store is None:
+                continue
+            column_name = self.columns[column_index]["name"]
+            for row, value in store.items(start_row if column_index == start_column_index else 0):
+                yield column_name, row, value
+
+    def iter_range(self, columns: List[str], start_row: int, end_row: int) -> Iterator[Tuple[str, int, Any]]:
+        """
+        Yield (column, row, resolved value) for the cells of the given columns whose row
+        lies in [start_row, end_row], column by column in row order.
+        """
+        for column in columns:
+            store = self.column_stores.get(self.column_index(column))
+            if store is None:
+                continue
+            for row, value in store.items(start_row, end_row):
+                yield column, row, value
+
+    def column_items(self, columns: Optional[List[str]] = None, start_row: int = 0,
+                     end_row: Optional[int] = None) -> Iterator[Tuple[str, List[Tuple[int, Any]]]]:
+        """
+        Yield (column, [(row, resolved value), ...]) for each of the given columns (all
+        columns when None) that holds cells, limited to rows in [start_row, end_row].
+        Same cells and order as iter_cells / iter_range, read via ColumnStore.item_list.
+        """
+        if columns is None:
+            column_indexes = range(len(self.columns))
+        else:
+            column_indexes = [self.column_index(column) for column in columns]
+        for column_index in column_indexes:
+            store = self.column_stores.get(column_index)
+            if store is not None:
+                yield self.columns[column_index]["name"], store.item_list(start_row, end_row)
+
+    def add_dependency(self, target_key: int, dependent_key: int):
+        """Record that dependent_key looks up target_key; the target need not have been written."""
+        self.dependents.setdefault(target_key, {})[dependent_key] = None
+
+    def remove_dependency(self, target_key: int, dependent_key: int):
+        dependents = self.dependents.get(target_key)
+        if dependents is None:
+            return
+        dependents.pop(dependent_key, None)
+        if not dependents:
+            del self.dependents[target_key]
+
+    def get_lookup_target(self, cell_key: int) -> Optional[int]:
+        cell = self.get_lookup_cell(cell_key)
+        return cell.lookup_key if cell is not None else None
+
+    def lookup_source(self, cell_key: int) -> int:
+        """
+        The key of the cell at the end of cell_key's lookup chain (cell_key itself for a
+        plain cell). Follows source_key shortcuts and points every lookup cell walked
+        straight at the source (path compression), so the next call takes one hop.
+        Writes keep the shortcuts of a rewritten link's dependents up to date.
+        """
+        cell = self.get_lookup_cell(cell_key)
+        if cell is None:
+            return cell_key
+        source_key = cell_key
+        while cell is not None:
+            source_key = cell.source_key if cell.source_key is not None else cell.lookup_key
+            cell = self.get_lookup_cell(source_key)
+
+        # a second walk rather than a list of the walked cells keeps long chains in constant memory
+        cell = self.get_lookup_cell(cell_key)
+        while cell is not None:
+            next_key = cell.source_key if cell.source_key is not None else cell.lookup_key
+            cell.source_key = source_key
+            cell = self.get_lookup_cell(next_key)
+        return source_key
+
+    def transitive_dependents(self, cell_key: int) -> List[int]:
+        """Every cell whose resolved value comes from cell_key through a lookup chain, nearest first."""
+        found: List[int] = []
+        seen = {cell_key}
+        queue = deque([cell_key])
+        while queue:
+            for dependent_key in self.dependents.get(queue.popleft(), ()):
+                if dependent_key not in seen:
+                    seen.add(dependent_key)
+                    found.append(dependent_key)
+                    queue.append(dependent_key)
+        return found
+
+    def iter_raw_cells(self) -> Iterator[Tuple[int, Any, Optional[int]]]:
+        """Yield (cell key, value as written, lookup target key or None) for every cell."""
+        for column_index, store in list(self.column_stores.items()):
+            for row, value, lookup_key in store.raw_items():
+                yield make_cell_key(column_index, row), value, lookup_key
+
+    def rebuild_lookups(self):
+        """
+        Recompute dependents, topological order and resolved values from the lookup
+        cells alone, e.g. after the cells were loaded from disk.
+        """
+        lookup_targets = {
+            make_cell_key(column_index, row): cell.lookup_key
+            for column_index, store in self.column_stores.items()
+            for row, cell in store.sparse.items()
+            if cell.is_lookup
+        }
+
+        self.dependents = {}
+        for cell_key, target_key in lookup_targets.items():
+            self.add_dependency(target_key, cell_key)
+
+        # depth = length of the lookup chain below a cell; targets are always shallower
+        depths: Dict[int, int] = {}
+        for start_key in lookup_targets:
+            chain = []
+            cell_key = start_key
+            while cell_key in lookup_targets and cell_key not in depths:
+                chain.append(cell_key)
+                cell_key = lookup_targets[cell_key]
+            depth = depths.get(cell_key, 0)
+            for chained_key in reversed(chain):
+                depth += 1
+                depths[chained_key] = depth
+
+        nodes = set(lookup_targets) | set(lookup_targets.values())
+        self.topological_order = {
+            cell_key: order for order, cell_key in enumerate(sorted(nodes, key=lambda key: depths.get(key, 0)))
+        }
+        self.lowest_order = 0
+        self.highest_order = max(len(nodes) - 1, 0)
+
+        for cell_key in sorted(lookup_targets, key=depths.__getitem__):
+            target_key = lookup_targets[cell_key]
+            cell = self.get_lookup_cell(cell_key)
+            cell.resolved_value = self.get_resolved_value(target_key)
+            target = self.get_lookup_cell(target_key)
+            cell.source_key = target.source_key if target is not None else target_key
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the sheet; columns still on disk are not counted."""
+        # dict.values skips column stores that are only loaded lazily
+        store_bytes = sum(store.nbytes() for store in dict.values(self.column_stores))
+        graph_bytes = (len(self.topological_order) + len(self.dependents)) * GRAPH_ENTRY_BYTES
+        return store_bytes + graph_bytes + len(self.change_log) * CHANGE_ENTRY_BYTES
+
+    def _build_column_index(self):
+        self._column_index = {}
+        for index, col in enumerate(self.columns):
+            column_type = ColumnType(col["type"])
+            self._column_index.setdefault(col["name"], Column(col["name"], column_type, index, VALUE_VALIDATORS[column_type]))
+        self._indexed_columns = len(self.columns)
+
+    def _get_or_create_store(self, column_index: int) -> ColumnStore:
+        store = self.column_stores.get(column_index)
+        if store is None:
+            column_type = ColumnType(self.columns[column_index]["type"])
+            store = self.column_stores[column_index] = ColumnStore(column_type)
+        return store
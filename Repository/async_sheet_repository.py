@@ -0,0 +1,90 @@
+import asyncio
+import functools
+from concurrent.futures import Executor
+from typing import Optional, Protocol
+from Models.sheet import Sheet
+from Repository.sheet_repository import SheetRepository
+from Repository.durable_sheet_repository import DurableSheetRepository
+
+
+class AsyncSheetRepository(Protocol):
+    """What the async services need from storage; a remote or persistent backend implements it natively."""
+
+    async def save(self, sheet: Sheet) -> str:
+        ...
+
+    async def get_by_id(self, sheet_id: str) -> Optional[Sheet]:
+        ...
+
+    async def exists(self, sheet_id: str) -> bool:
+        ...
+
+    async def delete(self, sheet_id: str) -> bool:
+        ...
+
+    async def get_all_ids(self) -> list:
+        ...
+
+
+class AsyncSheetRepositoryAdapter:
+    """
+    AsyncSheetRepository over a sync repository. Calls run inline when blocking is
+    False (the repository only touches memory), otherwise in the executor.
+    """
+
+    def __init__(self, repository: SheetRepository, blocking: bool = True, executor: Optional[Executor] = None):
+        self.repository = repository
+        self.blocking = blocking
+        self.executor = executor
+
+    async def save(self, sheet: Sheet) -> str:
+        return await self._call(self.repository.save, sheet)
+
+    async def get_by_id(self, sheet_id: str) -> Optional[Sheet]:
+        return await self._call(self.repository.get_by_id, sheet_id)
+
+    async def exists(self, sheet_id: str) -> bool:
+        return await self._call(self.repository.exists, sheet_id)
+
+    async def delete(self, sheet_id: str) -> bool:
+        return await self._call(self.repository.delete, sheet_id)
+
+    async def get_all_ids(self) -> list:
+        return await self._call(self.repository.get_all_ids)
+
+    async def _call(self, method, *args):
+        if not self.blocking:
+            return method(*args)
+        return await asyncio.get_running_loop().run_in_executor(self.executor, functools.partial(method, *args))
+
+
+class AsyncDurableSheetRepository(AsyncSheetRepositoryAdapter):
+    """
+    DurableSheetRepository awaited natively: saves and deletes wait for their group
+    commit on the event loop, so no thread is parked per pending write.
+    """
+
+    def __init__(self, repository: DurableSheetRepository, executor: Optional[Executor] = None):
+        super().__init__(repository, blocking=True, executor=executor)
+
+    async def save(self, sheet: Sheet) -> str:
+        return await self.repository.save_async(sheet)
+
+    async def get_by_id(self, sheet_id: str) -> Optional[Sheet]:
+        return await self.repository.get_by_id_async(sheet_id, self.executor)
+
+    async def exists(self, sheet_id: str) -> bool:
+        return self.repository.exists(sheet_id)
+
+    async def delete(self, sheet_id: str) -> bool:
+        return await self.repository.delete_async(sheet_id)
+
+    async def get_all_ids(self) -> list:
+        return self.repository.get_all_ids()
+
+
+def make_async_repository(repository: SheetRepository, executor: Optional[Executor] = None) -> AsyncSheetRepository:
+    """Wrap a sync repository for the async services; only disk-backed ones use the executor."""
+    if isinstance(repository, DurableSheetRepository):
+        return AsyncDurableSheetRepository(repository, executor=executor)
+    return AsyncSheetRepositoryAdapter(repository, blocking=type(repository) is not SheetRepository, executor=executor)
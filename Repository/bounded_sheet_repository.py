@@ -0,0 +1,145 @@
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Set
+from Models.sheet import Sheet
+from Repository.sheet_repository import SheetRepository
+from Repository.sheet_file import open_sheet_file, write_sheet_file
+from locks import SheetLocks, sheet_locks as default_sheet_locks
+
+_SPILL_FILE_SUFFIX = ".sheet"
+
+
+class BoundedSheetRepository(SheetRepository):
+    """
+    In-memory sheet repository with a capacity bound.
+
+    Sheets are kept in least-recently-used order. Once more than max_sheets sheets, or
+    more than max_bytes of them (see Sheet.nbytes), are in memory, the least recently
+    used ones are written to spill_dir as sheet files and dropped. get_by_id maps a
+    spilled sheet back in transparently; its columns are read as they are touched.
+    The most recently used sheet is never evicted, nor is a sheet whose lock a request
+    holds: it stays in memory until a later eviction finds it free.
+
+    hits, misses and evictions count in-memory lookups, reloads from the spill store
+    and sheets spilled.
+    """
+
+    def __init__(self, spill_dir: Optional[str] = None, max_sheets: Optional[int] = None,
+                 max_bytes: Optional[int] = None, sheet_locks: Optional[SheetLocks] = None):
+        super().__init__()
+        self.sheet_locks = sheet_locks or default_sheet_locks
+        self._sheets: "OrderedDict[str, Sheet]" = OrderedDict()
+        self.spill_dir = spill_dir or tempfile.mkdtemp(prefix="sheet-spill-")
+        self.max_sheets = max_sheets
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.RLock()
+        self._spilled: Set[str] = set()
+        self._sizes: Dict[str, int] = {}
+        self._bytes = 0
+
+        # the spill store only lives as long as the repository
+        os.makedirs(self.spill_dir, exist_ok=True)
+        for name in os.listdir(self.spill_dir):
+            if name.endswith(_SPILL_FILE_SUFFIX) or name.endswith(_SPILL_FILE_SUFFIX + ".tmp"):
+                os.remove(os.path.join(self.spill_dir, name))
+
+    def save(self, sheet: Sheet) -> str:
+        with self._lock:
+            self._sheets[sheet.id] = sheet
+            self._sheets.move_to_end(sheet.id)
+            self._spilled.discard(sheet.id)
+            self._update_size(sheet)
+            self._evict()
+        return sheet.id
+
+    def get_by_id(self, sheet_id: str) -> Optional[Sheet]:
+        with self._lock:
+            sheet = self._sheets.get(sheet_id)
+            if sheet is not None:
+                self.hits += 1
+                self._sheets.move_to_end(sheet_id)
+                # columns read since the last access count towards the bound from now on
+                self._update_size(sheet)
+                self._evict()
+                return sheet
+
+            if sheet_id not in self._spilled:
+                return None
+            self.misses += 1
+            sheet = open_sheet_file(self._spill_path(sheet_id))
+            self._spilled.discard(sheet_id)
+            self._sheets[sheet_id] = sheet
+            self._update_size(sheet)
+            self._evict()
+            return sheet
+
+    def exists(self, sheet_id: str) -> bool:
+        return sheet_id in self._sheets or sheet_id in self._spilled
+
+    def delete(self, sheet_id: str) -> bool:
+        with self._lock:
+            in_memory = self._sheets.pop(sheet_id, None) is not None
+            spilled = sheet_id in self._spilled
+            self._spilled.discard(sheet_id)
+            self._bytes -= self._sizes.pop(sheet_id, 0)
+            if os.path.exists(self._spill_path(sheet_id)):
+                os.remove(self._spill_path(sheet_id))
+        return in_memory or spilled
+
+    def get_all_ids(self) -> list:
+        with self._lock:
+            return list(self._sheets.keys()) + list(self._spilled)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "sheets_in_memory": len(self._sheets),
+                "sheets_spilled": len(self._spilled),
+                "bytes_in_memory": self._bytes,
+            }
+
+    def _update_size(self, sheet: Sheet):
+        size = sheet.nbytes()
+        self._bytes += size - self._sizes.get(sheet.id, 0)
+        self._sizes[sheet.id] = size
+
+    def _over_capacity(self) -> bool:
+        if self.max_sheets is not None and len(self._sheets) > self.max_sheets:
+            return True
+        return self.max_bytes is not None and self._bytes > self.max_bytes
+
+    def _evict(self):
+        """
+        Spill least recently used sheets until back within the bounds. Each is written and
+        dropped under its write lock, so no request is reading or changing it meanwhile.
+        A sheet whose lock is taken is skipped rather than waited for: its holder may be
+        waiting for _lock.
+        """
+        if not self._over_capacity():
+            return
+        for sheet_id in list(self._sheets)[:-1]:
+            lock = self.sheet_locks.get(sheet_id)
+            if not lock.try_acquire_write():
+                continue
+            try:
+                write_sheet_file(self._sheets[sheet_id], self._spill_path(sheet_id), durable=False)
+                del self._sheets[sheet_id]
+                self._spilled.add(sheet_id)
+                self._bytes -= self._sizes.pop(sheet_id, 0)
+                self.evictions += 1
+            finally:
+                lock.release_write()
+            if not self._over_capacity():
+                return
+
+    def _spill_path(self, sheet_id: str) -> str:
+        return os.path.join(self.spill_dir, sheet_id + _SPILL_FILE_SUFFIX)
@@ -0,0 +1,424 @@
+import asyncio
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import Executor
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from Models.sheet import Cell, Sheet
+from Repository.sheet_repository import SheetRepository
+from Repository.sheet_file import open_sheet_file, write_sheet_file
+from locks import SheetLocks, resolve_future, sheet_locks as default_sheet_locks
+
+# Cells per record when a whole new sheet is logged
+CELLS_PER_RECORD = 10000
+
+_SEGMENT_PATTERN = re.compile(r"^wal-(\d+)\.log$")
+_SHEET_FILE_SUFFIX = ".sheet"
+
+
+class DurableSheetRepository(SheetRepository):
+    """
+    Sheet repository that survives restarts.
+
+    Every save appends the cells written since the previous save to a write-ahead log.
+    A background thread commits the log: it waits up to commit_interval for more
+    records, then writes and fsyncs them together, so concurrent writers share one
+    fsync (group commit). save returns once its record is durable; save_async and
+    delete_async wait for the commit on the event loop instead of in a thread, and
+    get_by_id_async maps sheet files in on an executor.
+
+    After snapshot_every records the log is rotated and every sheet changed since the
+    last snapshot is written to its own binary sheet file (see sheet_file), under the
+    sheet's read lock so no write changes it midway; the checkpoint file then records
+    the first segment still needed and older segments are deleted. Recovery only lists the sheet files: a sheet is mapped on its first
+    get_by_id, and only the columns it touches are read. The log segments after the
+    checkpoint are replayed on top, and the sheets they touch get their lookup graph
+    rebuilt.
+
+    Records are JSON lines:
+      {"op": "create", "sheet_id": ..., "columns": [...]}
+      {"op": "cells", "sheet_id": ..., "cells": [[key, value, lookup_key], [key], ...]}
+      {"op": "delete", "sheet_id": ...}
+    A cell entry with only a key removes the cell.
+    """
+
+    def __init__(self, data_dir: str, commit_interval: float = 0.002, snapshot_every: int = 100000,
+                 sheet_locks: Optional[SheetLocks] = None):
+        super().__init__()
+        self.data_dir = data_dir
+        self.sheet_locks = sheet_locks or default_sheet_locks
+        self.commit_interval = commit_interval
+        self.snapshot_every = snapshot_every
+        self.commit_count = 0
+
+        self._lock = threading.Lock()
+        # held while the log file is written or swapped; always taken after _lock, never before
+        self._wal_lock = threading.Lock()
+        self._committed = threading.Condition(self._lock)
+        self._pending: List[str] = []
+        self._appended_seq = 0
+        self._committed_seq = 0
+        # (seq, loop, future) of coroutines waiting for a commit
+        self._commit_waiters: List[Tuple[int, asyncio.AbstractEventLoop, asyncio.Future]] = []
+        self._records_since_snapshot = 0
+        self._snapshot_thread: Optional[threading.Thread] = None
+        self._closed = False
+        # ids of sheets whose file has not been opened yet
+        self._on_disk: Set[str] = set()
+        # ids of sheets to write, and files to remove, at the next snapshot
+        self._changed_ids: Set[str] = set()
+        self._deleted_ids: Set[str] = set()
+
+        self.sheets_dir = os.path.join(data_dir, "sheets")
+        os.makedirs(self.sheets_dir, exist_ok=True)
+        self._segment = self._recover() + 1
+        self._wal = open(self._segment_path(self._segment), "a", encoding="utf-8")
+
+        self._committer = threading.Thread(target=self._commit_loop, daemon=True)
+        self._committer.start()
+
+    def save(self, sheet: Sheet) -> str:
+        self._wait_for_commit(self._append(self._save_records(sheet), changed_id=sheet.id))
+        return sheet.id
+
+    async def save_async(self, sheet: Sheet) -> str:
+        await self._wait_for_commit_async(self._append(self._save_records(sheet), changed_id=sheet.id))
+        return sheet.id
+
+    def _save_records(self, sheet: Sheet) -> List[str]:
+        if sheet.id not in self._sheets or sheet.dirty_keys is None:
+            sheet.dirty_keys = set()
+            self._sheets[sheet.id] = sheet
+            self._on_disk.discard(sheet.id)
+            records = [self._encode({"op": "create", "sheet_id": sheet.id, "columns": sheet.columns})]
+            records.extend(self._encode_cell_records(sheet.id, sheet.iter_raw_cells()))
+        else:
+            dirty_keys, sheet.dirty_keys = sheet.dirty_keys, set()
+            records = self._encode_cell_records(sheet.id, self._dirty_cells(sheet, dirty_keys))
+        return records
+
+    def get_by_id(self, sheet_id: str) -> Optional[Sheet]:
+        sheet = self._sheets.get(sheet_id)
+        if sheet is None and sheet_id in self._on_disk:
+            with self._lock:
+                sheet = self._open_sheet(sheet_id)
+        return sheet
+
+    async def get_by_id_async(self, sheet_id: str, executor: Optional[Executor] = None) -> Optional[Sheet]:
+        """get_by_id, mapping a sheet file in on the executor rather than the event loop."""
+        sheet = self._sheets.get(sheet_id)
+        if sheet is None and sheet_id in self._on_disk:
+            sheet = await asyncio.get_running_loop().run_in_executor(executor, self.get_by_id, sheet_id)
+        return sheet
+
+    def exists(self, sheet_id: str) -> bool:
+        return sheet_id in self._sheets or sheet_id in self._on_disk
+
+    def delete(self, sheet_id: str) -> bool:
+        seq = self._delete(sheet_id)
+        self._wait_for_commit(seq)
+        return seq is not None
+
+    async def delete_async(self, sheet_id: str) -> bool:
+        seq = self._delete(sheet_id)
+        await self._wait_for_commit_async(seq)
+        return seq is not None
+
+    def _delete(self, sheet_id: str) -> Optional[int]:
+        with self._lock:
+            deleted = self._sheets.pop(sheet_id, None) is not None or sheet_id in self._on_disk
+            self._on_disk.discard(sheet_id)
+        if not deleted:
+            return None
+        return self._append([self._encode({"op": "delete", "sheet_id": sheet_id})], deleted_id=sheet_id)
+
+    def get_all_ids(self) -> list:
+        return list(self._sheets.keys() | self._on_disk)
+
+    def snapshot(self):
+        """Rotate the log and write a compacted snapshot now, waiting for it to finish."""
+        if self._snapshot_thread is not None:
+            self._snapshot_thread.join()
+        with self._lock:
+            segment = self._rotate()
+        self._write_snapshot(segment)
+
+    def close(self):
+        """Commit everything pending, wait for a running snapshot, and stop the commit thread."""
+        with self._lock:
+            self._closed = True
+            self._committed.notify_all()
+        self._committer.join()
+        if self._snapshot_thread is not None:
+            self._snapshot_thread.join()
+        self._wal.close()
+
+    def _open_sheet(self, sheet_id: str) -> Optional[Sheet]:
+        """Map the sheet's file unless another thread already did (_lock must be held)."""
+        sheet = self._sheets.get(sheet_id)
+        if sheet is None and sheet_id in self._on_disk:
+            sheet = open_sheet_file(self._sheet_path(sheet_id))
+            sheet.dirty_keys = set()
+            self._sheets[sheet_id] = sheet
+            self._on_disk.discard(sheet_id)
+        return sheet
+
+    def _append(self, records: List[str], changed_id: Optional[str] = None, deleted_id: Optional[str] = None) -> Optional[int]:
+        """Queue the records for the next commit and return their sequence number."""
+        if not records:
+            return None
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Repository is closed")
+            if changed_id is not None:
+                self._changed_ids.add(changed_id)
+            if deleted_id is not None:
+                self._changed_ids.discard(deleted_id)
+                self._deleted_ids.add(deleted_id)
+            self._pending.extend(records)
+            self._appended_seq += 1
+            self._committed.notify_all()
+            return self._appended_seq
+
+    def _wait_for_commit(self, seq: Optional[int]):
+        if seq is None:
+            return
+        with self._lock:
+            while self._committed_seq < seq:
+                self._committed.wait()
+
+    async def _wait_for_commit_async(self, seq: Optional[int]):
+        if seq is None:
+            return
+        with self._lock:
+            if self._committed_seq >= seq:
+                return
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._commit_waiters.append((seq, loop, future))
+        await future
+
+    def _commit_loop(self):
+        while True:
+            with self._lock:
+                while not self._pending and not self._closed:
+                    self._committed.wait()
+                if not self._pending and self._closed:
+                    return
+
+            # let concurrent writers join this commit
+            if self.commit_interval:
+                time.sleep(self.commit_interval)
+
+            with self._lock:
+                records, self._pending = self._pending, []
+                seq = self._appended_seq
+
+            # writers keep appending to the next group while this one is written
+            with self._wal_lock:
+                self._wal.write("".join(records))
+                self._wal.flush()
+                os.fsync(self._wal.fileno())
+                self.commit_count += 1
+
+            with self._lock:
+                self._committed_seq = seq
+                self._committed.notify_all()
+                self._wake_commit_waiters(seq)
+
+                self._records_since_snapshot += len(records)
+                if self._records_since_snapshot >= self.snapshot_every and not self._snapshot_running():
+                    segment = self._rotate()
+                    self._snapshot_thread = threading.Thread(target=self._write_snapshot, args=(segment,), daemon=True)
+                    self._snapshot_thread.start()
+
+    def _wake_commit_waiters(self, seq: int):
+        """Resolve the futures of coroutines waiting for commits up to seq (_lock must be held)."""
+        waiting = []
+        for waiter in self._commit_waiters:
+            waiter_seq, loop, future = waiter
+            if waiter_seq > seq:
+                waiting.append(waiter)
+                continue
+            try:
+                loop.call_soon_threadsafe(resolve_future, future)
+            except RuntimeError:
+                # the waiter's event loop is closed
+                pass
+        self._commit_waiters = waiting
+
+    def _rotate(self) -> int:
+        """Start a new log segment (_lock must be held) and return its number."""
+        with self._wal_lock:
+            self._wal.close()
+            self._segment += 1
+            self._wal = open(self._segment_path(self._segment), "a", encoding="utf-8")
+        self._records_since_snapshot = 0
+        return self._segment
+
+    def _snapshot_running(self) -> bool:
+        return self._snapshot_thread is not None and self._snapshot_thread.is_alive()
+
+    def _write_snapshot(self, segment: int):
+        """
+        Write the sheets changed before segment was started and move the checkpoint to it.
+        Writes landing in the new segment meanwhile are replayed on top, and replaying a
+        cell twice is harmless because records hold the cell's full state.
+        """
+        with self._lock:
+            changed_ids, self._changed_ids = self._changed_ids, set()
+            deleted_ids, self._deleted_ids = self._deleted_ids, set()
+            sheets = [self._sheets[sheet_id] for sheet_id in changed_ids if sheet_id in self._sheets]
+
+        try:
+            for sheet in sheets:
+                # writers hold the sheet's write lock until their save is committed, which
+                # never waits for a snapshot, so this cannot deadlock
+                with self.sheet_locks.read(sheet.id):
+                    write_sheet_file(sheet, self._sheet_path(sheet.id))
+            for sheet_id in deleted_ids:
+                if not self.exists(sheet_id) and os.path.exists(self._sheet_path(sheet_id)):
+                    os.remove(self._sheet_path(sheet_id))
+            self._fsync_dir(self.sheets_dir)
+            self._write_checkpoint(segment)
+        except BaseException:
+            # nothing was checkpointed, so the next snapshot has to cover these sheets again
+            with self._lock:
+                self._changed_ids |= changed_ids
+                self._deleted_ids |= deleted_ids
+            raise
+
+        for number in self._list_segments():
+            if number < segment:
+                os.remove(self._segment_path(number))
+
+    def _write_checkpoint(self, segment: int):
+        path = os.path.join(self.data_dir, "checkpoint")
+        with open(path + ".tmp", "w", encoding="utf-8") as checkpoint_file:
+            checkpoint_file.write(str(segment))
+            checkpoint_file.flush()
+            os.fsync(checkpoint_file.fileno())
+        os.replace(path + ".tmp", path)
+        self._fsync_dir(self.data_dir)
+
+    def _read_checkpoint(self) -> int:
+        path = os.path.join(self.data_dir, "checkpoint")
+        if not os.path.exists(path):
+            return 0
+        with open(path, encoding="utf-8") as checkpoint_file:
+            return int(checkpoint_file.read())
+
+    def _recover(self) -> int:
+        """
+        Register the sheet files and replay the log after the checkpoint; return the last
+        segment number found.
+        """
+        for name in os.listdir(self.sheets_dir):
+            if name.endswith(_SHEET_FILE_SUFFIX):
+                self._on_disk.add(name[:-len(_SHEET_FILE_SUFFIX)])
+            else:
+                os.remove(os.path.join(self.sheets_dir, name))
+
+        checkpoint = self._read_checkpoint()
+        segments = self._list_segments()
+        touched_ids: Set[str] = set()
+        for number in segments:
+            if number >= checkpoint:
+                self._replay(self._segment_path(number), touched_ids)
+
+        for sheet_id in touched_ids:
+            sheet = self._sheets.get(sheet_id)
+            if sheet is not None:
+                sheet.rebuild_lookups()
+                sheet.dirty_keys = set()
+        # the replayed segments are only dropped once these sheets are in a snapshot
+        self._changed_ids = {sheet_id for sheet_id in touched_ids if sheet_id in self._sheets}
+
+        return max(segments + [checkpoint])
+
+    def _replay(self, path: str, touched_ids: Set[str]):
+        with open(path, encoding="utf-8") as log_file:
+            for line in log_file:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # a torn write at the tail of the log was never acknowledged
+                    break
+                self._apply(record, touched_ids)
+
+    def _apply(self, record: Dict[str, Any], touched_ids: Set[str]):
+        sheet_id = record["sheet_id"]
+        if record["op"] == "create":
+            if not self.exists(sheet_id):
+                self._sheets[sheet_id] = Sheet(record["columns"], sheet_id=sheet_id)
+                touched_ids.add(sheet_id)
+        elif record["op"] == "delete":
+            self._sheets.pop(sheet_id, None)
+            self._on_disk.discard(sheet_id)
+            touched_ids.discard(sheet_id)
+            self._deleted_ids.add(sheet_id)
+        elif record["op"] == "cells":
+            sheet = self._open_sheet(sheet_id)
+            if sheet is None:
+                return
+            touched_ids.add(sheet_id)
+            for entry in record["cells"]:
+                self._apply_cell(sheet, entry)
+
+    def _apply_cell(self, sheet: Sheet, entry: List[Any]):
+        cell_key = entry[0]
+        if len(entry) == 1:
+            sheet.remove_cell(cell_key)
+        elif entry[2] is None:
+            sheet.set_value(cell_key, entry[1])
+        else:
+            sheet.set_lookup_cell(cell_key, Cell(value=entry[1], lookup_key=entry[2]))
+
+    def _dirty_cells(self, sheet: Sheet, cell_keys: Iterable[int]):
+        for cell_key in cell_keys:
+            raw_cell = sheet.get_raw_cell(cell_key)
+            if raw_cell is None:
+                yield (cell_key,)
+            else:
+                yield (cell_key,) + raw_cell
+
+    def _encode_cell_records(self, sheet_id: str, cells) -> List[str]:
+        records = []
+        chunk = []
+        for cell in cells:
+            chunk.append(list(cell))
+            if len(chunk) == CELLS_PER_RECORD:
+                records.append(self._encode({"op": "cells", "sheet_id": sheet_id, "cells": chunk}))
+                chunk = []
+        if chunk:
+            records.append(self._encode({"op": "cells", "sheet_id": sheet_id, "cells": chunk}))
+        return records
+
+    def _encode(self, record: Dict[str, Any]) -> str:
+        return json.dumps(record, separators=(",", ":")) + "\n"
+
+    def _list_segments(self) -> List[int]:
+        segments = []
+        for name in os.listdir(self.data_dir):
+            match = _SEGMENT_PATTERN.match(name)
+            if match:
+                segments.append(int(match.group(1)))
+        return sorted(segments)
+
+    def _segment_path(self, number: int) -> str:
+        return os.path.join(self.data_dir, f"wal-{number:08d}.log")
+
+    def _sheet_path(self, sheet_id: str) -> str:
+        return os.path.join(self.sheets_dir, sheet_id + _SHEET_FILE_SUFFIX)
+
+    def _fsync_dir(self, path: str):
+        if not hasattr(os, "O_DIRECTORY"):
+            return
+        fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
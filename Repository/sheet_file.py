@@ -0,0 +1,296 @@
+"""
+Binary on-disk format for a Sheet, read back through mmap.
+
+Layout (little-endian; typed arrays are byte-swapped on big-endian hosts):
+  header       magic, version, sheet id, columns (JSON), lowest and highest order,
+               position and size of the edge and order tables, and one
+               (offset, length) entry per column (0, 0 for a column with no cells)
+  column       block count and side-table size, then per block: block id, valid count,
+               validity bitmap and values (raw array bytes for int, double and boolean;
+               offsets plus UTF-8 data for strings), then the side table as JSON rows
+               [row, value, lookup_key, resolved_value]
+  edge table   (target key, dependent key) int64 pairs, in dependents order
+  order table  (cell key, topological order) int64 pairs
+
+Column sections hold no absolute offsets, so an untouched column of a mapped sheet
+is copied byte for byte when the sheet is written again.
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+from array import array
+from typing import Callable, Dict, List, Optional, Tuple
+from Models.sheet import BLOCK_SIZE, TYPECODES, Cell, ColumnBlock, ColumnStore, ColumnType, Sheet
+
+MAGIC = b"ASHT"
+VERSION = 1
+
+_PREFIX = struct.Struct("<4sI")
+_LENGTH = struct.Struct("<I")
+_TABLES = struct.Struct("<qqQQQQ")
+_SECTION = struct.Struct("<QQ")
+_COLUMN = struct.Struct("<II")
+_BLOCK = struct.Struct("<qI")
+
+_VALIDITY_SIZE = BLOCK_SIZE // 8
+
+
+class LazyColumnStores(dict):
+    """
+    column_stores mapping of a mapped sheet: a column is decoded from the file the
+    first time it is touched. The file is unmapped once every column is loaded.
+    """
+
+    def __init__(self, mapped: mmap.mmap, sections: Dict[int, Tuple[int, int]],
+                 load_column: Callable[[mmap.mmap, int, int], ColumnStore]):
+        super().__init__()
+        self._mapped = mapped
+        self._sections = sections
+        self._load_column = load_column
+        self._lock = threading.Lock()
+
+    def unloaded_sections(self) -> Dict[int, bytes]:
+        """Raw bytes of the columns not loaded yet."""
+        with self._lock:
+            return {index: self._mapped[offset:offset + length] for index, (offset, length) in self._sections.items()}
+
+    def _load(self, column_index):
+        if column_index not in self._sections:
+            return
+        with self._lock:
+            section = self._sections.get(column_index)
+            if section is None:
+                return
+            dict.__setitem__(self, column_index, self._load_column(self._mapped, column_index, section[0]))
+            del self._sections[column_index]
+            if not self._sections:
+                self._mapped.close()
+
+    def _load_all(self):
+        with self._lock:
+            column_indexes = list(self._sections)
+        for column_index in column_indexes:
+            self._load(column_index)
+
+    def get(self, column_index, default=None):
+        self._load(column_index)
+        return dict.get(self, column_index, default)
+
+    def __getitem__(self, column_index):
+        self._load(column_index)
+        return dict.__getitem__(self, column_index)
+
+    def __contains__(self, column_index):
+        return column_index in self._sections or dict.__contains__(self, column_index)
+
+    def __len__(self):
+        return dict.__len__(self) + len(self._sections)
+
+    def __iter__(self):
+        self._load_all()
+        return dict.__iter__(self)
+
+    def keys(self):
+        self._load_all()
+        return dict.keys(self)
+
+    def values(self):
+        self._load_all()
+        return dict.values(self)
+
+    def items(self):
+        self._load_all()
+        return dict.items(self)
+
+
+def write_sheet_file(sheet: Sheet, path: str, durable: bool = True):
+    """Write the sheet to path atomically (temporary file, fsync unless not durable, rename)."""
+    stores = sheet.column_stores
+    raw_sections = stores.unloaded_sections() if isinstance(stores, LazyColumnStores) else {}
+
+    id_bytes = sheet.id.encode()
+    columns_bytes = json.dumps(sheet.columns).encode()
+    header_size = (_PREFIX.size + _LENGTH.size + len(id_bytes) + _LENGTH.size + len(columns_bytes)
+                   + _TABLES.size + _LENGTH.size + _SECTION.size * len(sheet.columns))
+
+    with open(path + ".tmp", "wb") as sheet_file:
+        sheet_file.seek(header_size)
+        sections = []
+        for column_index in range(len(sheet.columns)):
+            offset = sheet_file.tell()
+            if column_index in raw_sections:
+                sheet_file.write(raw_sections[column_index])
+            else:
+                store = dict.get(stores, column_index)
+                if store is not None:
+                    _write_column(sheet_file, store)
+            sections.append((offset, sheet_file.tell() - offset) if sheet_file.tell() > offset else (0, 0))
+
+        edges = array("q")
+        for target_key, dependent_keys in sheet.dependents.items():
+            for dependent_key in dependent_keys:
+                edges.extend((target_key, dependent_key))
+        edge_offset = sheet_file.tell()
+        sheet_file.write(_array_bytes(edges))
+
+        orders = array("q")
+        for cell_key, order in sheet.topological_order.items():
+            orders.extend((cell_key, order))
+        order_offset = sheet_file.tell()
+        sheet_file.write(_array_bytes(orders))
+
+        sheet_file.seek(0)
+        sheet_file.write(_PREFIX.pack(MAGIC, VERSION))
+        sheet_file.write(_LENGTH.pack(len(id_bytes)) + id_bytes)
+        sheet_file.write(_LENGTH.pack(len(columns_bytes)) + columns_bytes)
+        sheet_file.write(_TABLES.pack(sheet.lowest_order, sheet.highest_order,
+                                      edge_offset, len(edges) // 2, order_offset, len(orders) // 2))
+        sheet_file.write(_LENGTH.pack(len(sections)))
+        for section in sections:
+            sheet_file.write(_SECTION.pack(*section))
+
+        if durable:
+            sheet_file.flush()
+            os.fsync(sheet_file.fileno())
+    os.replace(path + ".tmp", path)
+
+
+def open_sheet_file(path: str) -> Sheet:
+    """
+    Map the file and return its sheet. The lookup graph is read right away; column
+    data stays on disk until a column is first touched.
+    """
+    with open(path, "rb") as sheet_file:
+        mapped = mmap.mmap(sheet_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    magic, version = _PREFIX.unpack_from(mapped, 0)
+    if magic != MAGIC or version != VERSION:
+        mapped.close()
+        raise ValueError(f"{path} is not a sheet file")
+    position = _PREFIX.size
+    sheet_id, position = _read_bytes(mapped, position)
+    columns_bytes, position = _read_bytes(mapped, position)
+    lowest_order, highest_order, edge_offset, edge_count, order_offset, order_count = _TABLES.unpack_from(mapped, position)
+    position += _TABLES.size
+    (column_count,) = _LENGTH.unpack_from(mapped, position)
+    position += _LENGTH.size
+
+    sections = {}
+    for column_index in range(column_count):
+        offset, length = _SECTION.unpack_from(mapped, position + column_index * _SECTION.size)
+        if length:
+            sections[column_index] = (offset, length)
+
+    sheet = Sheet(json.loads(columns_bytes), sheet_id=sheet_id.decode())
+    sheet.lowest_order = lowest_order
+    sheet.highest_order = highest_order
+
+    edges = _read_int64s(mapped, edge_offset, edge_count * 2)
+    for position in range(0, len(edges), 2):
+        sheet.add_dependency(edges[position], edges[position + 1])
+    orders = _read_int64s(mapped, order_offset, order_count * 2)
+    sheet.topological_order = dict(zip(orders[::2], orders[1::2]))
+
+    column_types = [ColumnType(col["type"]) for col in sheet.columns]
+
+    def load_column(mapped_file: mmap.mmap, column_index: int, offset: int) -> ColumnStore:
+        return _read_column(mapped_file, column_types[column_index], offset)
+
+    if sections:
+        sheet.column_stores = LazyColumnStores(mapped, sections, load_column)
+    else:
+        mapped.close()
+    return sheet
+
+
+def _write_column(sheet_file, store: ColumnStore):
+    block_ids = sorted(store.blocks)
+    sparse = [[row, cell.value, cell.lookup_key, cell.resolved_value] for row, cell in sorted(store.sparse.items())]
+    sparse_bytes = json.dumps(sparse).encode()
+
+    sheet_file.write(_COLUMN.pack(len(block_ids), len(sparse_bytes)))
+    for block_id in block_ids:
+        block = store.blocks[block_id]
+        sheet_file.write(_BLOCK.pack(block_id, block.count))
+        sheet_file.write(bytes(block.validity))
+        if isinstance(block.values, array):
+            sheet_file.write(_array_bytes(block.values))
+        else:
+            _write_strings(sheet_file, block.values)
+    sheet_file.write(sparse_bytes)
+
+
+def _write_strings(sheet_file, values: List[Optional[str]]):
+    offsets = array("I", [0])
+    encoded = []
+    for value in values:
+        data = value.encode("utf-8", "surrogatepass") if value is not None else b""
+        encoded.append(data)
+        offsets.append(offsets[-1] + len(data))
+    sheet_file.write(_array_bytes(offsets))
+    sheet_file.write(b"".join(encoded))
+
+
+def _read_column(mapped: mmap.mmap, column_type: ColumnType, offset: int) -> ColumnStore:
+    block_count, sparse_length = _COLUMN.unpack_from(mapped, offset)
+    position = offset + _COLUMN.size
+    typecode = TYPECODES.get(column_type)
+
+    blocks = {}
+    for _ in range(block_count):
+        block_id, count = _BLOCK.unpack_from(mapped, position)
+        position += _BLOCK.size
+        block = ColumnBlock(column_type)
+        block.count = count
+        block.validity = bytearray(mapped[position:position + _VALIDITY_SIZE])
+        position += _VALIDITY_SIZE
+        if typecode:
+            end = position + BLOCK_SIZE * block.values.itemsize
+            block.values = _array_from(typecode, mapped[position:end])
+            position = end
+        else:
+            block.values, position = _read_strings(mapped, position, block)
+        blocks[block_id] = block
+
+    sparse = {}
+    for row, value, lookup_key, resolved_value in json.loads(mapped[position:position + sparse_length]):
+        sparse[row] = Cell(value=value, lookup_key=lookup_key, resolved_value=resolved_value)
+    return ColumnStore.from_parts(column_type, blocks, sparse)
+
+
+def _read_strings(mapped: mmap.mmap, position: int, block: ColumnBlock) -> Tuple[List[Optional[str]], int]:
+    end = position + (BLOCK_SIZE + 1) * array("I").itemsize
+    offsets = _array_from("I", mapped[position:end])
+    data = mapped[end:end + offsets[-1]]
+    values: List[Optional[str]] = [None] * BLOCK_SIZE
+    for index in block.valid_indexes():
+        values[index] = data[offsets[index]:offsets[index + 1]].decode("utf-8", "surrogatepass")
+    return values, end + offsets[-1]
+
+
+def _read_bytes(mapped: mmap.mmap, position: int) -> Tuple[bytes, int]:
+    (length,) = _LENGTH.unpack_from(mapped, position)
+    start = position + _LENGTH.size
+    return mapped[start:start + length], start + length
+
+
+def _read_int64s(mapped: mmap.mmap, offset: int, count: int) -> array:
+    return _array_from("q", mapped[offset:offset + count * 8])
+
+
+def _array_bytes(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _array_from(typecode: str, data: bytes) -> array:
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
@@ -1,24 +1,20 @@
 from fastapi import APIRouter, HTTPException, Depends
-from Schemas.cell_schemas import SetCellRequest, SetCellResponse
-from Services.cell_service import CellService
-from Repository.sheet_repository import SheetRepository
-from dependencies import get_sheet_repository
+from Schemas.cell_schemas import SetCellRequest, SetCellResponse, SetCellsBatchRequest, SetColumnRequest
+from Services.async_cell_service import AsyncCellService
+from dependencies import get_cell_service
 from exceptions import NotFoundError, ValidationError
 
 router = APIRouter(prefix="/cells", tags=["cells"])
 
-def get_cell_service(repo: SheetRepository = Depends(get_sheet_repository)) -> CellService:
-    return CellService(repo)
-
 
 @router.put("/sheets/{sheet_id}", response_model=SetCellResponse)
-def set_cell(
+async def set_cell(
         sheet_id: str,
         request: SetCellRequest,
-        cell_service: CellService = Depends(get_cell_service)
+        cell_service: AsyncCellService = Depends(get_cell_service)
 ):
     try:
-        message = cell_service.set_cell_value(
+        message = await cell_service.set_cell_value(
             sheet_id=sheet_id,
             column=request.column,
             row=request.row,
@@ -27,6 +23,53 @@ def set_cell(
         
         return SetCellResponse(message=message)
     
+    except NotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.put("/sheets/{sheet_id}/batch", response_model=SetCellResponse)
+async def set_cells_batch(
+        sheet_id: str,
+        request: SetCellsBatchRequest,
+        cell_service: AsyncCellService = Depends(get_cell_service)
+):
+    try:
+        message = await cell_service.set_cell_values(
+            sheet_id=sheet_id,
+            cells=[(cell.column, cell.row, cell.value) for cell in request.cells]
+        )
+
+        return SetCellResponse(message=message)
+
+    except NotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.put("/sheets/{sheet_id}/columns/{column}", response_model=SetCellResponse)
+async def set_column(
+        sheet_id: str,
+        column: str,
+        request: SetColumnRequest,
+        cell_service: AsyncCellService = Depends(get_cell_service)
+):
+    try:
+        message = await cell_service.set_column_values(
+            sheet_id=sheet_id,
+            column=column,
+            start_row=request.start_row,
+            values=request.values
+        )
+
+        return SetCellResponse(message=message)
+
     except NotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except ValidationError as e:
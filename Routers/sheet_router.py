@@ -1,25 +1,28 @@
-from fastapi import APIRouter, HTTPException, Depends
-from Schemas.sheet_schemas import CreateSheetRequest, CreateSheetResponse, GetSheetResponse
-from Services.sheet_service import SheetService
-from Repository.sheet_repository import SheetRepository
-from dependencies import get_sheet_repository
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Depends, Header, Query, Request
+from fastapi.responses import Response, StreamingResponse
+from Schemas.sheet_schemas import (
+    CreateSheetRequest, CreateSheetResponse, GetSheetResponse, GetSheetPageResponse, GetSheetChangesResponse,
+    GetCellDependentsResponse, ImportSheetResponse
+)
+from Services.async_cell_service import AsyncCellService
+from Services.async_sheet_service import AsyncSheetService
+from dependencies import get_cell_service, get_sheet_service
 from exceptions import NotFoundError, ValidationError
+from Models.sheet import MAX_ROW
 
 router = APIRouter(prefix="/sheets", tags=["sheets"])
 
-def get_sheet_service(repo: SheetRepository = Depends(get_sheet_repository)) -> SheetService:
-    return SheetService(repo)
-
 
 @router.post("", response_model=CreateSheetResponse)
-def create_sheet(
+async def create_sheet(
         request: CreateSheetRequest,
-        sheet_service: SheetService = Depends(get_sheet_service)
+        sheet_service: AsyncSheetService = Depends(get_sheet_service)
 ):
     try:
         columns_dict = [{"name": col.name, "type": col.type} for col in request.columns]
 
-        sheet_id = sheet_service.create_sheet(columns_dict)
+        sheet_id = await sheet_service.create_sheet(columns_dict)
 
         return CreateSheetResponse(
             sheet_id=sheet_id,
@@ -33,14 +36,171 @@ def create_sheet(
 
 
 @router.get("/{sheet_id}", response_model=GetSheetResponse)
-def get_sheet(
+async def get_sheet(
         sheet_id: str,
-        sheet_service: SheetService = Depends(get_sheet_service)
+        if_none_match: Optional[str] = Header(None),
+        sheet_service: AsyncSheetService = Depends(get_sheet_service)
 ):
     try:
-        return sheet_service.get_sheet_by_id(sheet_id)
+        etag, body = await sheet_service.get_sheet_json_if_changed(sheet_id, if_none_match)
+        if body is None:
+            return Response(status_code=304, headers={"ETag": etag})
+        return Response(body, media_type="application/json", headers={"ETag": etag})
     
     except NotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/{sheet_id}/cells", response_model=GetSheetPageResponse)
+async def get_sheet_page(
+        sheet_id: str,
+        cursor: Optional[str] = None,
+        limit: int = Query(1000, ge=1, le=10000),
+        sheet_service: AsyncSheetService = Depends(get_sheet_service)
+):
+    try:
+        page = await sheet_service.get_sheet_page_json(sheet_id, cursor=cursor, limit=limit)
+        return Response(page, media_type="application/json")
+
+    except NotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/{sheet_id}/query", response_model=GetSheetResponse)
+async def query_sheet(
+        sheet_id: str,
+        columns: Optional[List[str]] = Query(None),
+        start_row: int = Query(1, ge=1),
+        end_row: int = Query(MAX_ROW, ge=1, le=MAX_ROW),
+        sheet_service: AsyncSheetService = Depends(get_sheet_service)
+):
+    try:
+        result = await sheet_service.query_sheet_json(sheet_id, columns=columns, start_row=start_row, end_row=end_row)
+        return Response(result, media_type="application/json")
+
+    except NotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/{sheet_id}/changes", response_model=GetSheetChangesResponse)
+async def get_sheet_changes(
+        sheet_id: str,
+        since: Optional[str] = None,
+        sheet_service: AsyncSheetService = Depends(get_sheet_service)
+):
+    try:
+        return Response(await sheet_service.get_sheet_changes_json(sheet_id, since=since), media_type="application/json")
+
+    except NotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/{sheet_id}/cells/{column}/{row}/dependents", response_model=GetCellDependentsResponse)
+async def get_cell_dependents(
+        sheet_id: str,
+        column: str,
+        row: int,
+        transitive: bool = False,
+        sheet_service: AsyncSheetService = Depends(get_sheet_service)
+):
+    try:
+        result = await sheet_service.get_cell_dependents_json(sheet_id, column, row, transitive=transitive)
+        return Response(result, media_type="application/json")
+
+    except NotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/{sheet_id}/subscribe")
+async def subscribe(
+        sheet_id: str,
+        columns: Optional[List[str]] = Query(None),
+        start_row: int = Query(1, ge=1),
+        end_row: int = Query(MAX_ROW, ge=1, le=MAX_ROW),
+        sheet_service: AsyncSheetService = Depends(get_sheet_service)
+):
+    try:
+        events = await sheet_service.subscribe(sheet_id, columns=columns, start_row=start_row, end_row=end_row)
+        return StreamingResponse(events, media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+    except NotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except NotImplementedError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/{sheet_id}/import", response_model=ImportSheetResponse)
+async def import_csv(
+        sheet_id: str,
+        request: Request,
+        start_row: int = Query(1, ge=1, le=MAX_ROW),
+        cell_service: AsyncCellService = Depends(get_cell_service)
+):
+    try:
+        message = await cell_service.import_csv(sheet_id, request.stream(), start_row=start_row)
+        return ImportSheetResponse(sheet_id=sheet_id, message=message)
+
+    except NotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/{sheet_id}/export")
+async def export_csv(
+        sheet_id: str,
+        start_row: int = Query(1, ge=1, le=MAX_ROW),
+        end_row: Optional[int] = Query(None, ge=1, le=MAX_ROW),
+        resolved: bool = False,
+        sheet_service: AsyncSheetService = Depends(get_sheet_service)
+):
+    try:
+        chunks = await sheet_service.export_csv(sheet_id, start_row=start_row, end_row=end_row, resolved=resolved)
+        return StreamingResponse(
+            chunks, media_type="text/csv", headers={"Content-Disposition": f'attachment; filename="{sheet_id}.csv"'}
+        )
+
+    except NotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/{sheet_id}/stream")
+async def stream_sheet(
+        sheet_id: str,
+        sheet_service: AsyncSheetService = Depends(get_sheet_service)
+):
+    try:
+        return StreamingResponse(await sheet_service.stream_sheet(sheet_id), media_type="application/x-ndjson")
+
+    except NotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, field_validator
-from typing import Any
+from typing import Any, List
 
 class CellBase(BaseModel):
     column: str
@@ -19,5 +19,23 @@ class SetCellRequest(CellBase):
 class SetCellResponse(BaseModel):
     message: str
 
+class SetCellsBatchRequest(BaseModel):
+    cells: List[SetCellRequest]
+
+class SetColumnRequest(BaseModel):
+    start_row: int = 1
+    values: List[Any]
+
+    @field_validator('start_row')
+    @classmethod
+    def validate_start_row(cls, v):
+        if v <= 0:
+            raise ValueError("Row number must be a positive integer (greater than 0)")
+        return v
+
 class CellData(CellBase):
-    pass
\ No newline at end of file
+    pass
+
+class CellReference(BaseModel):
+    column: str
+    row: int
\ No newline at end of file
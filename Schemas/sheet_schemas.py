@@ -1,7 +1,7 @@
 from pydantic import BaseModel, field_validator
-from typing import List, Any, Union
+from typing import List, Any, Optional, Union
 from Models.sheet import ColumnType
-from Schemas.cell_schemas import CellData
+from Schemas.cell_schemas import CellData, CellReference
 
 class ColumnRequest(BaseModel):
     name: str
@@ -26,4 +26,20 @@ class CreateSheetResponse(SheetBase):
 
 class GetSheetResponse(SheetBase):
     columns: List[ColumnRequest]
-    cells: List[CellData]
\ No newline at end of file
+    cells: List[CellData]
+
+class GetSheetPageResponse(GetSheetResponse):
+    next_cursor: Optional[str] = None
+
+class GetSheetChangesResponse(GetSheetResponse):
+    version: str
+    snapshot: bool
+
+class GetCellDependentsResponse(SheetBase):
+    column: str
+    row: int
+    transitive: bool
+    dependents: List[CellReference]
+
+class ImportSheetResponse(SheetBase):
+    message: str
@@ -0,0 +1,86 @@
+from concurrent.futures import Executor
+from typing import Any, AsyncIterator, List, Optional, Tuple
+from Repository.async_sheet_repository import AsyncSheetRepository
+from Services.async_support import AsyncServiceMixin
+from Services.cell_service import CellService
+from locks import SheetLocks
+from sheet_csv import CsvImport
+from subscriptions import ChangeFeeds
+
+# Writes to sheets with at least this many lookup cells, or batches of at least
+# this many cells, run on the executor: their cycle checks can walk a large graph
+OFFLOAD_MIN_GRAPH_SIZE = 10000
+OFFLOAD_MIN_BATCH_SIZE = 1000
+
+# Chunks of an imported CSV body from this size up are parsed on the executor
+OFFLOAD_MIN_IMPORT_BYTES = 1 << 16
+
+
+class AsyncCellService(AsyncServiceMixin, CellService):
+    """
+    CellService for async handlers. Storage is awaited; the sheet's write lock is
+    held across the save, as in CellService, so a write is durable before the next
+    one on the same sheet starts.
+    """
+
+    def __init__(self, sheet_repository: AsyncSheetRepository, sheet_locks: Optional[SheetLocks] = None,
+                 executor: Optional[Executor] = None, change_feeds: Optional[ChangeFeeds] = None):
+        super().__init__(sheet_repository, sheet_locks, change_feeds)
+        self.executor = executor
+
+    async def set_cell_value(self, sheet_id: str, column: str, row: int, value: Any) -> str:
+        async with self.sheet_locks.write_async(sheet_id):
+            sheet = await self._fetch_sheet_or_raise(sheet_id)
+            if len(sheet.topological_order) < OFFLOAD_MIN_GRAPH_SIZE:
+                self._apply_cell_value(sheet, column, row, value)
+            else:
+                await self._offload(self._apply_cell_value, sheet, column, row, value)
+            await self.sheet_repository.save(sheet)
+            self.change_feeds.publish(sheet)
+            return "Cell value set successfully"
+
+    async def set_cell_values(self, sheet_id: str, cells: List[Tuple[str, int, Any]]) -> str:
+        async with self.sheet_locks.write_async(sheet_id):
+            sheet = await self._fetch_sheet_or_raise(sheet_id)
+            if len(sheet.topological_order) < OFFLOAD_MIN_GRAPH_SIZE and len(cells) < OFFLOAD_MIN_BATCH_SIZE:
+                written = self._apply_cell_values(sheet, cells)
+            else:
+                written = await self._offload(self._apply_cell_values, sheet, cells)
+            await self.sheet_repository.save(sheet)
+            self.change_feeds.publish(sheet)
+            return f"{written} cell values set successfully"
+
+    async def set_column_values(self, sheet_id: str, column: str, start_row: int, values: List[Any]) -> str:
+        async with self.sheet_locks.write_async(sheet_id):
+            sheet = await self._fetch_sheet_or_raise(sheet_id)
+            if len(sheet.topological_order) < OFFLOAD_MIN_GRAPH_SIZE and len(values) < OFFLOAD_MIN_BATCH_SIZE:
+                written = self._apply_column_values(sheet, column, start_row, values)
+            else:
+                written = await self._offload(self._apply_column_values, sheet, column, start_row, values)
+            await self.sheet_repository.save(sheet)
+            self.change_feeds.publish(sheet)
+            return f"{written} cell values set successfully"
+
+    async def import_csv(self, sheet_id: str, chunks: AsyncIterator[bytes], start_row: int = 1) -> str:
+        """
+        Async variant of CellService.import_csv. The body is parsed as it arrives, before
+        the write lock is taken, so a slow upload never holds writers back.
+        """
+        async with self.sheet_locks.read_async(sheet_id):
+            parsed = CsvImport(await self._fetch_sheet_or_raise(sheet_id), start_row)
+        async for chunk in chunks:
+            if len(chunk) < OFFLOAD_MIN_IMPORT_BYTES:
+                parsed.feed(chunk)
+            else:
+                await self._offload(parsed.feed, chunk)
+        parsed.close()
+
+        async with self.sheet_locks.write_async(sheet_id):
+            sheet = await self._fetch_sheet_or_raise(sheet_id)
+            if len(sheet.topological_order) < OFFLOAD_MIN_GRAPH_SIZE and parsed.cells < OFFLOAD_MIN_BATCH_SIZE:
+                written = self._apply_import(sheet, parsed)
+            else:
+                written = await self._offload(self._apply_import, sheet, parsed)
+            await self.sheet_repository.save(sheet)
+            self.change_feeds.publish(sheet)
+            return f"{written} cell values imported successfully"
@@ -0,0 +1,200 @@
+from concurrent.futures import Executor
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from Models.sheet import Sheet, MAX_ROW
+from Repository.async_sheet_repository import AsyncSheetRepository
+from Services.async_support import AsyncServiceMixin
+from Services.sheet_service import SheetService, EXPORT_CHUNK_ROWS
+from Schemas.sheet_schemas import GetSheetResponse, GetSheetPageResponse
+from locks import SheetLocks
+from serialization import ResponseCache
+from subscriptions import ChangeFeeds, Subscription, change_feeds as default_change_feeds, sse_event
+
+# Reads building at least this many cells into a response run on the executor
+OFFLOAD_MIN_CELLS = 2000
+
+# Seconds without updates after which a subscription stream sends a keepalive comment
+SUBSCRIPTION_KEEPALIVE = 15
+
+
+async def export_chunks(export_csv_chunk, sheet_id: str, first: Tuple[bytes, Optional[int]], end_row: Optional[int],
+                        resolved: bool) -> AsyncIterator[bytes]:
+    """The chunks of a CSV export: first, as export_csv_chunk returned it, then the rest from export_csv_chunk."""
+    chunk, next_row = first
+    yield chunk
+    while next_row is not None:
+        chunk, next_row = await export_csv_chunk(sheet_id, next_row, end_row, resolved, header=False)
+        yield chunk
+
+
+class AsyncSheetService(AsyncServiceMixin, SheetService):
+    """
+    SheetService for async handlers: storage is awaited, and responses covering
+    OFFLOAD_MIN_CELLS cells or more are built on the executor so that large reads
+    never stall the event loop. Small reads run inline, without a thread handoff.
+    """
+
+    def __init__(self, sheet_repository: AsyncSheetRepository, sheet_locks: Optional[SheetLocks] = None,
+                 executor: Optional[Executor] = None, response_cache: Optional[ResponseCache] = None,
+                 change_feeds: Optional[ChangeFeeds] = None):
+        super().__init__(sheet_repository, sheet_locks, response_cache)
+        self.executor = executor
+        self.change_feeds = change_feeds or default_change_feeds
+
+    async def create_sheet(self, columns: List[Dict[str, str]], sheet_id: Optional[str] = None) -> str:
+        return await self.sheet_repository.save(Sheet(columns, sheet_id=sheet_id))
+
+    async def get_sheet_by_id(self, sheet_id: str) -> GetSheetResponse:
+        async with self.sheet_locks.read_async(sheet_id):
+            sheet = await self._fetch_sheet_or_raise(sheet_id)
+            return await self._build(self._sheet_response, self._cell_count(sheet), sheet)
+
+    async def get_sheet_page(self, sheet_id: str, cursor: Optional[str] = None, limit: int = 1000) -> GetSheetPageResponse:
+        async with self.sheet_locks.read_async(sheet_id):
+            sheet = await self._fetch_sheet_or_raise(sheet_id)
+            return await self._build(self._page_response, min(limit, self._cell_count(sheet)), sheet, cursor, limit)
+
+    async def query_sheet(self, sheet_id: str, columns: Optional[List[str]] = None,
+                          start_row: int = 1, end_row: int = MAX_ROW) -> GetSheetResponse:
+        async with self.sheet_locks.read_async(sheet_id):
+            sheet = await self._fetch_sheet_or_raise(sheet_id)
+            cells = self._query_cell_count(sheet, columns, start_row, end_row)
+            return await self._build(self._query_response, cells, sheet, columns, start_row, end_row)
+
+    async def get_sheet_json(self, sheet_id: str) -> bytes:
+        return (await self.get_sheet_json_if_changed(sheet_id))[1]
+
+    async def get_sheet_json_if_changed(self, sheet_id: str, if_none_match: Optional[str] = None) -> Tuple[str, Optional[bytes]]:
+        async with self.sheet_locks.read_async(sheet_id):
+            sheet = await self._fetch_sheet_or_raise(sheet_id)
+            etag = self._sheet_etag(sheet)
+            if self._etag_matches(if_none_match, etag):
+                return etag, None
+            body = self.response_cache.get(sheet.id, etag)
+            if body is None:
+                body = await self._build(self._sheet_json, self._cell_count(sheet), sheet)
+                self.response_cache.put(sheet.id, etag, body)
+            return etag, body
+
+    async def get_sheet_page_json(self, sheet_id: str, cursor: Optional[str] = None, limit: int = 1000) -> bytes:
+        async with self.sheet_locks.read_async(sheet_id):
+            sheet = await self._fetch_sheet_or_raise(sheet_id)
+            return await self._build(self._page_json, min(limit, self._cell_count(sheet)), sheet, cursor, limit)
+
+    async def query_sheet_json(self, sheet_id: str, columns: Optional[List[str]] = None,
+                               start_row: int = 1, end_row: int = MAX_ROW) -> bytes:
+        async with self.sheet_locks.read_async(sheet_id):
+            sheet = await self._fetch_sheet_or_raise(sheet_id)
+            cells = self._query_cell_count(sheet, columns, start_row, end_row)
+            return await self._build(self._query_json, cells, sheet, columns, start_row, end_row)
+
+    async def get_sheet_changes_json(self, sheet_id: str, since: Optional[str] = None) -> bytes:
+        async with self.sheet_locks.read_async(sheet_id):
+            sheet = await self._fetch_sheet_or_raise(sheet_id)
+            changed = self._changed_keys(sheet, since)
+            cells = self._cell_count(sheet) if changed is None else len(changed)
+            return await self._build(self._changes_json, cells, sheet, changed)
+
+    async def get_cell_dependents_json(self, sheet_id: str, column: str, row: int, transitive: bool = False) -> bytes:
+        async with self.sheet_locks.read_async(sheet_id):
+            sheet = await self._fetch_sheet_or_raise(sheet_id)
+            dependent_keys = self._dependent_keys(sheet, column, row, transitive)
+            return await self._build(self._dependents_json, len(dependent_keys), sheet, column, row, transitive, dependent_keys)
+
+    async def export_csv(self, sheet_id: str, start_row: int = 1, end_row: Optional[int] = None,
+                         resolved: bool = False) -> AsyncIterator[bytes]:
+        """Async variant of SheetService.export_csv; the first chunk is read up front, so errors raise here."""
+        first = await self.export_csv_chunk(sheet_id, start_row, end_row, resolved)
+        return export_chunks(self.export_csv_chunk, sheet_id, first, end_row, resolved)
+
+    async def export_csv_chunk(self, sheet_id: str, start_row: int = 1, end_row: Optional[int] = None,
+                               resolved: bool = False, header: bool = True) -> Tuple[bytes, Optional[int]]:
+        async with self.sheet_locks.read_async(sheet_id):
+            sheet = await self._fetch_sheet_or_raise(sheet_id)
+            cells = min(self._cell_count(sheet), len(sheet.columns) * EXPORT_CHUNK_ROWS)
+            return await self._build(self._csv_chunk, cells, sheet, start_row, end_row, resolved, header)
+
+    async def stream_sheet(self, sheet_id: str) -> AsyncIterator[bytes]:
+        """Async variant of SheetService.stream_sheet; each chunk is serialized on the executor."""
+        async with self.sheet_locks.read_async(sheet_id):
+            sheet = await self._fetch_sheet_or_raise(sheet_id)
+        return self._stream_ndjson_async(sheet)
+
+    async def subscribe(self, sheet_id: str, columns: Optional[List[str]] = None,
+                        start_row: int = 1, end_row: int = MAX_ROW) -> AsyncIterator[bytes]:
+        """
+        Server-sent events for the cells of the given columns (all when None) in rows
+        [start_row, end_row]: first a snapshot event holding them (as query_sheet_json),
+        then an update event with the cells changed by each write, including lookup
+        cells changed through their chain (a removed cell has a null value). Updates a
+        slow client has not read yet are merged per cell; past MAX_PENDING_CELLS it gets
+        a fresh snapshot instead. Each event's id is the sheet version it reflects.
+        """
+        async with self.sheet_locks.read_async(sheet_id):
+            sheet = await self._fetch_sheet_or_raise(sheet_id)
+            subscription = await self._subscription_snapshot(sheet, columns, start_row, end_row)
+        return self._subscription_events(sheet_id, columns, start_row, end_row, *subscription)
+
+    async def _subscription_snapshot(self, sheet: Sheet, columns: Optional[List[str]], start_row: int,
+                                     end_row: int, subscription: Optional[Subscription] = None) -> Tuple[Subscription, bytes]:
+        """Build a snapshot event and register the subscription; the caller holds the sheet's read lock."""
+        _, column_defs = self._query_columns(sheet, columns, start_row, end_row)
+        cells = self._query_cell_count(sheet, columns, start_row, end_row)
+        snapshot = await self._build(self._query_json, cells, sheet, columns, start_row, end_row)
+        if subscription is None:
+            subscription = Subscription({col.index for col in column_defs}, start_row, end_row)
+        self.change_feeds.subscribe(sheet, subscription)
+        return subscription, sse_event("snapshot", sheet.version_token, snapshot)
+
+    async def _subscription_events(self, sheet_id: str, columns: Optional[List[str]], start_row: int, end_row: int,
+                                   subscription: Subscription, snapshot: bytes) -> AsyncIterator[bytes]:
+        try:
+            yield snapshot
+            while True:
+                if not await subscription.wait(SUBSCRIPTION_KEEPALIVE):
+                    yield b": keepalive\n\n"
+                    continue
+
+                resync, update = subscription.take()
+                if resync:
+                    async with self.sheet_locks.read_async(sheet_id):
+                        sheet = await self.sheet_repository.get_by_id(sheet_id)
+                        if sheet is None:
+                            return
+                        # changes queued until now are part of the new snapshot
+                        self.change_feeds.unsubscribe(sheet_id, subscription)
+                        subscription.take()
+                        _, snapshot = await self._subscription_snapshot(sheet, columns, start_row, end_row, subscription)
+                    yield snapshot
+                elif update is not None:
+                    yield update
+        finally:
+            self.change_feeds.unsubscribe(sheet_id, subscription)
+
+    async def _stream_ndjson_async(self, sheet: Sheet) -> AsyncIterator[bytes]:
+        yield self._stream_header(sheet)
+
+        cells = sheet.iter_cells()
+        while True:
+            async with self.sheet_locks.read_async(sheet.id):
+                chunk = await self._offload(self._stream_chunk, cells)
+            if not chunk:
+                return
+            yield chunk
+
+    def _cell_count(self, sheet: Sheet) -> int:
+        """Cells in the sheet; columns still on disk (see sheet_file) count as large, since reading them is I/O."""
+        stores = sheet.column_stores
+        if len(stores) != dict.__len__(stores):
+            return OFFLOAD_MIN_CELLS
+        return sum(len(store) for store in dict.values(stores))
+
+    def _query_cell_count(self, sheet: Sheet, columns: Optional[List[str]], start_row: int, end_row: int) -> int:
+        """Upper bound on the cells a query returns."""
+        column_count = len(sheet.columns) if columns is None else len(columns)
+        return min(self._cell_count(sheet), column_count * (end_row - start_row + 1))
+
+    async def _build(self, function, cells: int, *args):
+        """Build a response of about cells cells inline, or on the executor from OFFLOAD_MIN_CELLS up."""
+        if cells < OFFLOAD_MIN_CELLS:
+            return function(*args)
+        return await self._offload(function, *args)
@@ -0,0 +1,26 @@
+import asyncio
+import functools
+from Models.sheet import Sheet
+from exceptions import NotFoundError
+
+
+class AsyncServiceMixin:
+    """
+    Shared by AsyncSheetService and AsyncCellService, ahead of their sync base in the
+    MRO: fetches sheets from an AsyncSheetRepository and runs work on self.executor.
+    """
+
+    async def _fetch_sheet_or_raise(self, sheet_id: str) -> Sheet:
+        sheet = await self.sheet_repository.get_by_id(sheet_id)
+        if not sheet:
+            raise NotFoundError(f"Sheet with id {sheet_id} not found")
+        return sheet
+
+    async def _offload(self, function, *args):
+        """Run function on the executor. When cancelled, still wait for it, so the sheet lock outlives the work."""
+        future = asyncio.get_running_loop().run_in_executor(self.executor, functools.partial(function, *args))
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            await asyncio.wait([future])
+            raise
@@ -1,156 +1,470 @@
-from typing import Any, Tuple, Optional
-import re
+from typing import Any, Dict, Iterable, List, Tuple, Optional
+from bisect import bisect_right
+from collections import deque
 from Repository.sheet_repository import SheetRepository
-from Models.sheet import ColumnType, Cell
+from locks import SheetLocks, sheet_locks as default_sheet_locks
+from subscriptions import ChangeFeeds, change_feeds as default_change_feeds
+from Models.sheet import Column, ColumnType, Cell, MAX_ROW, VALUE_VALIDATORS, buffer_values, make_cell_key, split_cell_key
+from sheet_csv import CsvImport
 from exceptions import NotFoundError, ValidationError
 
 class CellService:
-    def __init__(self, sheet_repository: SheetRepository):
+    def __init__(self, sheet_repository: SheetRepository, sheet_locks: Optional[SheetLocks] = None,
+                 change_feeds: Optional[ChangeFeeds] = None):
         self.sheet_repository = sheet_repository
+        self.sheet_locks = sheet_locks or default_sheet_locks
+        self.change_feeds = change_feeds or default_change_feeds
     
     def set_cell_value(self, sheet_id: str, column: str, row: int, value: Any) -> str:
-        sheet = self._get_sheet_or_raise(sheet_id)
+        with self.sheet_locks.write(sheet_id):
+            sheet = self._get_sheet_or_raise(sheet_id)
+            self._apply_cell_value(sheet, column, row, value)
+            self.sheet_repository.save(sheet)
+            self.change_feeds.publish(sheet)
+            return "Cell value set successfully"
+
+    def set_cell_values(self, sheet_id: str, cells: List[Tuple[str, int, Any]]) -> str:
+        """
+        Set many cells at once. Every value, lookup type and the combined lookup graph
+        are validated before anything is written, so either all cells are set or none.
+        When the same cell appears more than once, the last value wins.
+        """
+        with self.sheet_locks.write(sheet_id):
+            sheet = self._get_sheet_or_raise(sheet_id)
+            written = self._apply_cell_values(sheet, cells)
+            self.sheet_repository.save(sheet)
+            self.change_feeds.publish(sheet)
+            return f"{written} cell values set successfully"
+
+    def import_csv(self, sheet_id: str, chunks: Iterable[bytes], start_row: int = 1) -> str:
+        """
+        Write the cells of a CSV body (see CsvImport), given in chunks of bytes, from
+        start_row on. As with set_cell_values, either every cell is written or none.
+        """
+        with self.sheet_locks.write(sheet_id):
+            sheet = self._get_sheet_or_raise(sheet_id)
+            parsed = CsvImport(sheet, start_row)
+            for chunk in chunks:
+                parsed.feed(chunk)
+            parsed.close()
+            written = self._apply_import(sheet, parsed)
+            self.sheet_repository.save(sheet)
+            self.change_feeds.publish(sheet)
+            return f"{written} cell values imported successfully"
+
+    def set_column_values(self, sheet_id: str, column: str, start_row: int, values: List[Any]) -> str:
+        """
+        Set rows start_row.. of one column to values; a None leaves its cell as it is.
+        Validated as a whole and written a block slice at a time; as with
+        set_cell_values, either every value is written or none.
+        """
+        with self.sheet_locks.write(sheet_id):
+            sheet = self._get_sheet_or_raise(sheet_id)
+            written = self._apply_column_values(sheet, column, start_row, values)
+            self.sheet_repository.save(sheet)
+            self.change_feeds.publish(sheet)
+            return f"{written} cell values set successfully"
+
+    def _apply_cell_value(self, sheet, column: str, row: int, value: Any):
         column_def = self._get_column_definition(sheet, column)
-        
-        if self._is_lookup_string(value):
-            self._set_lookup_cell(sheet, column, row, value, column_def)
+        cell_key = self._get_cell_key(column_def, row)
+
+        lookup = self._parse_lookup_string(value)
+        if lookup:
+            self._set_lookup_cell(sheet, cell_key, column, value, lookup, column_def)
         else:
-            self._set_regular_cell(sheet, column, row, value, column_def)
+            self._set_regular_cell(sheet, cell_key, value, column_def)
+
+    def _apply_cell_values(self, sheet, cells: List[Tuple[str, int, Any]]) -> int:
+        """Validate and write the batch (see set_cell_values); return the number of cells written."""
+        writes: Dict[int, tuple] = {}
+        for column, row, value in cells:
+            column_def = self._get_column_definition(sheet, column)
+            cell_key = self._get_cell_key(column_def, row)
+            lookup = self._parse_lookup_string(value)
+            if lookup:
+                lookup_column, lookup_row = lookup
+                lookup_column_def = self._get_column_definition(sheet, lookup_column)
+                self._validate_lookup_types(lookup_column_def, column_def, lookup_column, column)
+                writes[cell_key] = (value, self._get_cell_key(lookup_column_def, lookup_row))
+            else:
+                self._validate_regular_value(value, column_def)
+                writes[cell_key] = (value, None)
+
+        self._check_batch_for_cycles(sheet, writes)
 
-        self.sheet_repository.save(sheet)
-        return "Cell value set successfully"
+        # With every overwritten edge gone first, each intermediate graph is a subgraph
+        # of the validated final one, so inserting the new edges one by one never fails
+        for cell_key in writes:
+            self._detach_lookup_edge(sheet, cell_key)
+
+        for cell_key, (value, target_key) in writes.items():
+            if target_key is not None:
+                self._check_for_cycles(sheet, cell_key, target_key)
+                self._write_lookup_cell(sheet, cell_key, value, target_key)
+            else:
+                self._write_regular_cell(sheet, cell_key, value)
+
+        self._refresh_resolved_values(sheet, writes.keys())
+        return len(writes)
     
+    def _apply_import(self, sheet, parsed: CsvImport) -> int:
+        """Validate and write a parsed CSV body; return the number of cells written."""
+        self._apply_runs(sheet, parsed.runs, parsed.formulas)
+        return parsed.cells
+
+    def _apply_column_values(self, sheet, column: str, start_row: int, values: List[Any]) -> int:
+        """Validate and write values to one column (see set_column_values); return the number of cells written."""
+        column_def = self._get_column_definition(sheet, column)
+        if start_row < 1:
+            raise ValidationError("Row number must be a positive integer (greater than 0)")
+        self._get_cell_key(column_def, start_row + len(values) - 1)
+
+        buffered = buffer_values(column_def.type, values)
+        if buffered is not None and (column_def.type != ColumnType.STRING or "(" not in "".join(buffered)):
+            if buffered:
+                self._apply_runs(sheet, {column_def.index: [(start_row, buffered)]}, [])
+            return len(buffered)
+
+        # None, strings that may be lookups and ints in a double column (kept as written,
+        # in the side table) split the values into runs; a run that does not fit the
+        # typed buffer is written one by one, as are the split values
+        runs: List[Tuple[int, Any]] = []
+        singles: List[Tuple[int, int, Any]] = []
+        split_ints = column_def.type == ColumnType.DOUBLE
+        splits = [offset for offset, value in enumerate(values)
+                  if value is None or (type(value) is str and "(" in value) or (split_ints and type(value) is int)]
+        run_start = 0
+        for offset in splits + [len(values)]:
+            if run_start < offset:
+                self._add_column_run(column_def, start_row + run_start, values[run_start:offset], runs, singles)
+            if offset < len(values) and values[offset] is not None:
+                singles.append((column_def.index, start_row + offset, values[offset]))
+            run_start = offset + 1
+
+        self._apply_runs(sheet, {column_def.index: runs}, singles)
+        return len(singles) + sum(len(run) for _, run in runs)
+
+    def _add_column_run(self, column_def: Column, start_row: int, values: List[Any],
+                        runs: List[Tuple[int, Any]], singles: List[Tuple[int, int, Any]]):
+        buffered = buffer_values(column_def.type, values)
+        if buffered is not None:
+            runs.append((start_row, buffered))
+        else:
+            singles.extend((column_def.index, row, value) for row, value in enumerate(values, start_row))
+
+    def _apply_runs(self, sheet, runs: Dict[int, List[Tuple[int, Any]]], singles: List[Tuple[int, int, Any]]):
+        """
+        Validate and write runs of values in buffer form, column index -> [(start row,
+        values)], a block slice at a time, and (column index, row, value) writes one by
+        one. Those may be lookups; they and the existing lookup cells the runs
+        overwrite go through the graph as one batch, as in _apply_cell_values.
+        """
+        writes: Dict[int, tuple] = {}
+        for column_index, row, value in singles:
+            column_def = self._get_column_definition(sheet, sheet.column_name(column_index))
+            cell_key = make_cell_key(column_index, row)
+            lookup = self._parse_lookup_string(value)
+            if lookup:
+                lookup_column, lookup_row = lookup
+                lookup_column_def = self._get_column_definition(sheet, lookup_column)
+                self._validate_lookup_types(lookup_column_def, column_def, lookup_column, column_def.name)
+                writes[cell_key] = (value, self._get_cell_key(lookup_column_def, lookup_row))
+            elif not column_def.validate(value):
+                raise ValidationError(
+                    f"Value type mismatch in {column_def.name}{row}. "
+                    f"Expected {column_def.type.value}, got {type(value).__name__}"
+                )
+            else:
+                writes[cell_key] = (value, None)
+
+        for column_index, column_runs in runs.items():
+            store = sheet.column_stores.get(column_index)
+            if store is None:
+                continue
+            for start_row, values in column_runs:
+                for row, cell in store.sparse_items(start_row, start_row + len(values) - 1):
+                    if cell.is_lookup:
+                        writes[make_cell_key(column_index, row)] = (None, None)
+
+        self._check_batch_for_cycles(sheet, writes)
+
+        for cell_key in writes:
+            self._detach_lookup_edge(sheet, cell_key)
+        for column_index, column_runs in runs.items():
+            for start_row, values in column_runs:
+                sheet.set_values(column_index, start_row, values)
+        for cell_key, (value, target_key) in writes.items():
+            if target_key is not None:
+                self._check_for_cycles(sheet, cell_key, target_key)
+                self._write_lookup_cell(sheet, cell_key, value, target_key)
+            elif value is not None:
+                self._write_regular_cell(sheet, cell_key, value)
+
+        self._refresh_resolved_values(sheet, list(writes) + self._looked_up_run_cells(sheet, runs))
+
+    def _looked_up_run_cells(self, sheet, runs: Dict[int, List[Tuple[int, Any]]]) -> List[int]:
+        """The cells written by the runs that other cells look up."""
+        run_starts = {column_index: [start_row for start_row, _ in column_runs] for column_index, column_runs in runs.items()}
+        looked_up = []
+        for target_key in sheet.dependents:
+            column_index, row = split_cell_key(target_key)
+            starts = run_starts.get(column_index)
+            if starts is None:
+                continue
+            position = bisect_right(starts, row) - 1
+            if position >= 0:
+                start_row, values = runs[column_index][position]
+                if row < start_row + len(values):
+                    looked_up.append(target_key)
+        return looked_up
+
     def _get_sheet_or_raise(self, sheet_id: str):
         sheet = self.sheet_repository.get_by_id(sheet_id)
         if not sheet:
             raise NotFoundError(f"Sheet with id {sheet_id} not found")
         return sheet
     
-    def _get_column_definition(self, sheet, column: str):
-        for col in sheet.columns:
-            if col["name"] == column:
-                return col
-        raise NotFoundError(f"Column '{column}' not found in sheet")
+    def _get_column_definition(self, sheet, column: str) -> Column:
+        column_def = sheet.get_column(column)
+        if column_def is None:
+            raise NotFoundError(f"Column '{column}' not found in sheet")
+        return column_def
+
+    def _get_cell_key(self, column_def: Column, row: int) -> int:
+        if row > MAX_ROW:
+            raise ValidationError(f"Row number must not exceed {MAX_ROW}")
+        return make_cell_key(column_def.index, row)
     
-    def _set_regular_cell(self, sheet, column: str, row: int, value: Any, column_def: dict):
-        expected_type = ColumnType(column_def["type"])
-        if not self._validate_value_type(value, expected_type):
-            raise ValidationError(f"Value type mismatch. Expected {expected_type.value}, got {type(value).__name__}")
-        
-        cell_key = f"{column}_{row}"
-        existing_dependents = []
-        if cell_key in sheet.cells:
-            existing_dependents = sheet.cells[cell_key].dependents.copy()
-
-        sheet.cells[cell_key] = Cell(value=value, dependents=existing_dependents)
-
-    def _set_lookup_cell(self, sheet, column: str, row: int, value: str, column_def: dict):
-        lookup_column, lookup_row = self._parse_lookup_string(value)
+    def _set_regular_cell(self, sheet, cell_key: int, value: Any, column_def: Column):
+        self._validate_regular_value(value, column_def)
+        self._write_regular_cell(sheet, cell_key, value)
+        self._propagate_resolved_value(sheet, cell_key)
+
+    def _validate_regular_value(self, value: Any, column_def: Column):
+        if not column_def.validate(value):
+            raise ValidationError(f"Value type mismatch. Expected {column_def.type.value}, got {type(value).__name__}")
+
+    def _write_regular_cell(self, sheet, cell_key: int, value: Any):
+        self._detach_lookup_edge(sheet, cell_key)
+        sheet.set_value(cell_key, value)
+
+    def _set_lookup_cell(self, sheet, cell_key: int, column: str, value: str, lookup: Tuple[str, int], column_def: Column):
+        lookup_column, lookup_row = lookup
         lookup_column_def = self._get_column_definition(sheet, lookup_column)
         self._validate_lookup_types(lookup_column_def, column_def, lookup_column, column)
-        self._check_for_cycles(sheet, column, row, lookup_column, lookup_row)
+        target_key = self._get_cell_key(lookup_column_def, lookup_row)
+        self._check_for_cycles(sheet, cell_key, target_key)
 
-        cell_key = f"{column}_{row}"
-        sheet.cells[cell_key] = Cell(
+        self._write_lookup_cell(sheet, cell_key, value, target_key)
+        self._propagate_resolved_value(sheet, cell_key)
+
+    def _write_lookup_cell(self, sheet, cell_key: int, value: str, target_key: int):
+        self._detach_lookup_edge(sheet, cell_key)
+
+        sheet.set_lookup_cell(cell_key, Cell(
             value=value,
-            is_lookup=True,
-            lookup_column=lookup_column,
-            lookup_row=str(lookup_row)
-        )
+            lookup_key=target_key,
+            resolved_value=sheet.get_resolved_value(target_key)
+        ))
 
-        self._add_dependency(sheet, lookup_column, lookup_row, column, row)
+        self._add_dependency(sheet, target_key, cell_key)
     
-    def _validate_lookup_types(self, lookup_column_def: dict, target_column_def: dict, lookup_column: str, target_column: str):
-        lookup_type = ColumnType(lookup_column_def["type"])
-        expected_type = ColumnType(target_column_def["type"])
+    def _validate_lookup_types(self, lookup_column_def: Column, target_column_def: Column, lookup_column: str, target_column: str):
+        lookup_type = lookup_column_def.type
+        expected_type = target_column_def.type
         if lookup_type != expected_type:
             raise ValidationError(
                 f"Type mismatch in lookup. Target column '{lookup_column}' is {lookup_type.value}, "
                 f"but current column '{target_column}' expects {expected_type.value}"
             )
     
-    def _add_dependency(self, sheet, lookup_column: str, lookup_row: int, dependent_column: str, dependent_row: int):
-        target_key = f"{lookup_column}_{lookup_row}"
-        if target_key in sheet.cells:
-            sheet.cells[target_key].dependents.append((dependent_column, dependent_row))
+    def _add_dependency(self, sheet, target_key: int, dependent_key: int):
+        sheet.add_dependency(target_key, dependent_key)
+
+    def _remove_dependency(self, sheet, target_key: int, dependent_key: int):
+        sheet.remove_dependency(target_key, dependent_key)
+
+    def _get_lookup_target(self, sheet, cell_key: int) -> Optional[int]:
+        return sheet.get_lookup_target(cell_key)
+
+    def _detach_lookup_edge(self, sheet, cell_key: int):
+        """Remove the cell's lookup edge from the graph; the cell itself is about to be replaced."""
+        cell = sheet.get_lookup_cell(cell_key)
+        if cell is not None:
+            self._remove_dependency(sheet, cell.lookup_key, cell_key)
+            cell.lookup_key = None
+
+    def _propagate_resolved_value(self, sheet, cell_key: int):
+        """Push the cell's resolved value and lookup source down to its transitive dependents."""
+        resolved_value = sheet.get_resolved_value(cell_key)
+        source_key = sheet.lookup_source(cell_key)
+        queue = deque([cell_key])
+        while queue:
+            current_key = queue.popleft()
+            for dependent_key in sheet.dependents.get(current_key, ()):
+                dependent = sheet.get_lookup_cell(dependent_key)
+                if dependent is None:
+                    continue
+                dependent.resolved_value = resolved_value
+                dependent.source_key = source_key
+                sheet.record_change(dependent_key)
+                queue.append(dependent_key)
+
+    def _refresh_resolved_values(self, sheet, cell_keys: Iterable[int]):
+        """Recompute the resolved values of the given cells and their transitive dependents in one pass."""
+        affected = set()
+        stack = list(cell_keys)
+        while stack:
+            cell_key = stack.pop()
+            if cell_key in affected:
+                continue
+            affected.add(cell_key)
+            stack.extend(sheet.dependents.get(cell_key, ()))
+
+        # Lookup targets sit before their dependents in the order, so they are refreshed first
+        order = sheet.topological_order
+        for cell_key in sorted(affected, key=lambda key: order.get(key, sheet.lowest_order - 1)):
+            cell = sheet.get_lookup_cell(cell_key)
+            if cell is not None:
+                cell.resolved_value = sheet.get_resolved_value(cell.lookup_key)
+                cell.source_key = sheet.lookup_source(cell.lookup_key)
+                sheet.record_change(cell_key)
+
+    def _check_batch_for_cycles(self, sheet, writes: Dict[int, tuple]):
+        """Walk every new lookup edge over the graph as it will look after the batch, visiting each cell once."""
+        def lookup_target(cell_key: int) -> Optional[int]:
+            if cell_key in writes:
+                return writes[cell_key][1]
+            return self._get_lookup_target(sheet, cell_key)
+
+        finished = set()
+        for start_key, (_, target_key) in writes.items():
+            if target_key is None:
+                continue
+            path = []
+            on_path = set()
+            cell_key = start_key
+            while cell_key is not None and cell_key not in finished:
+                if cell_key in on_path:
+                    cycle_size = len(path) - path.index(cell_key)
+                    raise ValidationError(f"cycle of size {cycle_size} - not allowed")
+                on_path.add(cell_key)
+                path.append(cell_key)
+                cell_key = lookup_target(cell_key)
+            finished.update(path)
     
-    def _check_for_cycles(self, sheet, column: str, row: int, lookup_column: str, lookup_row: int):
-        cycle_size = self._find_cycle_size(sheet, (lookup_column, lookup_row), (column, row))
+    def _check_for_cycles(self, sheet, cell_key: int, target_key: int):
+        """
+        Insert the lookup edge into the sheet's topological order (Pearce-Kelly).
+        Only edges that contradict the current order trigger a search, and that
+        search is limited to the window of the order between the two cells.
+        """
+        order = sheet.topological_order
+
+        if target_key not in order:
+            order[target_key] = self._next_low_order(sheet)
+        if cell_key not in order:
+            order[cell_key] = self._next_high_order(sheet)
+
+        if cell_key != target_key:
+            if order[target_key] < order[cell_key]:
+                return
+            # Nothing depends on the cell, so it can simply move to the end of the order
+            if not sheet.dependents.get(cell_key):
+                order[cell_key] = self._next_high_order(sheet)
+                return
+            # The target looks nothing up, so it can simply move to the front of the order
+            if sheet.get_lookup_cell(target_key) is None:
+                order[target_key] = self._next_low_order(sheet)
+                return
+
+        lower_bound = order[cell_key]
+        lookup_chain = []
+        cycle_size = self._find_cycle_size(sheet, target_key, cell_key, lower_bound, lookup_chain)
         if cycle_size > 0:
             raise ValidationError(f"cycle of size {cycle_size} - not allowed")
+
+        upper_bound = order[target_key]
+        affected_dependents = set()
+        self._collect_dependents_in_window(sheet, cell_key, upper_bound, affected_dependents)
+        self._reorder(sheet, lookup_chain, list(affected_dependents))
+
+    def _next_low_order(self, sheet) -> int:
+        sheet.lowest_order -= 1
+        return sheet.lowest_order
+
+    def _next_high_order(self, sheet) -> int:
+        sheet.highest_order += 1
+        return sheet.highest_order
+
+    def _collect_dependents_in_window(self, sheet, cell_key: int, upper_bound: int, found: set):
+        """Collect the cell and its transitive dependents that sit before upper_bound in the order."""
+        order = sheet.topological_order
+        stack = [cell_key]
+        while stack:
+            current_key = stack.pop()
+            if current_key in found or order[current_key] >= upper_bound:
+                continue
+            found.add(current_key)
+            stack.extend(sheet.dependents.get(current_key, ()))
+
+    def _reorder(self, sheet, lookup_chain: List[int], affected_dependents: List[int]):
+        """Move the target's lookup chain ahead of the cell's dependents, reusing their order slots."""
+        order = sheet.topological_order
+        lookup_chain.sort(key=order.__getitem__)
+        affected_dependents.sort(key=order.__getitem__)
+        keys = lookup_chain + affected_dependents
+        slots = sorted(order[key] for key in keys)
+        for key, slot in zip(keys, slots):
+            order[key] = slot
     
-    def _find_cycle_size(self, sheet, start: tuple, target: tuple) -> int:
-        """Find cycle size using DFS. Returns 0 if no cycle found."""
-        visited = set()
-        path = []
-        return self._dfs_cycle(sheet, start, target, visited, path)
-    
-    def _dfs_cycle(self, sheet, current: tuple, target: tuple, visited: set, path: list) -> int:
-        """DFS helper to detect cycles."""
-        if current == target:
-            return len(path) + 1
-        
-        if current in visited:
-            return 0
-        
-        visited.add(current)
-        path.append(current)
-
-        current_col, current_row = current
-        cell_key = f"{current_col}_{current_row}"
-        
-        if cell_key in sheet.cells:
-            cell = sheet.cells[cell_key]
-            if cell.is_lookup and cell.lookup_column and cell.lookup_row:
-                next_cell = (cell.lookup_column, int(cell.lookup_row))
-                cycle_size = self._dfs_cycle(sheet, next_cell, target, visited, path)
-                if cycle_size > 0:
-                    return cycle_size
-        
-        path.pop()
-        return 0
+    def _find_cycle_size(self, sheet, start_key: int, target_key: int, lower_bound: int, lookup_chain: List[int]) -> int:
+        """
+        Walk the lookup chain from start_key within the affected window of the order,
+        recording the walked cell keys in lookup_chain. Every cell looks up at most one
+        other cell and the order strictly decreases along the chain, so the walk is a
+        loop rather than a recursive DFS. Returns 0 if no cycle found.
+        """
+        order = sheet.topological_order
+        path_length = 0
+        cell_key = start_key
+        while cell_key != target_key:
+            # Everything the lookup chain reaches from here sits before the target in the order
+            if cell_key is None or order.get(cell_key, lower_bound) < lower_bound:
+                return 0
+
+            lookup_chain.append(cell_key)
+            path_length += 1
+            cell_key = self._get_lookup_target(sheet, cell_key)
+
+        return path_length + 1
     
     def _resolve_cell_value(self, sheet, column: str, row: int) -> Any:
-        """Resolve the actual value of a cell, following lookup chains."""
-        cell_key = f"{column}_{row}"
-        
-        if cell_key not in sheet.cells:
-            return None
-        
-        cell = sheet.cells[cell_key]
-        
-        if not cell.is_lookup:
-            return cell.value
-        
-        if cell.lookup_column and cell.lookup_row:
-            return self._resolve_cell_value(sheet, cell.lookup_column, int(cell.lookup_row))
-        
-        return None
+        """Resolve the actual value of a cell through its lookup source shortcut."""
+        return sheet.get_resolved_value(sheet.lookup_source(sheet.cell_key(column, row)))
     
     def _parse_lookup_string(self, value: str) -> Optional[Tuple[str, int]]:
-        if not isinstance(value, str):
+        """
+        Parse `lookup(column,row)`: an ASCII column name and decimal row, surrounding
+        whitespace allowed. Hand-written, as this runs for every value written and most
+        values are rejected at the first check.
+        """
+        if not isinstance(value, str) or "(" not in value:
+            return None
+
+        value = value.strip()
+        if not value.startswith("lookup(") or not value.endswith(")"):
+            return None
+        column, comma, row = value[7:-1].partition(",")
+        if not comma or not column.isascii() or not column.isalpha() or not row.isdecimal():
             return None
-        
-        pattern = r'^lookup\(([A-Za-z]+),(\d+)\)$'
-        match = re.match(pattern, value.strip())
-        
-        if match:
-            column = match.group(1).upper()
-            row = int(match.group(2))
-            return (column, row)
-        
-        return None
+
+        return (column.upper(), int(row))
     
     def _is_lookup_string(self, value: str) -> bool:
         return self._parse_lookup_string(value) is not None
     
     def _validate_value_type(self, value: Any, expected_type: ColumnType) -> bool:
-        if expected_type == ColumnType.BOOLEAN:
-            return isinstance(value, bool)
-        elif expected_type == ColumnType.INT:
-            return isinstance(value, int)
-        elif expected_type == ColumnType.DOUBLE:
-            return isinstance(value, (int, float))
-        elif expected_type == ColumnType.STRING:
-            return isinstance(value, str)
-        return False
\ No newline at end of file
+        validator = VALUE_VALIDATORS.get(expected_type)
+        return validator is not None and validator(value)
\ No newline at end of file
@@ -1,49 +1,377 @@
-from typing import List, Dict
-from Models.sheet import Sheet
+from typing import Any, Iterator, List, Dict, Optional, Tuple
+import csv
+import io
+import itertools
+from operator import itemgetter
+from Models.sheet import BLOCK_SIZE, Column, Sheet, MAX_ROW, make_cell_key, split_cell_key
 from Repository.sheet_repository import SheetRepository
-from Schemas.sheet_schemas import GetSheetResponse, ColumnRequest
+from locks import SheetLocks, sheet_locks as default_sheet_locks
+from Schemas.sheet_schemas import GetSheetResponse, GetSheetPageResponse, ColumnRequest
 from Schemas.cell_schemas import CellData
-from exceptions import NotFoundError
+from exceptions import NotFoundError, ValidationError
+from sheet_csv import MISSING_FIELD, csv_text, format_value, format_values
+import serialization
+
+# Cells per chunk written to a streamed response
+STREAM_CHUNK_SIZE = 1000
+
+# Rows per chunk of a CSV export
+EXPORT_CHUNK_ROWS = 4 * BLOCK_SIZE
 
 class SheetService:
-    def __init__(self, sheet_repository: SheetRepository):
+    def __init__(self, sheet_repository: SheetRepository, sheet_locks: Optional[SheetLocks] = None,
+                 response_cache: Optional[serialization.ResponseCache] = None):
         self.sheet_repository = sheet_repository
+        self.sheet_locks = sheet_locks or default_sheet_locks
+        self.response_cache = response_cache or serialization.ResponseCache()
     
-    def create_sheet(self, columns: List[Dict[str, str]]) -> str:
-        sheet = Sheet(columns)
+    def create_sheet(self, columns: List[Dict[str, str]], sheet_id: Optional[str] = None) -> str:
+        sheet = Sheet(columns, sheet_id=sheet_id)
         sheet_id = self.sheet_repository.save(sheet)
         return sheet_id
     
     def get_sheet_by_id(self, sheet_id: str) -> GetSheetResponse:
-        sheet = self.sheet_repository.get_by_id(sheet_id)
-        if not sheet:
-            raise NotFoundError(f"Sheet with id {sheet_id} not found")
+        with self.sheet_locks.read(sheet_id):
+            return self._sheet_response(self._get_sheet_or_raise(sheet_id))
+
+    def get_sheet_page(self, sheet_id: str, cursor: Optional[str] = None, limit: int = 1000) -> GetSheetPageResponse:
+        """
+        Return up to limit cells, column by column in row order, starting at cursor.
+        next_cursor is None once the last cell has been returned.
+        """
+        with self.sheet_locks.read(sheet_id):
+            return self._page_response(self._get_sheet_or_raise(sheet_id), cursor, limit)
+
+    def query_sheet(self, sheet_id: str, columns: Optional[List[str]] = None,
+                    start_row: int = 1, end_row: int = MAX_ROW) -> GetSheetResponse:
+        """
+        Return only the cells of the given columns (all columns when None) whose row lies
+        in [start_row, end_row]. Cells outside the range are never read.
+        """
+        with self.sheet_locks.read(sheet_id):
+            return self._query_response(self._get_sheet_or_raise(sheet_id), columns, start_row, end_row)
+
+    def get_sheet_json(self, sheet_id: str) -> bytes:
+        """
+        get_sheet_by_id encoded straight to JSON bytes. The cells are read a block at a
+        time and never turned into CellData models; the output is the same document.
+        """
+        return self.get_sheet_json_if_changed(sheet_id)[1]
+
+    def get_sheet_json_if_changed(self, sheet_id: str, if_none_match: Optional[str] = None) -> Tuple[str, Optional[bytes]]:
+        """
+        Return (etag, body) for a conditional GET: body is None when if_none_match (an
+        If-None-Match header) already names the sheet's current version. Bodies are
+        cached per version, so repeated reads of an unchanged sheet are not re-encoded.
+        """
+        with self.sheet_locks.read(sheet_id):
+            sheet = self._get_sheet_or_raise(sheet_id)
+            etag = self._sheet_etag(sheet)
+            if self._etag_matches(if_none_match, etag):
+                return etag, None
+            body = self.response_cache.get(sheet.id, etag)
+            if body is None:
+                body = self._sheet_json(sheet)
+                self.response_cache.put(sheet.id, etag, body)
+            return etag, body
+
+    def get_sheet_page_json(self, sheet_id: str, cursor: Optional[str] = None, limit: int = 1000) -> bytes:
+        """get_sheet_page encoded straight to JSON bytes."""
+        with self.sheet_locks.read(sheet_id):
+            return self._page_json(self._get_sheet_or_raise(sheet_id), cursor, limit)
+
+    def query_sheet_json(self, sheet_id: str, columns: Optional[List[str]] = None,
+                         start_row: int = 1, end_row: int = MAX_ROW) -> bytes:
+        """query_sheet encoded straight to JSON bytes."""
+        with self.sheet_locks.read(sheet_id):
+            return self._query_json(self._get_sheet_or_raise(sheet_id), columns, start_row, end_row)
+
+    def get_sheet_changes_json(self, sheet_id: str, since: Optional[str] = None) -> bytes:
+        """
+        The cells changed after the version since (an earlier response's version, or its
+        ETag) with their current values, encoded as JSON; a removed cell has a null value.
+        Changes include lookup cells whose resolved value changed through their chain.
+        When since is None, comes from another copy of the sheet, or is older than the
+        change log reaches, every cell is returned instead and snapshot is true.
+        """
+        with self.sheet_locks.read(sheet_id):
+            sheet = self._get_sheet_or_raise(sheet_id)
+            return self._changes_json(sheet, self._changed_keys(sheet, since))
+
+    def get_cell_dependents_json(self, sheet_id: str, column: str, row: int, transitive: bool = False) -> bytes:
+        """
+        The cells that look up the given cell, in column and row order, encoded as JSON;
+        with transitive, every cell whose value comes from it through a lookup chain.
+        The cell itself need not have been written.
+        """
+        with self.sheet_locks.read(sheet_id):
+            sheet = self._get_sheet_or_raise(sheet_id)
+            return self._dependents_json(sheet, column, row, transitive, self._dependent_keys(sheet, column, row, transitive))
+
+    def export_csv(self, sheet_id: str, start_row: int = 1, end_row: Optional[int] = None,
+                   resolved: bool = False) -> Iterator[bytes]:
+        """
+        The sheet as CSV chunks, as export_csv_chunk returns them one after another.
+        The read lock is held per chunk, as in stream_sheet.
+        """
+        chunk, next_row = self.export_csv_chunk(sheet_id, start_row, end_row, resolved)
+        yield chunk
+        while next_row is not None:
+            chunk, next_row = self.export_csv_chunk(sheet_id, next_row, end_row, resolved, header=False)
+            yield chunk
 
+    def export_csv_chunk(self, sheet_id: str, start_row: int = 1, end_row: Optional[int] = None,
+                         resolved: bool = False, header: bool = True) -> Tuple[bytes, Optional[int]]:
+        """
+        Up to EXPORT_CHUNK_ROWS rows of the sheet from start_row as CSV lines, one field
+        per column and an empty field for an empty cell, preceded by a header line of
+        the column names when header is set; and the row to continue from, or None once
+        end_row (the sheet's last non-empty row when None) is reached. Lookup cells
+        export the lookup as written, or their resolved value with resolved, so a plain
+        export imports back into the same cells.
+        """
+        with self.sheet_locks.read(sheet_id):
+            return self._csv_chunk(self._get_sheet_or_raise(sheet_id), start_row, end_row, resolved, header)
+
+    def stream_sheet(self, sheet_id: str) -> Iterator[bytes]:
+        """
+        Return the sheet as NDJSON chunks: a header line with the sheet id and columns,
+        then one line per cell. Cells are produced lazily, so memory stays constant.
+        The read lock is held per chunk, so a slow client never holds writers back.
+        """
+        with self.sheet_locks.read(sheet_id):
+            sheet = self._get_sheet_or_raise(sheet_id)
+        return self._stream_ndjson(sheet)
+
+    def _stream_ndjson(self, sheet: Sheet) -> Iterator[bytes]:
+        yield self._stream_header(sheet)
+
+        cells = sheet.iter_cells()
+        while True:
+            with self.sheet_locks.read(sheet.id):
+                chunk = self._stream_chunk(cells)
+            if not chunk:
+                return
+            yield chunk
+
+    def _sheet_response(self, sheet: Sheet) -> GetSheetResponse:
         columns = [ColumnRequest(name=col["name"], type=col["type"]) for col in sheet.columns]
 
-        # Convert cells to CellData format with resolved values
-        cell_service = self._get_cell_service()
-        
+        # Convert cells to CellData format with their materialized resolved values
         cells = []
-        for cell_key, cell in sheet.cells.items():
-            column_name, row_str = cell_key.split("_")
-            
-            # Resolve the actual value (follows lookup chains)
-            resolved_value = cell_service._resolve_cell_value(sheet, column_name, int(row_str))
-            
+        for column_name, row, resolved_value in sheet.iter_cells():
             cells.append(CellData(
                 column=column_name,
-                row=int(row_str),
+                row=row,
                 value=resolved_value
             ))
-        
+
         return GetSheetResponse(
             sheet_id=sheet.id,
             columns=columns,
             cells=cells
         )
-    
-    def _get_cell_service(self):
-        """Create a CellService instance to avoid circular imports. couldnt find a better solution :( """
-        from Services.cell_service import CellService
-        return CellService(self.sheet_repository)
\ No newline at end of file
+
+    def _page_response(self, sheet: Sheet, cursor: Optional[str], limit: int) -> GetSheetPageResponse:
+        columns = [ColumnRequest(name=col["name"], type=col["type"]) for col in sheet.columns]
+        page, next_cursor = self._page_cells(sheet, cursor, limit)
+
+        return GetSheetPageResponse(
+            sheet_id=sheet.id,
+            columns=columns,
+            cells=[CellData(column=column_name, row=row, value=value) for column_name, row, value in page],
+            next_cursor=next_cursor
+        )
+
+    def _query_response(self, sheet: Sheet, columns: Optional[List[str]], start_row: int, end_row: int) -> GetSheetResponse:
+        columns, column_defs = self._query_columns(sheet, columns, start_row, end_row)
+
+        return GetSheetResponse(
+            sheet_id=sheet.id,
+            columns=[ColumnRequest(name=col.name, type=col.type.value) for col in column_defs],
+            cells=[
+                CellData(column=column_name, row=row, value=value)
+                for column_name, row, value in sheet.iter_range(columns, start_row, end_row)
+            ]
+        )
+
+    def _sheet_json(self, sheet: Sheet) -> bytes:
+        return serialization.dumps({
+            "sheet_id": sheet.id,
+            "columns": [{"name": col["name"], "type": col["type"]} for col in sheet.columns],
+            "cells": self._cell_dicts(sheet.column_items())
+        })
+
+    def _page_json(self, sheet: Sheet, cursor: Optional[str], limit: int) -> bytes:
+        page, next_cursor = self._page_cells(sheet, cursor, limit)
+        return serialization.dumps({
+            "sheet_id": sheet.id,
+            "columns": [{"name": col["name"], "type": col["type"]} for col in sheet.columns],
+            "cells": [{"column": column_name, "row": row, "value": value} for column_name, row, value in page],
+            "next_cursor": next_cursor
+        })
+
+    def _query_json(self, sheet: Sheet, columns: Optional[List[str]], start_row: int, end_row: int) -> bytes:
+        columns, column_defs = self._query_columns(sheet, columns, start_row, end_row)
+        return serialization.dumps({
+            "sheet_id": sheet.id,
+            "columns": [{"name": col.name, "type": col.type.value} for col in column_defs],
+            "cells": self._cell_dicts(sheet.column_items(columns, start_row, end_row))
+        })
+
+    def _changes_json(self, sheet: Sheet, changed: Optional[List[int]]) -> bytes:
+        if changed is None:
+            cells = self._cell_dicts(sheet.column_items())
+        else:
+            cells = []
+            for cell_key in changed:
+                column_index, row = split_cell_key(cell_key)
+                cells.append({"column": sheet.column_name(column_index), "row": row, "value": sheet.get_resolved_value(cell_key)})
+        return serialization.dumps({
+            "sheet_id": sheet.id,
+            "columns": [{"name": col["name"], "type": col["type"]} for col in sheet.columns],
+            "cells": cells,
+            "version": sheet.version_token,
+            "snapshot": changed is None
+        })
+
+    def _changed_keys(self, sheet: Sheet, since: Optional[str]) -> Optional[List[int]]:
+        """Cell keys changed after the version token since, or None when a full snapshot is needed."""
+        if since is None:
+            return None
+        epoch, _, version = since.strip().strip('"').rpartition("-")
+        if not epoch or not version.isdigit():
+            raise ValidationError(f"Invalid version: {since}")
+        if epoch != sheet.version_epoch:
+            return None
+        return sheet.changes_since(int(version))
+
+    def _dependents_json(self, sheet: Sheet, column: str, row: int, transitive: bool, dependent_keys: List[int]) -> bytes:
+        dependents = []
+        for cell_key in dependent_keys:
+            column_index, dependent_row = split_cell_key(cell_key)
+            dependents.append({"column": sheet.column_name(column_index), "row": dependent_row})
+        return serialization.dumps({
+            "sheet_id": sheet.id, "column": column, "row": row, "transitive": transitive, "dependents": dependents
+        })
+
+    def _dependent_keys(self, sheet: Sheet, column: str, row: int, transitive: bool) -> List[int]:
+        column_def = sheet.get_column(column)
+        if column_def is None:
+            raise NotFoundError(f"Column '{column}' not found in sheet")
+        if not 1 <= row <= MAX_ROW:
+            raise ValidationError(f"Row number must be between 1 and {MAX_ROW}")
+        cell_key = make_cell_key(column_def.index, row)
+        if transitive:
+            return sorted(sheet.transitive_dependents(cell_key))
+        return sorted(sheet.dependents.get(cell_key, ()))
+
+    def _csv_chunk(self, sheet: Sheet, start_row: int, end_row: Optional[int], resolved: bool,
+                   header: bool) -> Tuple[bytes, Optional[int]]:
+        if not 1 <= start_row <= MAX_ROW:
+            raise ValidationError(f"start_row must be between 1 and {MAX_ROW}")
+        if end_row is None:
+            end_row = sheet.last_row()
+        elif end_row < start_row:
+            raise ValidationError("start_row must not exceed end_row")
+        output = io.StringIO(newline="")
+        writer = csv.writer(output, lineterminator="\n")
+        if header:
+            writer.writerow([col["name"] for col in sheet.columns])
+
+        last_row = min(end_row, start_row + EXPORT_CHUNK_ROWS - 1)
+        row_count = last_row - start_row + 1
+        if row_count > 0:
+            writer.writerows(zip(*(
+                self._csv_fields(sheet, column_index, start_row, last_row, resolved) for column_index in range(len(sheet.columns))
+            )))
+        next_row = last_row + 1 if last_row < end_row else None
+        return csv_text(output.getvalue()).encode(), next_row
+
+    def _csv_fields(self, sheet: Sheet, column_index: int, start_row: int, last_row: int, resolved: bool) -> List[str]:
+        """The column's CSV fields for rows start_row..last_row, formatted a whole column at a time."""
+        row_count = last_row - start_row + 1
+        store = sheet.column_stores.get(column_index)
+        if store is None:
+            return [MISSING_FIELD] * row_count
+        items = store.item_list(start_row, last_row)
+        if len(items) == row_count:
+            fields = format_values(store.type, list(map(itemgetter(1), items)))
+        else:
+            fields = [MISSING_FIELD] * row_count
+            for (row, _), field in zip(items, format_values(store.type, [value for _, value in items])):
+                fields[row - start_row] = field
+        for row, cell in store.sparse_items(start_row, last_row):
+            fields[row - start_row] = cell.value if cell.is_lookup and not resolved else format_value(cell.resolved_value)
+        return fields
+
+    def _cell_dicts(self, column_items: Iterator[Tuple[str, List[Tuple[int, Any]]]]) -> List[Dict[str, Any]]:
+        cells = []
+        for column_name, items in column_items:
+            cells.extend([{"column": column_name, "row": row, "value": value} for row, value in items])
+        return cells
+
+    def _page_cells(self, sheet: Sheet, cursor: Optional[str], limit: int) -> Tuple[List[Tuple[str, int, Any]], Optional[str]]:
+        """Up to limit cells starting at cursor, and the cursor of the cell after them (None at the end)."""
+        page = list(itertools.islice(sheet.iter_cells(self._parse_cursor(cursor)), limit + 1))
+
+        next_cursor = None
+        if len(page) > limit:
+            column_name, row, _ = page.pop()
+            next_cursor = str(sheet.cell_key(column_name, row))
+        return page, next_cursor
+
+    def _query_columns(self, sheet: Sheet, columns: Optional[List[str]], start_row: int, end_row: int) -> Tuple[List[str], List[Column]]:
+        """Validate a query: the requested column names (all when None) and their definitions."""
+        if start_row > end_row:
+            raise ValidationError("start_row must not exceed end_row")
+
+        if columns is None:
+            columns = [col["name"] for col in sheet.columns]
+        column_defs = []
+        for column in columns:
+            column_def = sheet.get_column(column)
+            if column_def is None:
+                raise NotFoundError(f"Column '{column}' not found in sheet")
+            column_defs.append(column_def)
+        return columns, column_defs
+
+    def _sheet_etag(self, sheet: Sheet) -> str:
+        return f'"{sheet.version_token}"'
+
+    def _etag_matches(self, if_none_match: Optional[str], etag: str) -> bool:
+        """Weak comparison against an If-None-Match list, as conditional GETs use."""
+        if not if_none_match:
+            return False
+        for candidate in if_none_match.split(","):
+            candidate = candidate.strip()
+            if candidate.startswith("W/"):
+                candidate = candidate[2:]
+            if candidate == "*" or candidate == etag:
+                return True
+        return False
+
+    def _stream_header(self, sheet: Sheet) -> bytes:
+        header = {"sheet_id": sheet.id, "columns": [{"name": col["name"], "type": col["type"]} for col in sheet.columns]}
+        return serialization.dumps(header) + b"\n"
+
+    def _stream_chunk(self, cells: Iterator[Tuple[str, int, Any]]) -> bytes:
+        """The next STREAM_CHUNK_SIZE cells as NDJSON lines; empty once cells is exhausted."""
+        chunk = [
+            serialization.dumps({"column": column_name, "row": row, "value": value})
+            for column_name, row, value in itertools.islice(cells, STREAM_CHUNK_SIZE)
+        ]
+        return b"\n".join(chunk) + b"\n" if chunk else b""
+
+    def _get_sheet_or_raise(self, sheet_id: str) -> Sheet:
+        sheet = self.sheet_repository.get_by_id(sheet_id)
+        if not sheet:
+            raise NotFoundError(f"Sheet with id {sheet_id} not found")
+        return sheet
+
+    def _parse_cursor(self, cursor: Optional[str]) -> int:
+        if cursor is None:
+            return 0
+        if not cursor.isdigit() or int(cursor) >> 32 > MAX_ROW:
+            raise ValidationError(f"Invalid cursor: {cursor}")
+        return int(cursor)
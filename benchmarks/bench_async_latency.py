@@ -0,0 +1,166 @@
+"""
+Request latency benchmark: async handlers against the former sync ones.
+
+Starts the API under uvicorn, once as main:app (async routers and services) and
+once as sync_app below (sync handlers calling CellService / SheetService, as the
+routers did before), then opens C concurrent keep-alive connections. Each one
+repeatedly writes a cell of one of the sheets and, every fifth request, reads a
+100-cell page. Reports throughput and p50 / p99 / max latency per app.
+
+Sync handlers each take a threadpool slot (40 by default), so under many
+connections requests queue for a thread; with SHEET_DATA_DIR set every sync write
+also holds its thread until its group commit is fsynced.
+
+Run from the repository root:
+    python -m benchmarks.bench_async_latency --connections 1000 --requests 20000
+    SHEET_DATA_DIR=/tmp/anchor-bench python -m benchmarks.bench_async_latency
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import time
+from typing import List, Optional
+
+from fastapi import Depends, FastAPI, HTTPException, Query
+
+from dependencies import get_sheet_repository
+from exceptions import NotFoundError, ValidationError
+from Repository.sheet_repository import SheetRepository
+from Schemas.cell_schemas import SetCellRequest, SetCellResponse
+from Schemas.sheet_schemas import CreateSheetRequest, CreateSheetResponse, GetSheetPageResponse
+from Services.cell_service import CellService
+from Services.sheet_service import SheetService
+
+sync_app = FastAPI()
+
+
+@sync_app.post("/sheets", response_model=CreateSheetResponse)
+def create_sheet(request: CreateSheetRequest, repo: SheetRepository = Depends(get_sheet_repository)):
+    sheet_id = SheetService(repo).create_sheet([{"name": col.name, "type": col.type} for col in request.columns])
+    return CreateSheetResponse(sheet_id=sheet_id, message="Sheet created successfully")
+
+
+@sync_app.get("/sheets/{sheet_id}/cells", response_model=GetSheetPageResponse)
+def get_sheet_page(sheet_id: str, cursor: Optional[str] = None, limit: int = Query(1000, ge=1, le=10000),
+                   repo: SheetRepository = Depends(get_sheet_repository)):
+    try:
+        return SheetService(repo).get_sheet_page(sheet_id, cursor=cursor, limit=limit)
+    except NotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@sync_app.put("/cells/sheets/{sheet_id}", response_model=SetCellResponse)
+def set_cell(sheet_id: str, request: SetCellRequest, repo: SheetRepository = Depends(get_sheet_repository)):
+    try:
+        return SetCellResponse(message=CellService(repo).set_cell_value(sheet_id, request.column, request.row, request.value))
+    except NotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+async def request(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, method: str, path: str,
+                  body: Optional[dict] = None) -> bytes:
+    payload = json.dumps(body).encode() if body is not None else b""
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: bench\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(payload)}\r\n\r\n".encode() + payload
+    )
+    headers = await reader.readuntil(b"\r\n\r\n")
+    status = int(headers.split(b" ", 2)[1])
+    length = 0
+    for line in headers.split(b"\r\n"):
+        if line.lower().startswith(b"content-length:"):
+            length = int(line.split(b":", 1)[1])
+    response = await reader.readexactly(length)
+    if status != 200:
+        raise RuntimeError(f"{method} {path} returned {status}: {response[:200]!r}")
+    return response
+
+
+async def drive(port: int, connections: int, requests: int, sheets: int) -> List[float]:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    sheet_ids = []
+    for _ in range(sheets):
+        created = await request(reader, writer, "POST", "/sheets", {"columns": [{"name": "A", "type": "int"}]})
+        sheet_ids.append(json.loads(created)["sheet_id"])
+    writer.close()
+
+    latencies: List[float] = []
+    per_connection = requests // connections
+
+    async def connection(number: int):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        for count in range(per_connection):
+            sheet_id = sheet_ids[(number + count) % sheets]
+            started = time.perf_counter()
+            if count % 5 == 4:
+                await request(reader, writer, "GET", f"/sheets/{sheet_id}/cells?limit=100")
+            else:
+                await request(reader, writer, "PUT", f"/cells/sheets/{sheet_id}",
+                              {"column": "A", "row": number * per_connection + count + 1, "value": count})
+            latencies.append(time.perf_counter() - started)
+        writer.close()
+
+    await asyncio.gather(*(connection(number) for number in range(connections)))
+    return latencies
+
+
+def free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def run(app: str, connections: int, requests: int, sheets: int):
+    data_dir = os.environ.get("SHEET_DATA_DIR")
+    if data_dir:
+        shutil.rmtree(data_dir, ignore_errors=True)
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app, "--port", str(port), "--log-level", "warning", "--backlog", "4096"]
+    )
+    try:
+        for _ in range(200):
+            try:
+                socket.create_connection(("127.0.0.1", port)).close()
+                break
+            except OSError:
+                time.sleep(0.05)
+
+        started = time.perf_counter()
+        latencies = sorted(asyncio.run(drive(port, connections, requests, sheets)))
+        elapsed = time.perf_counter() - started
+    finally:
+        server.terminate()
+        server.wait()
+
+    def percentile(fraction: float) -> float:
+        return latencies[min(int(len(latencies) * fraction), len(latencies) - 1)] * 1e3
+
+    print(
+        f"{app:>40} | {len(latencies) / elapsed:7.0f} requests/s | p50 {percentile(0.5):7.1f} ms"
+        f" | p99 {percentile(0.99):7.1f} ms | max {latencies[-1] * 1e3:7.1f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--connections", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--sheets", type=int, default=100)
+    args = parser.parse_args()
+
+    print(f"{args.connections} connections, {args.requests} requests, "
+          f"{'durable' if os.environ.get('SHEET_DATA_DIR') else 'in-memory'} storage")
+    for app in ["benchmarks.bench_async_latency:sync_app", "main:app"]:
+        run(app, args.connections, args.requests, args.sheets)
+
+
+if __name__ == "__main__":
+    main()
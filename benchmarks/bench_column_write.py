@@ -0,0 +1,76 @@
+"""
+Column write benchmark.
+
+Writes rows 1..N of one column of an empty sheet and times:
+  - column: one CellService.set_column_values call with the N values, validated
+    together and written a block slice at a time;
+  - batch:  the same cells through set_cell_values (up to --batch-max cells);
+  - single: one set_cell_value call per cell, as a client without a batch API
+    would (up to --single-max cells, extrapolated to N).
+Runs once per column type, with one lookup per 100 rows when --lookups is given.
+
+Run from the repository root:
+    python -m benchmarks.bench_column_write --cells 100000 1000000 10000000
+"""
+import argparse
+import time
+
+from Models.sheet import Sheet
+from Repository.sheet_repository import SheetRepository
+from Services.cell_service import CellService
+
+VALUES = {
+    "int": lambda row: row * 7,
+    "double": lambda row: row / 4,
+    "boolean": lambda row: row % 3 == 0,
+    "string": lambda row: f"value {row}",
+}
+
+
+def build_values(column_type: str, cells: int, lookups: bool):
+    value = VALUES[column_type]
+    return [f"lookup(A,{row - 1})" if lookups and row % 100 == 0 else value(row) for row in range(1, cells + 1)]
+
+
+def timed(function, *args) -> float:
+    started = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cells", type=int, nargs="+", default=[100_000, 1_000_000, 10_000_000])
+    parser.add_argument("--types", nargs="+", default=list(VALUES), choices=list(VALUES))
+    parser.add_argument("--lookups", action="store_true", help="make every 100th value a lookup of the row above")
+    parser.add_argument("--batch-max", type=int, default=1_000_000, help="largest size also written through set_cell_values")
+    parser.add_argument("--single-max", type=int, default=100_000, help="cells written one call each, extrapolated to --cells")
+    args = parser.parse_args()
+
+    for column_type in args.types:
+        for cells in args.cells:
+            values = build_values(column_type, cells, args.lookups)
+            repository = SheetRepository()
+            service = CellService(repository)
+
+            def empty_sheet() -> str:
+                sheet = Sheet([{"name": "A", "type": column_type}])
+                repository.save(sheet)
+                return sheet.id
+
+            column_time = timed(service.set_column_values, empty_sheet(), "A", 1, values)
+            line = f"{column_type:>7} | {cells:>9} cells | column {column_time:7.2f} s {cells / column_time:12,.0f} cells/s"
+            if cells <= args.batch_max:
+                batch = [("A", row, value) for row, value in enumerate(values, 1)]
+                batch_time = timed(service.set_cell_values, empty_sheet(), batch)
+                line += f" | batch {batch_time:7.2f} s"
+            single_cells = min(cells, args.single_max)
+            sheet_id = empty_sheet()
+            single_time = timed(lambda: [service.set_cell_value(sheet_id, "A", row, value)
+                                         for row, value in enumerate(values[:single_cells], 1)])
+            line += f" | single {single_time * cells / single_cells:8.2f} s"
+            print(line, flush=True)
+
+
+if __name__ == "__main__":
+    main()
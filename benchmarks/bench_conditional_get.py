@@ -0,0 +1,82 @@
+"""
+Polling benchmark for GET /sheets/{id} with ETags.
+
+Drives main:app in-process through ASGI against one sheet of N cells that does not
+change between polls, and reports milliseconds per poll for:
+  - uncached: the body re-encoded on every poll, as before (the service's
+    response cache is given no room);
+  - cached:   a plain GET answered from the body cached for the sheet's version;
+  - 304:      a GET carrying the ETag of the previous response in If-None-Match.
+
+Run from the repository root:
+    python -m benchmarks.bench_conditional_get --cells 10000 100000 1000000
+"""
+import argparse
+import asyncio
+import time
+from typing import List, Optional, Tuple
+
+from benchmarks.bench_serialization import build_sheet
+from dependencies import container
+from main import app
+from serialization import ResponseCache
+
+
+async def call(path: str, headers: List[Tuple[bytes, bytes]]) -> Tuple[int, Optional[bytes]]:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "", "headers": headers,
+        "client": ("127.0.0.1", 1), "server": ("bench", 80),
+    }
+    status = None
+    etag = None
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status, etag
+        if message["type"] == "http.response.start":
+            status = message["status"]
+            etag = dict(message["headers"]).get(b"etag")
+
+    await app(scope, receive, send)
+    return status, etag
+
+
+async def poll(path: str, polls: int, conditional: bool, expected_status: int) -> float:
+    _, etag = await call(path, [])
+    started = time.perf_counter()
+    for _ in range(polls):
+        status, _ = await call(path, [(b"if-none-match", etag)] if conditional else [])
+        if status != expected_status:
+            raise RuntimeError(f"GET {path} returned {status}")
+    return (time.perf_counter() - started) / polls * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cells", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--polls", type=int, default=20)
+    args = parser.parse_args()
+
+    service = container.sheet_service
+    response_cache = service.response_cache
+    for cells in args.cells:
+        sheet = build_sheet(cells)
+        container.sheet_repository.save(sheet)
+        path = f"/sheets/{sheet.id}"
+
+        service.response_cache = ResponseCache(max_bytes=0)
+        uncached = asyncio.run(poll(path, args.polls, conditional=False, expected_status=200))
+        service.response_cache = response_cache
+        cached = asyncio.run(poll(path, args.polls, conditional=False, expected_status=200))
+        not_modified = asyncio.run(poll(path, args.polls * 100, conditional=True, expected_status=304))
+        container.sheet_repository.delete(sheet.id)
+
+        print(f"{cells:>8} cells | uncached {uncached:8.2f} ms/poll | cached {cached:6.2f} ms/poll"
+              f" | 304 {not_modified:6.3f} ms/poll")
+
+
+if __name__ == "__main__":
+    main()
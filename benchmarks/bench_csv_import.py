@@ -0,0 +1,90 @@
+"""
+CSV import / export benchmark.
+
+Builds a CSV body of N cells over four columns (int, double, string, and an int
+column in which one row in 100 is a lookup of the int column) and times:
+  - import: CellService.import_csv into an empty sheet, fed in 64 KiB chunks as
+    a request body arrives;
+  - export: SheetService.export_csv of the imported sheet;
+  - batch:  the same cells written through set_cell_values, the per-cell path a
+    client used before (only up to --batch-max cells, as it is much slower).
+Checks that the export reproduces the imported body.
+
+Run from the repository root:
+    python -m benchmarks.bench_csv_import --cells 100000 1000000 10000000
+"""
+import argparse
+import csv
+import io
+import time
+
+from Models.sheet import Sheet
+from Repository.sheet_repository import SheetRepository
+from Services.cell_service import CellService
+from Services.sheet_service import SheetService
+
+COLUMNS = [{"name": "A", "type": "int"}, {"name": "B", "type": "double"},
+           {"name": "C", "type": "string"}, {"name": "D", "type": "int"}]
+CHUNK_BYTES = 1 << 16
+
+
+def build_csv(cells: int) -> bytes:
+    output = io.StringIO(newline="")
+    writer = csv.writer(output, lineterminator="\n")
+    writer.writerow([col["name"] for col in COLUMNS])
+    for row in range(1, cells // len(COLUMNS) + 1):
+        writer.writerow([row, row / 4, f"value {row}", f"lookup(A,{row})" if row % 100 == 0 else -row])
+    return output.getvalue().encode()
+
+
+def batch_cells(body: bytes):
+    reader = csv.reader(io.StringIO(body.decode(), newline=""))
+    names = next(reader)
+    parse = {"int": int, "double": float}
+    cells = []
+    for row, record in enumerate(reader, start=1):
+        for col, field in zip(COLUMNS, record):
+            value = field if field.startswith("lookup(") else parse.get(col["type"], str)(field)
+            cells.append((col["name"], row, value))
+    return cells
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cells", type=int, nargs="+", default=[100_000, 1_000_000, 10_000_000])
+    parser.add_argument("--batch-max", type=int, default=1_000_000, help="largest size also written through set_cell_values")
+    args = parser.parse_args()
+
+    for cells in args.cells:
+        body = build_csv(cells)
+        repository = SheetRepository()
+        cell_service = CellService(repository)
+        sheet_service = SheetService(repository)
+
+        sheet = Sheet(COLUMNS)
+        repository.save(sheet)
+        started = time.perf_counter()
+        cell_service.import_csv(sheet.id, (body[offset:offset + CHUNK_BYTES] for offset in range(0, len(body), CHUNK_BYTES)))
+        import_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        exported = b"".join(sheet_service.export_csv(sheet.id))
+        export_time = time.perf_counter() - started
+        assert exported == body, "export does not reproduce the imported CSV"
+
+        line = (f"{cells:>9} cells | {len(body) / 2 ** 20:7.1f} MiB"
+                f" | import {import_time:7.2f} s {cells / import_time:12,.0f} cells/s"
+                f" | export {export_time:7.2f} s {cells / export_time:12,.0f} cells/s")
+        if cells <= args.batch_max:
+            batch = batch_cells(body)
+            sheet = Sheet(COLUMNS)
+            repository.save(sheet)
+            started = time.perf_counter()
+            cell_service.set_cell_values(sheet.id, batch)
+            batch_time = time.perf_counter() - started
+            line += f" | batch {batch_time:7.2f} s {cells / batch_time:12,.0f} cells/s"
+        print(line, flush=True)
+
+
+if __name__ == "__main__":
+    main()
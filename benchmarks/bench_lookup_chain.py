@@ -0,0 +1,107 @@
+"""
+Lookup chain benchmark.
+
+Builds a forwarding chain A1 -> A2 -> ... -> AN, then times closing the chain
+into a cycle, which has to walk the whole chain: time per hop should stay flat as
+N grows, and the search only keeps the walked keys it needs to reorder the window,
+never a stack frame per hop.
+
+It also times resolving the head of the chain, and the whole-sheet JSON read per
+cell. Both should stay flat as N grows: the writes keep each lookup cell's source
+shortcut and resolved value up to date. "cold" resolves the head once with every
+shortcut cleared, as for a sheet loaded from disk: that one walk compresses the
+chain in constant memory, and the "warm" reads after it take a single hop.
+
+Run from the repository root:
+    python -m benchmarks.bench_lookup_chain --sizes 1 10 100 1000 10000 100000 1000000
+"""
+import argparse
+import time
+import tracemalloc
+
+from Models.sheet import Sheet
+from Repository.sheet_repository import SheetRepository
+from Services.cell_service import CellService
+from Services.sheet_service import SheetService
+from exceptions import ValidationError
+
+
+def build_chain(service: CellService, sheet_id: str, length: int):
+    service.set_cell_value(sheet_id, "A", length, 1)
+    for row in range(length - 1, 0, -1):
+        service.set_cell_value(sheet_id, "A", row, f"lookup(A,{row + 1})")
+
+
+def measure(func, repeat_func=None):
+    """Time func, then re-run it (or repeat_func) under tracemalloc for its peak allocation."""
+    started = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    (repeat_func or func)()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def close_cycle(service: CellService, sheet_id: str, length: int) -> str:
+    try:
+        service.set_cell_value(sheet_id, "A", length, "lookup(A,1)")
+    except ValidationError as e:
+        return str(e)
+    raise AssertionError("closing the chain should have been rejected as a cycle")
+
+
+def run(length: int):
+    repo = SheetRepository()
+    sheet = Sheet([{"name": "A", "type": "int"}])
+    repo.save(sheet)
+    service = CellService(repo)
+
+    started = time.perf_counter()
+    build_chain(service, sheet.id, length)
+    build_time = time.perf_counter() - started
+
+    message, cycle_time, cycle_peak = measure(lambda: close_cycle(service, sheet.id, length))
+    assert message == f"cycle of size {length} - not allowed", message
+
+    reads = 10_000
+    value, warm_time, _ = measure(lambda: [service._resolve_cell_value(sheet, "A", 1) for _ in range(reads)][0])
+    assert value == 1
+
+    def clear_shortcuts():
+        for row in range(1, length):
+            sheet.get_lookup_cell(sheet.cell_key("A", row)).source_key = None
+
+    def resolve_cold():
+        clear_shortcuts()
+        return service._resolve_cell_value(sheet, "A", 1)
+
+    clear_shortcuts()
+    value, cold_time, cold_peak = measure(lambda: service._resolve_cell_value(sheet, "A", 1), resolve_cold)
+    assert value == 1
+
+    sheet_service = SheetService(repo)
+    _, read_time, _ = measure(lambda: sheet_service._sheet_json(sheet), lambda: None)
+
+    print(
+        f"{length:>10} | build {build_time * 1e6 / length:8.2f} us/write"
+        f" | cycle {cycle_time * 1e9 / length:8.1f} ns/hop, peak {cycle_peak / 1024:10.1f} KiB"
+        f" | resolve cold {cold_time * 1e6:9.1f} us, peak {cold_peak / 1024:6.1f} KiB"
+        f" | warm {warm_time * 1e9 / reads:6.0f} ns/read"
+        f" | sheet read {read_time * 1e9 / length:6.0f} ns/cell"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 100, 1_000, 10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    for length in args.sizes:
+        run(length)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Per-request overhead benchmark.
+
+Drives the ASGI app in-process (no sockets or server, so only the app's own work
+is timed) and reports microseconds per request for a cell write, a lookup write
+and a small page read, in two configurations:
+  - before: services constructed on every request, as the former router
+    factories did, and lookups parsed with a regex looked up in re's cache per call;
+  - after:  the app-lifetime ServiceContainer and the hand-written lookup parser.
+Also times resolving the two services and the two lookup parsers on their own.
+
+Run from the repository root:
+    python -m benchmarks.bench_request_overhead --requests 20000
+"""
+import argparse
+import asyncio
+import json
+import re
+import time
+import timeit
+from typing import Optional, Tuple
+
+import dependencies
+from dependencies import get_cell_service, get_sheet_service
+from main import app
+from Repository.async_sheet_repository import make_async_repository
+from Services.async_cell_service import AsyncCellService
+from Services.async_sheet_service import AsyncSheetService
+from Services.cell_service import CellService
+
+
+def regex_parse_lookup_string(self, value: str) -> Optional[Tuple[str, int]]:
+    """The lookup parser before the hand-written one."""
+    if not isinstance(value, str):
+        return None
+    match = re.match(r'^lookup\(([A-Za-z]+),(\d+)\)$', value.strip())
+    if match:
+        return (match.group(1).upper(), int(match.group(2)))
+    return None
+
+
+async def call(method: str, path: str, body: Optional[dict] = None, query: bytes = b"") -> bytes:
+    payload = json.dumps(body).encode() if body is not None else b""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method, "scheme": "http",
+        "path": path, "raw_path": path.encode(), "query_string": query, "root_path": "",
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(payload)).encode())],
+        "client": ("127.0.0.1", 1), "server": ("bench", 80),
+    }
+    received = False
+    response = []
+
+    async def receive():
+        nonlocal received
+        if received:
+            return {"type": "http.disconnect"}
+        received = True
+        return {"type": "http.request", "body": payload, "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start" and message["status"] != 200:
+            raise RuntimeError(f"{method} {path} returned {message['status']}")
+        if message["type"] == "http.response.body":
+            response.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return b"".join(response)
+
+
+async def measure(requests: int):
+    created = await call("POST", "/sheets", {"columns": [{"name": "A", "type": "int"}, {"name": "B", "type": "int"}]})
+    sheet_id = json.loads(created)["sheet_id"]
+    await call("PUT", f"/cells/sheets/{sheet_id}", {"column": "A", "row": 1, "value": 1})
+
+    workloads = [
+        ("write value", lambda i: call("PUT", f"/cells/sheets/{sheet_id}", {"column": "A", "row": i % 1000 + 2, "value": i})),
+        ("write lookup", lambda i: call("PUT", f"/cells/sheets/{sheet_id}", {"column": "B", "row": i % 1000 + 1, "value": "lookup(A,1)"})),
+        ("read page", lambda i: call("GET", f"/sheets/{sheet_id}/cells", query=b"limit=10")),
+    ]
+    results = {}
+    for name, request in workloads:
+        for i in range(requests // 10):
+            await request(i)
+        started = time.perf_counter()
+        for i in range(requests):
+            await request(i)
+        results[name] = (time.perf_counter() - started) / requests * 1e6
+    return results
+
+
+def per_request_factories():
+    async_repository = make_async_repository(dependencies.container.sheet_repository)
+
+    async def new_sheet_service():
+        return AsyncSheetService(async_repository)
+
+    async def new_cell_service():
+        return AsyncCellService(async_repository)
+
+    return new_sheet_service, new_cell_service
+
+
+def resolve(factory):
+    """Run a dependency coroutine that never awaits, without an event loop."""
+    try:
+        factory().send(None)
+    except StopIteration as done:
+        return done.value
+
+
+def run_before(requests: int):
+    new_sheet_service, new_cell_service = per_request_factories()
+    app.dependency_overrides = {get_sheet_service: new_sheet_service, get_cell_service: new_cell_service}
+    parse_lookup_string = CellService._parse_lookup_string
+    CellService._parse_lookup_string = regex_parse_lookup_string
+    try:
+        return asyncio.run(measure(requests))
+    finally:
+        CellService._parse_lookup_string = parse_lookup_string
+        app.dependency_overrides = {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--rounds", type=int, default=5, help="alternating before/after rounds; the best is kept")
+    args = parser.parse_args()
+
+    before, after = {}, {}
+    for _ in range(args.rounds):
+        for results, run in ((before, run_before), (after, lambda requests: asyncio.run(measure(requests)))):
+            for name, micros in run(args.requests).items():
+                results[name] = min(results.get(name, micros), micros)
+    for name in before:
+        print(f"{name:>12} | before {before[name]:7.1f} us/request | after {after[name]:7.1f} us/request"
+              f" | saved {before[name] - after[name]:6.1f} us")
+
+    new_sheet_service, new_cell_service = per_request_factories()
+    for label, factories in (("per request", (new_sheet_service, new_cell_service)),
+                             ("container", (get_sheet_service, get_cell_service))):
+        elapsed = timeit.timeit(lambda: [resolve(factory) for factory in factories], number=200_000) / 200_000
+        print(f"{label:>12} | both services resolved in {elapsed * 1e6:5.2f} us")
+
+    service = CellService(None)
+    for value in ["lookup(A,10)", "plain text", 42]:
+        old = timeit.timeit(lambda: regex_parse_lookup_string(service, value), number=200_000) / 200_000 * 1e6
+        new = timeit.timeit(lambda: service._parse_lookup_string(value), number=200_000) / 200_000 * 1e6
+        print(f"parse {value!r:>14} | regex {old:5.2f} us | hand-written {new:5.2f} us")
+
+
+if __name__ == "__main__":
+    main()
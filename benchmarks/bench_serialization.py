@@ -0,0 +1,117 @@
+"""
+Whole-sheet read serialization benchmark.
+
+Builds sheets of N cells (int, double and string columns, plus a lookup column)
+and times GET /sheets/{id} driven in-process through ASGI, in two configurations:
+  - models: the former handler, returning a GetSheetResponse of CellData models
+    that FastAPI validates against response_model and encodes;
+  - bytes:  main:app, whose handler returns the JSON the service wrote directly.
+Also times the service alone: building the models and dumping them with pydantic,
+against the direct path with orjson and with the standard library fallback.
+
+Run from the repository root:
+    python -m benchmarks.bench_serialization --cells 10000 100000 1000000
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from fastapi import Depends, FastAPI
+
+import serialization
+from dependencies import container, get_sheet_service
+from main import app
+from Models.sheet import Cell, Sheet
+from Schemas.sheet_schemas import GetSheetResponse
+from Services.async_sheet_service import AsyncSheetService
+
+models_app = FastAPI()
+
+
+@models_app.get("/sheets/{sheet_id}", response_model=GetSheetResponse)
+async def get_sheet(sheet_id: str, sheet_service: AsyncSheetService = Depends(get_sheet_service)):
+    return await sheet_service.get_sheet_by_id(sheet_id)
+
+
+async def call(asgi_app, path: str) -> bytes:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "", "headers": [],
+        "client": ("127.0.0.1", 1), "server": ("bench", 80),
+    }
+    response = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start" and message["status"] != 200:
+            raise RuntimeError(f"GET {path} returned {message['status']}")
+        if message["type"] == "http.response.body":
+            response.append(message.get("body", b""))
+
+    await asgi_app(scope, receive, send)
+    return b"".join(response)
+
+
+def build_sheet(cells: int) -> Sheet:
+    sheet = Sheet([{"name": "A", "type": "int"}, {"name": "B", "type": "double"},
+                   {"name": "C", "type": "string"}, {"name": "D", "type": "int"}])
+    rows = cells // 4
+    for row in range(1, rows + 1):
+        sheet.set_value(sheet.cell_key("A", row), row)
+        sheet.set_value(sheet.cell_key("B", row), row / 4)
+        sheet.set_value(sheet.cell_key("C", row), f"value {row}")
+        target = sheet.cell_key("A", row)
+        sheet.set_lookup_cell(sheet.cell_key("D", row), Cell(value=f"lookup(A,{row})", lookup_key=target, resolved_value=row))
+    return sheet
+
+
+def best_of(rounds: int, function) -> float:
+    best = None
+    for _ in range(rounds):
+        started = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cells", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--rounds", type=int, default=3, help="runs per measurement; the best is kept")
+    args = parser.parse_args()
+
+    service = container.sheet_service
+    orjson = serialization.orjson
+    if orjson is None:
+        print("orjson is not installed; the direct path uses the standard library encoder")
+    for cells in args.cells:
+        sheet = build_sheet(cells)
+        container.sheet_repository.save(sheet)
+        path = f"/sheets/{sheet.id}"
+        assert json.loads(asyncio.run(call(models_app, path))) == json.loads(asyncio.run(call(app, path)))
+
+        timings = {
+            "GET models": best_of(args.rounds, lambda: asyncio.run(call(models_app, path))),
+            "GET bytes": best_of(args.rounds, lambda: asyncio.run(call(app, path))),
+            "service models + pydantic": best_of(args.rounds, lambda: service._sheet_response(sheet).model_dump_json()),
+        }
+        if orjson is not None:
+            timings["service direct + orjson"] = best_of(args.rounds, lambda: service._sheet_json(sheet))
+        serialization.orjson = None
+        try:
+            timings["service direct + json"] = best_of(args.rounds, lambda: service._sheet_json(sheet))
+        finally:
+            serialization.orjson = orjson
+        container.sheet_repository.delete(sheet.id)
+
+        print(f"{cells} cells")
+        for name, millis in timings.items():
+            print(f"{name:>28} | {millis:9.1f} ms | {cells / millis * 1e3:12,.0f} cells/s")
+
+
+if __name__ == "__main__":
+    main()
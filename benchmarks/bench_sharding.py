@@ -0,0 +1,83 @@
+"""
+Sharded deployment benchmark.
+
+For each shard worker count N, starts N shard workers and as many client processes
+(standing in for uvicorn front ends), each driving its own sheets through
+ShardedCellService / ShardedSheetService: mostly single-cell writes, with a page
+read every tenth request. Reports requests/s across all clients. Throughput should
+grow with N up to the number of cores, since every shard runs its own interpreter.
+
+Run from the repository root:
+    python -m benchmarks.bench_sharding --workers 1 2 4 --requests 20000
+"""
+import argparse
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+
+from sharding import ShardClient, ShardedCellService, ShardedSheetService, start_shards
+
+AUTHKEY = b"bench-sharding"
+
+
+def run_client(socket_dir: str, shards: int, sheets: int, requests: int, ready, start):
+    client = ShardClient(socket_dir, shards, AUTHKEY)
+    sheet_service = ShardedSheetService(client)
+    cell_service = ShardedCellService(client)
+    sheet_ids = [sheet_service.create_sheet([{"name": "A", "type": "int"}]) for _ in range(sheets)]
+    ready.wait()
+    start.wait()
+    for request in range(requests):
+        sheet_id = sheet_ids[request % sheets]
+        if request % 10 == 9:
+            sheet_service.get_sheet_page(sheet_id, limit=100)
+        else:
+            cell_service.set_cell_value(sheet_id, "A", request // sheets + 1, request)
+    client.close()
+
+
+def run(workers: int, clients: int, sheets: int, requests: int):
+    socket_dir = tempfile.mkdtemp(prefix="shards-")
+    shards = start_shards(socket_dir, workers, AUTHKEY)
+    context = multiprocessing.get_context("spawn")
+    ready = context.Barrier(clients + 1)
+    start = context.Barrier(clients + 1)
+    per_client = requests // clients
+    processes = [
+        context.Process(target=run_client, args=(socket_dir, workers, sheets, per_client, ready, start))
+        for _ in range(clients)
+    ]
+    for process in processes:
+        process.start()
+
+    ready.wait()
+    started = time.perf_counter()
+    start.wait()
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - started
+
+    for shard in shards:
+        shard.terminate()
+        shard.join()
+    shutil.rmtree(socket_dir)
+    print(f"{workers:>3} shard workers, {clients:>3} clients | {per_client * clients / elapsed:10.0f} requests/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--clients", type=int, default=None, help="client processes (defaults to the worker count)")
+    parser.add_argument("--sheets", type=int, default=16, help="sheets per client")
+    parser.add_argument("--requests", type=int, default=20_000)
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} cores")
+    for workers in args.workers:
+        run(workers, args.clients or workers, args.sheets, args.requests)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Sheet file benchmark.
+
+Fills a DurableSheetRepository with S sheets of three int/double/string columns and
+R rows each, then reopens it twice and compares:
+  - replaying the write-ahead log, which materializes every sheet in memory, and
+  - opening after a snapshot, where sheets stay in their mmap'ed sheet files until
+    get_by_id, and only the touched columns are read.
+For each it reports startup time, the time to read one column of 1% of the sheets,
+and the Python memory held afterwards.
+
+Run from the repository root:
+    python -m benchmarks.bench_sheet_files --sheets 500 --rows 1000
+"""
+import argparse
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+from Models.sheet import Sheet
+from Repository.durable_sheet_repository import DurableSheetRepository
+
+
+def fill(data_dir: str, sheets: int, rows: int):
+    repo = DurableSheetRepository(data_dir, snapshot_every=10 ** 9)
+    for _ in range(sheets):
+        sheet = Sheet([{"name": "A", "type": "int"}, {"name": "B", "type": "double"}, {"name": "C", "type": "string"}])
+        for row in range(1, rows + 1):
+            sheet.set_value(sheet.cell_key("A", row), row)
+            sheet.set_value(sheet.cell_key("B", row), row / 2)
+            sheet.set_value(sheet.cell_key("C", row), f"value {row}")
+        repo.save(sheet)
+    repo.close()
+
+
+def open_and_read(data_dir: str):
+    """Open the repository, then read column A of 1% of its sheets; return the timings."""
+    started = time.perf_counter()
+    repo = DurableSheetRepository(data_dir, snapshot_every=10 ** 9)
+    startup = time.perf_counter() - started
+
+    sheet_ids = sorted(repo.get_all_ids())
+    touched = sheet_ids[:max(len(sheet_ids) // 100, 1)]
+    started = time.perf_counter()
+    for sheet_id in touched:
+        sheet = repo.get_by_id(sheet_id)
+        assert sum(1 for _ in sheet.iter_range(["A"], 1, 10 ** 9)) > 0
+    read_time = time.perf_counter() - started
+    return repo, startup, read_time, len(touched)
+
+
+def measure_open(data_dir: str, label: str):
+    """Time open_and_read, then re-run it under tracemalloc for the memory it keeps."""
+    repo, startup, read_time, touched = open_and_read(data_dir)
+    repo.close()
+
+    tracemalloc.start()
+    repo, _, _, _ = open_and_read(data_dir)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    print(
+        f"{label:>5} | startup {startup:7.3f} s | read column A of {touched} sheets {read_time * 1e3:7.1f} ms"
+        f" | {memory / 2 ** 20:7.1f} MiB held"
+    )
+    return repo
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sheets", type=int, default=500)
+    parser.add_argument("--rows", type=int, default=1000)
+    args = parser.parse_args()
+
+    data_dir = tempfile.mkdtemp(prefix="sheets-")
+    try:
+        fill(data_dir, args.sheets, args.rows)
+        repo = measure_open(data_dir, "log")
+        started = time.perf_counter()
+        repo.snapshot()
+        print(f"  snapshot written in {time.perf_counter() - started:.3f} s")
+        repo.close()
+        measure_open(data_dir, "mmap").close()
+    finally:
+        shutil.rmtree(data_dir)
+
+
+if __name__ == "__main__":
+    main()
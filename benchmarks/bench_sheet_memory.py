@@ -0,0 +1,113 @@
+"""
+Sheet memory benchmark.
+
+Fills a sheet with N numeric cells and reports bytes per cell for the columnar
+storage, next to the layout it replaced: a dict keyed by "<column>_<row>" holding
+one Cell dataclass (with its own dependents list) per cell.
+
+Then does the same for N lookup cells, which are still kept as Cell objects in the
+columns' side tables: the slotted Cell with an int lookup key against the old
+dataclass with a __dict__, a dependents list and a string lookup row.
+
+Run from the repository root:
+    python -m benchmarks.bench_sheet_memory --sizes 100000 1000000
+"""
+import argparse
+import gc
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import Any, List, Optional
+
+from Models.sheet import Cell, Sheet
+
+COLUMNS = [
+    {"name": "A", "type": "int"},
+    {"name": "B", "type": "double"},
+    {"name": "C", "type": "boolean"},
+    {"name": "D", "type": "int"},
+]
+
+
+@dataclass
+class DictLayoutCell:
+    value: Any
+    is_lookup: bool = False
+    lookup_column: Optional[str] = None
+    lookup_row: Optional[str] = None
+    dependents: List[tuple] = field(default_factory=list)
+
+
+def value_for(column: dict, row: int) -> Any:
+    if column["type"] == "double":
+        return row * 0.5
+    if column["type"] == "boolean":
+        return row % 2 == 0
+    return row * 7
+
+
+def fill_dict_layout(size: int) -> dict:
+    cells = {}
+    rows = size // len(COLUMNS)
+    for column in COLUMNS:
+        for row in range(1, rows + 1):
+            cells[f"{column['name']}_{row}"] = DictLayoutCell(value=value_for(column, row))
+    return cells
+
+
+def fill_columnar(size: int) -> Sheet:
+    sheet = Sheet(COLUMNS)
+    rows = size // len(COLUMNS)
+    for column in COLUMNS:
+        for row in range(1, rows + 1):
+            sheet.set_value(sheet.cell_key(column["name"], row), value_for(column, row))
+    return sheet
+
+
+def fill_dict_layout_lookups(size: int) -> dict:
+    cells = {}
+    for row in range(1, size + 1):
+        cells[f"B_{row}"] = DictLayoutCell(
+            value=f"lookup(A,{row})", is_lookup=True, lookup_column="A", lookup_row=str(row)
+        )
+    return cells
+
+
+def fill_columnar_lookups(size: int) -> Sheet:
+    sheet = Sheet(COLUMNS)
+    for row in range(1, size + 1):
+        sheet.set_lookup_cell(
+            sheet.cell_key("D", row), Cell(value=f"lookup(A,{row})", lookup_key=sheet.cell_key("A", row))
+        )
+    return sheet
+
+
+def allocated_by(build, size: int) -> int:
+    gc.collect()
+    tracemalloc.start()
+    result = build(size)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    args = parser.parse_args()
+
+    for label, build_dict_layout, build_columnar in (
+        ("numeric", fill_dict_layout, fill_columnar),
+        ("lookup", fill_dict_layout_lookups, fill_columnar_lookups),
+    ):
+        for size in args.sizes:
+            dict_layout = allocated_by(build_dict_layout, size)
+            columnar = allocated_by(build_columnar, size)
+            print(
+                f"{size:>10} {label:<7} cells | dict of Cell {dict_layout / size:7.1f} B/cell"
+                f" | columnar {columnar / size:6.1f} B/cell | {columnar / dict_layout:6.1%} of dict layout"
+            )
+
+
+if __name__ == "__main__":
+    main()
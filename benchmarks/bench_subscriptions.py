@@ -0,0 +1,81 @@
+"""
+Subscription fan-out benchmark.
+
+Opens S subscriptions to one sheet through AsyncSheetService.subscribe, each read
+by its own task, then times W writes to column A through AsyncCellService. Column B
+looks up column A row by row, so every write also changes a downstream lookup cell.
+Half of the subscribers read as fast as they can, half sleep after each event
+(slow consumers). Reports writes/s against the same writes with no subscribers,
+and the update events delivered: slow consumers get fewer, coalesced events.
+
+Run from the repository root:
+    python -m benchmarks.bench_subscriptions --subscribers 10 100 1000 --writes 5000
+"""
+import argparse
+import asyncio
+import time
+
+from Repository.async_sheet_repository import make_async_repository
+from Repository.sheet_repository import SheetRepository
+from Services.async_cell_service import AsyncCellService
+from Services.async_sheet_service import AsyncSheetService
+from subscriptions import ChangeFeeds
+
+ROWS = 100
+
+
+async def measure(subscribers: int, writes: int, slow_delay: float):
+    repository = make_async_repository(SheetRepository())
+    feeds = ChangeFeeds()
+    sheet_service = AsyncSheetService(repository, change_feeds=feeds)
+    cell_service = AsyncCellService(repository, change_feeds=feeds)
+    sheet_id = await sheet_service.create_sheet([{"name": "A", "type": "int"}, {"name": "B", "type": "int"}])
+    await cell_service.set_cell_values(sheet_id, [("B", row, f"lookup(A,{row})") for row in range(1, ROWS + 1)])
+
+    received = {"fast": 0, "slow": 0}
+
+    async def consume(events, kind: str):
+        async for chunk in events:
+            if chunk.startswith(b"event: update"):
+                received[kind] += 1
+            if kind == "slow":
+                await asyncio.sleep(slow_delay)
+
+    readers = []
+    for number in range(subscribers):
+        events = await sheet_service.subscribe(sheet_id)
+        readers.append(asyncio.create_task(consume(events, "slow" if number % 2 else "fast")))
+    await asyncio.sleep(0)
+
+    started = time.perf_counter()
+    for count in range(writes):
+        await cell_service.set_cell_value(sheet_id, "A", count % ROWS + 1, count)
+        # let subscribers run between writes, as they would between requests
+        await asyncio.sleep(0)
+    elapsed = time.perf_counter() - started
+
+    for reader in readers:
+        reader.cancel()
+    await asyncio.gather(*readers, return_exceptions=True)
+    return writes / elapsed, received
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subscribers", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--writes", type=int, default=5000)
+    parser.add_argument("--slow-delay", type=float, default=0.01, help="seconds a slow subscriber spends per event")
+    args = parser.parse_args()
+
+    baseline, _ = asyncio.run(measure(0, args.writes, args.slow_delay))
+    print(f"{0:>5} subscribers | {baseline:8.0f} writes/s")
+    for subscribers in args.subscribers:
+        rate, received = asyncio.run(measure(subscribers, args.writes, args.slow_delay))
+        fast, slow = (subscribers + 1) // 2, subscribers // 2
+        print(f"{subscribers:>5} subscribers | {rate:8.0f} writes/s"
+              f" | updates per fast subscriber {received['fast'] / max(fast, 1):7.0f}"
+              f" | per slow subscriber {received['slow'] / max(slow, 1):7.0f}")
+
+
+if __name__ == "__main__":
+    main()
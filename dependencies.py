@@ -1,6 +1,81 @@
+import os
+from typing import Optional
 from Repository.sheet_repository import SheetRepository
+from Repository.durable_sheet_repository import DurableSheetRepository
+from Repository.bounded_sheet_repository import BoundedSheetRepository
+from Repository.async_sheet_repository import make_async_repository
+from Services.async_sheet_service import AsyncSheetService
+from Services.async_cell_service import AsyncCellService
+from sharding import ShardClient, ShardedCellService, ShardedSheetService
 
-sheet_repository = SheetRepository()
+
+def create_sheet_repository() -> SheetRepository:
+    """
+    Sheets are kept in memory unless SHEET_DATA_DIR points at a directory to persist them in.
+    SHEET_MAX_SHEETS / SHEET_MAX_BYTES bound the in-memory mode, spilling least recently
+    used sheets to SHEET_SPILL_DIR (a temporary directory by default).
+    """
+    data_dir = os.environ.get("SHEET_DATA_DIR")
+    if data_dir:
+        return DurableSheetRepository(data_dir)
+
+    max_sheets = os.environ.get("SHEET_MAX_SHEETS")
+    max_bytes = os.environ.get("SHEET_MAX_BYTES")
+    if max_sheets or max_bytes:
+        return BoundedSheetRepository(
+            spill_dir=os.environ.get("SHEET_SPILL_DIR"),
+            max_sheets=int(max_sheets) if max_sheets else None,
+            max_bytes=int(max_bytes) if max_bytes else None
+        )
+    return SheetRepository()
+
+def create_shard_client() -> Optional[ShardClient]:
+    """In the sharded mode (SHEET_SHARD_DIR set) sheets live in the shard workers, not in this process."""
+    socket_dir = os.environ.get("SHEET_SHARD_DIR")
+    if not socket_dir:
+        return None
+    return ShardClient(socket_dir, int(os.environ["SHEET_SHARDS"]), os.environ["SHEET_SHARD_AUTHKEY"].encode())
+
+
+class ServiceContainer:
+    """
+    The repository and services, built once and shared by every request for the
+    life of the app. Services hold no per-request state; per-sheet locks make them
+    safe to share.
+    """
+
+    def __init__(self, sheet_repository: Optional[SheetRepository] = None, shard_client: Optional[ShardClient] = None):
+        self.sheet_repository = sheet_repository
+        self.shard_client = shard_client
+        if shard_client is not None:
+            self.sheet_service = ShardedSheetService(shard_client)
+            self.cell_service = ShardedCellService(shard_client)
+        else:
+            async_repository = make_async_repository(sheet_repository)
+            self.sheet_service = AsyncSheetService(async_repository)
+            self.cell_service = AsyncCellService(async_repository)
+
+    def close(self):
+        if self.shard_client is not None:
+            self.shard_client.close()
+        if isinstance(self.sheet_repository, DurableSheetRepository):
+            self.sheet_repository.close()
+
+def create_container() -> ServiceContainer:
+    shard_client = create_shard_client()
+    if shard_client is not None:
+        return ServiceContainer(shard_client=shard_client)
+    return ServiceContainer(sheet_repository=create_sheet_repository())
+
+container = create_container()
 
 def get_sheet_repository() -> SheetRepository:
-    return sheet_repository
\ No newline at end of file
+    return container.sheet_repository
+
+# async so FastAPI resolves them on the event loop instead of handing each request
+# to the threadpool
+async def get_sheet_service() -> AsyncSheetService:
+    return container.sheet_service
+
+async def get_cell_service() -> AsyncCellService:
+    return container.cell_service
@@ -0,0 +1,225 @@
+import asyncio
+import threading
+import weakref
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Deque, Iterator, List, Tuple
+
+
+class ReadWriteLock:
+    """
+    Many readers or one writer. Waiting writers block new readers, so a steady stream
+    of reads cannot starve writes. Not reentrant.
+
+    Threads wait on a condition; coroutines (read_async, write_async) wait on a future
+    that a release resolves, so a contended lock parks neither a thread nor the event
+    loop. Waiting coroutines are served first come, first served: a release hands the
+    lock to the first waiting writer, or to every waiting reader once no writer waits.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._waiting_writers = 0
+        self._async_readers: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+        self._async_writers: Deque[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = deque()
+
+    def acquire_read(self):
+        with self._condition:
+            while self._writer or self._waiting_writers:
+                self._condition.wait()
+            self._readers += 1
+
+    def try_acquire_read(self) -> bool:
+        with self._condition:
+            if self._writer or self._waiting_writers:
+                return False
+            self._readers += 1
+            return True
+
+    def release_read(self):
+        with self._condition:
+            self._readers -= 1
+            if not self._readers:
+                self._condition.notify_all()
+                self._wake_async_waiters()
+
+    def acquire_write(self):
+        with self._condition:
+            self._waiting_writers += 1
+            try:
+                while self._writer or self._readers:
+                    self._condition.wait()
+            finally:
+                self._waiting_writers -= 1
+            self._writer = True
+
+    def try_acquire_write(self) -> bool:
+        with self._condition:
+            if self._writer or self._readers:
+                return False
+            self._writer = True
+            return True
+
+    def release_write(self):
+        with self._condition:
+            self._writer = False
+            self._condition.notify_all()
+            self._wake_async_waiters()
+
+    @contextmanager
+    def read(self) -> Iterator[None]:
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write(self) -> Iterator[None]:
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+    async def acquire_read_async(self):
+        loop = asyncio.get_running_loop()
+        with self._condition:
+            if not self._writer and not self._waiting_writers:
+                self._readers += 1
+                return
+            waiter = (loop, loop.create_future())
+            self._async_readers.append(waiter)
+        try:
+            await waiter[1]
+        except asyncio.CancelledError:
+            with self._condition:
+                handed_off = waiter not in self._async_readers
+                if not handed_off:
+                    self._async_readers.remove(waiter)
+            if handed_off:
+                self.release_read()
+            raise
+
+    async def acquire_write_async(self):
+        loop = asyncio.get_running_loop()
+        with self._condition:
+            if not self._writer and not self._readers:
+                self._writer = True
+                return
+            self._waiting_writers += 1
+            waiter = (loop, loop.create_future())
+            self._async_writers.append(waiter)
+        try:
+            await waiter[1]
+        except asyncio.CancelledError:
+            with self._condition:
+                handed_off = waiter not in self._async_writers
+                if not handed_off:
+                    self._async_writers.remove(waiter)
+                    self._waiting_writers -= 1
+                    # readers held back by this writer may go ahead now
+                    self._condition.notify_all()
+                    self._wake_async_waiters()
+            if handed_off:
+                self.release_write()
+            raise
+
+    @asynccontextmanager
+    async def read_async(self) -> AsyncIterator[None]:
+        await self.acquire_read_async()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @asynccontextmanager
+    async def write_async(self) -> AsyncIterator[None]:
+        await self.acquire_write_async()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+    def _wake_async_waiters(self):
+        """
+        Hand the lock to the first waiting coroutine writer, or to every waiting
+        coroutine reader if no writer waits (_condition must be held). The lock is
+        taken on their behalf, so nothing can slip in before they resume.
+        """
+        if self._writer:
+            return
+        while self._async_writers and not self._readers:
+            self._waiting_writers -= 1
+            self._writer = True
+            if _wake(*self._async_writers.popleft()):
+                return
+            self._writer = False
+        if self._async_writers or self._waiting_writers:
+            return
+        readers, self._async_readers = self._async_readers, []
+        for loop, future in readers:
+            self._readers += 1
+            if not _wake(loop, future):
+                self._readers -= 1
+
+
+def _wake(loop: asyncio.AbstractEventLoop, future: asyncio.Future) -> bool:
+    try:
+        loop.call_soon_threadsafe(resolve_future, future)
+        return True
+    except RuntimeError:
+        # the waiter's event loop is closed
+        return False
+
+
+def resolve_future(future: asyncio.Future):
+    """Wake whoever awaits the future, unless it is already done (e.g. cancelled)."""
+    if not future.done():
+        future.set_result(None)
+
+
+class SheetLocks:
+    """
+    One ReadWriteLock per sheet id, so operations on different sheets never wait for
+    each other. A lock lives only while someone holds or waits for it.
+    """
+
+    def __init__(self):
+        self._locks: "weakref.WeakValueDictionary[str, ReadWriteLock]" = weakref.WeakValueDictionary()
+        self._mutex = threading.Lock()
+
+    def get(self, sheet_id: str) -> ReadWriteLock:
+        with self._mutex:
+            lock = self._locks.get(sheet_id)
+            if lock is None:
+                lock = self._locks[sheet_id] = ReadWriteLock()
+            return lock
+
+    @contextmanager
+    def read(self, sheet_id: str) -> Iterator[None]:
+        with self.get(sheet_id).read():
+            yield
+
+    @contextmanager
+    def write(self, sheet_id: str) -> Iterator[None]:
+        with self.get(sheet_id).write():
+            yield
+
+    @asynccontextmanager
+    async def read_async(self, sheet_id: str) -> AsyncIterator[None]:
+        async with self.get(sheet_id).read_async():
+            yield
+
+    @asynccontextmanager
+    async def write_async(self, sheet_id: str) -> AsyncIterator[None]:
+        async with self.get(sheet_id).write_async():
+            yield
+
+
+# Used by services and repositories built without a SheetLocks of their own, as
+# ServiceContainer builds them, so its services and its repository's snapshots and
+# spills lock the same sheets
+sheet_locks = SheetLocks()
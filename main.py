@@ -1,8 +1,16 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from Routers.sheet_router import router as sheet_router
 from Routers.cell_router import router as cell_router
+from dependencies import container
 
-app = FastAPI(title="Sheet API", version="1.0.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    container.close()
+
+app = FastAPI(title="Sheet API", version="1.0.0", lifespan=lifespan)
 
 app.include_router(sheet_router)
 app.include_router(cell_router)
@@ -13,4 +21,4 @@ def root():
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,93 @@
+import json
+import math
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # optional; the standard library encoder is used without it
+    orjson = None
+
+
+def dumps(payload: Any) -> bytes:
+    """
+    Encode a payload of dicts, lists and plain values as compact UTF-8 JSON, the same
+    bytes the response models would produce: NaN and infinities become null.
+    Uses orjson when installed and falls back to json for what orjson rejects
+    (ints outside 64 bits).
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(payload)
+        except TypeError:
+            pass
+    try:
+        return _json_dumps(payload)
+    except ValueError:
+        return _json_dumps(_replace_non_finite(payload))
+
+
+# Default bound on the encoded responses a ResponseCache keeps
+RESPONSE_CACHE_BYTES = 256 << 20
+
+
+class ResponseCache:
+    """
+    Encoded responses kept per key (a sheet id), each tagged with the version it encodes.
+    A lookup only hits when the tag matches, so a cached body is never served for a
+    newer version. Least recently used bodies are dropped once their total size passes
+    max_bytes; bodies larger than that are not kept at all. Safe to share across threads.
+    """
+
+    def __init__(self, max_bytes: int = RESPONSE_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._bodies: "OrderedDict[str, Tuple[str, bytes]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str, tag: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._bodies.get(key)
+            if entry is None or entry[0] != tag:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._bodies.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: str, tag: str, body: bytes):
+        with self._lock:
+            self._discard(key)
+            if len(body) > self.max_bytes:
+                return
+            self._bodies[key] = (tag, body)
+            self._bytes += len(body)
+            while self._bytes > self.max_bytes:
+                _, (_, evicted) = self._bodies.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._bodies), "bytes": self._bytes}
+
+    def _discard(self, key: str):
+        entry = self._bodies.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry[1])
+
+
+def _json_dumps(payload: Any) -> bytes:
+    return json.dumps(payload, separators=(",", ":"), ensure_ascii=False, allow_nan=False).encode()
+
+
+def _replace_non_finite(payload: Any) -> Any:
+    if isinstance(payload, float):
+        return payload if math.isfinite(payload) else None
+    if isinstance(payload, dict):
+        return {key: _replace_non_finite(value) for key, value in payload.items()}
+    if isinstance(payload, list):
+        return [_replace_non_finite(value) for value in payload]
+    return payload
@@ -0,0 +1,297 @@
+"""
+Sheet-sharded deployment.
+
+Each sheet id is owned by exactly one shard worker process, picked by consistent
+hashing, so every front end (e.g. each uvicorn worker) sees the same data. Shard
+workers run the regular services on their own repository and listen on a Unix
+socket; front ends forward service calls to the owning shard over that socket.
+
+Start the shard workers, then the front ends:
+    SHEET_SHARD_AUTHKEY=secret python -m sharding --workers 4 --socket-dir /tmp/anchor-shards
+    SHEET_SHARD_AUTHKEY=secret SHEET_SHARD_DIR=/tmp/anchor-shards SHEET_SHARDS=4 uvicorn main:app --workers 4
+"""
+import argparse
+import asyncio
+import bisect
+import functools
+import hashlib
+import multiprocessing
+import os
+import pickle
+import queue
+import threading
+import time
+import uuid
+from multiprocessing.connection import Client, Connection, Listener
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from Models.sheet import MAX_ROW
+from Repository.sheet_repository import SheetRepository
+from Repository.durable_sheet_repository import DurableSheetRepository
+from Services.async_sheet_service import export_chunks
+from Services.cell_service import CellService
+from Services.sheet_service import SheetService, STREAM_CHUNK_SIZE
+import serialization
+
+# Points per shard on the hash ring; more points spread sheets more evenly
+RING_REPLICAS = 64
+
+
+class ConsistentHashRing:
+    """Maps keys to nodes so that adding or removing a node only moves about 1/N of the keys."""
+
+    def __init__(self, nodes: List[Any], replicas: int = RING_REPLICAS):
+        self._points: List[int] = []
+        self._nodes: List[Any] = []
+        for point, node in sorted((self._hash(f"{node}#{replica}"), node) for node in nodes for replica in range(replicas)):
+            self._points.append(point)
+            self._nodes.append(node)
+
+    def node_for(self, key: str) -> Any:
+        index = bisect.bisect(self._points, self._hash(key)) % len(self._points)
+        return self._nodes[index]
+
+    def _hash(self, key: str) -> int:
+        return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+def shard_socket_path(socket_dir: str, shard: int) -> str:
+    return os.path.join(socket_dir, f"shard-{shard}.sock")
+
+
+class ShardClient:
+    """
+    Forwards service calls to the shard owning a sheet. Connections are pooled per
+    shard, so concurrent requests from one front end use separate connections.
+    """
+
+    def __init__(self, socket_dir: str, shards: int, authkey: bytes):
+        self.socket_dir = socket_dir
+        self.shards = shards
+        self.authkey = authkey
+        self.ring = ConsistentHashRing(list(range(shards)))
+        self._idle: Dict[int, "queue.SimpleQueue[Connection]"] = {shard: queue.SimpleQueue() for shard in range(shards)}
+
+    def shard_for(self, sheet_id: str) -> int:
+        return self.ring.node_for(sheet_id)
+
+    def call(self, shard_key: str, service: str, method: str, *args, **kwargs) -> Any:
+        """Run service.method(*args, **kwargs) on the shard owning shard_key; its exceptions are re-raised here."""
+        shard = self.shard_for(shard_key)
+        connection = self._acquire(shard)
+        try:
+            connection.send((service, method, args, kwargs))
+            ok, result = connection.recv()
+        except BaseException:
+            connection.close()
+            raise
+        self._idle[shard].put(connection)
+        if not ok:
+            raise result
+        return result
+
+    async def call_async(self, shard_key: str, service: str, method: str, *args, **kwargs) -> Any:
+        """call, waiting for the shard's answer on an executor thread rather than the event loop."""
+        return await asyncio.get_running_loop().run_in_executor(
+            None, functools.partial(self.call, shard_key, service, method, *args, **kwargs)
+        )
+
+    def close(self):
+        for idle in self._idle.values():
+            while not idle.empty():
+                idle.get().close()
+
+    def _acquire(self, shard: int) -> Connection:
+        try:
+            return self._idle[shard].get_nowait()
+        except queue.Empty:
+            return Client(shard_socket_path(self.socket_dir, shard), family="AF_UNIX", authkey=self.authkey)
+
+
+class ShardedSheetService:
+    """AsyncSheetService interface backed by the shard workers."""
+
+    def __init__(self, shard_client: ShardClient):
+        self.shard_client = shard_client
+
+    async def create_sheet(self, columns: List[Dict[str, str]]) -> str:
+        # the id is chosen here so the sheet is created on the shard that will own it
+        sheet_id = str(uuid.uuid4())
+        return await self.shard_client.call_async(sheet_id, "sheet", "create_sheet", columns, sheet_id=sheet_id)
+
+    async def get_sheet_by_id(self, sheet_id: str):
+        return await self.shard_client.call_async(sheet_id, "sheet", "get_sheet_by_id", sheet_id)
+
+    async def get_sheet_page(self, sheet_id: str, cursor: Optional[str] = None, limit: int = 1000):
+        return await self.shard_client.call_async(sheet_id, "sheet", "get_sheet_page", sheet_id, cursor=cursor, limit=limit)
+
+    async def query_sheet(self, sheet_id: str, columns: Optional[List[str]] = None, start_row: int = 1, end_row: int = MAX_ROW):
+        return await self.shard_client.call_async(
+            sheet_id, "sheet", "query_sheet", sheet_id, columns=columns, start_row=start_row, end_row=end_row
+        )
+
+    async def get_sheet_json(self, sheet_id: str) -> bytes:
+        return await self.shard_client.call_async(sheet_id, "sheet", "get_sheet_json", sheet_id)
+
+    async def get_sheet_json_if_changed(self, sheet_id: str, if_none_match: Optional[str] = None) -> Tuple[str, Optional[bytes]]:
+        return await self.shard_client.call_async(sheet_id, "sheet", "get_sheet_json_if_changed", sheet_id, if_none_match)
+
+    async def get_sheet_page_json(self, sheet_id: str, cursor: Optional[str] = None, limit: int = 1000) -> bytes:
+        return await self.shard_client.call_async(sheet_id, "sheet", "get_sheet_page_json", sheet_id, cursor=cursor, limit=limit)
+
+    async def query_sheet_json(self, sheet_id: str, columns: Optional[List[str]] = None, start_row: int = 1,
+                               end_row: int = MAX_ROW) -> bytes:
+        return await self.shard_client.call_async(
+            sheet_id, "sheet", "query_sheet_json", sheet_id, columns=columns, start_row=start_row, end_row=end_row
+        )
+
+    async def get_sheet_changes_json(self, sheet_id: str, since: Optional[str] = None) -> bytes:
+        return await self.shard_client.call_async(sheet_id, "sheet", "get_sheet_changes_json", sheet_id, since=since)
+
+    async def get_cell_dependents_json(self, sheet_id: str, column: str, row: int, transitive: bool = False) -> bytes:
+        return await self.shard_client.call_async(
+            sheet_id, "sheet", "get_cell_dependents_json", sheet_id, column, row, transitive=transitive
+        )
+
+    async def subscribe(self, sheet_id: str, columns: Optional[List[str]] = None, start_row: int = 1,
+                        end_row: int = MAX_ROW) -> AsyncIterator[bytes]:
+        # writes are applied in the shard workers, whose change feeds this process cannot see
+        raise NotImplementedError("Subscriptions are not available in the sharded mode; poll /changes instead")
+
+    async def export_csv(self, sheet_id: str, start_row: int = 1, end_row: Optional[int] = None,
+                         resolved: bool = False) -> AsyncIterator[bytes]:
+        """Same CSV as SheetService.export_csv, fetched from the shard chunk by chunk."""
+        first = await self.export_csv_chunk(sheet_id, start_row, end_row, resolved)
+        return export_chunks(self.export_csv_chunk, sheet_id, first, end_row, resolved)
+
+    async def export_csv_chunk(self, sheet_id: str, start_row: int = 1, end_row: Optional[int] = None,
+                               resolved: bool = False, header: bool = True) -> Tuple[bytes, Optional[int]]:
+        return await self.shard_client.call_async(
+            sheet_id, "sheet", "export_csv_chunk", sheet_id, start_row, end_row, resolved=resolved, header=header
+        )
+
+    async def stream_sheet(self, sheet_id: str) -> AsyncIterator[bytes]:
+        """Same NDJSON stream as SheetService.stream_sheet, fetched from the shard page by page."""
+        page = await self.get_sheet_page(sheet_id, limit=STREAM_CHUNK_SIZE)
+        return self._stream_pages(sheet_id, page, STREAM_CHUNK_SIZE)
+
+    async def _stream_pages(self, sheet_id: str, page, limit: int) -> AsyncIterator[bytes]:
+        header = {"sheet_id": page.sheet_id, "columns": [{"name": col.name, "type": col.type} for col in page.columns]}
+        yield serialization.dumps(header) + b"\n"
+        while True:
+            if page.cells:
+                yield b"".join(
+                    serialization.dumps({"column": cell.column, "row": cell.row, "value": cell.value}) + b"\n" for cell in page.cells
+                )
+            if page.next_cursor is None:
+                return
+            page = await self.get_sheet_page(sheet_id, cursor=page.next_cursor, limit=limit)
+
+
+class ShardedCellService:
+    """AsyncCellService interface backed by the shard workers."""
+
+    def __init__(self, shard_client: ShardClient):
+        self.shard_client = shard_client
+
+    async def set_cell_value(self, sheet_id: str, column: str, row: int, value: Any) -> str:
+        return await self.shard_client.call_async(sheet_id, "cell", "set_cell_value", sheet_id, column, row, value)
+
+    async def set_cell_values(self, sheet_id: str, cells: List[Tuple[str, int, Any]]) -> str:
+        return await self.shard_client.call_async(sheet_id, "cell", "set_cell_values", sheet_id, cells)
+
+    async def set_column_values(self, sheet_id: str, column: str, start_row: int, values: List[Any]) -> str:
+        return await self.shard_client.call_async(sheet_id, "cell", "set_column_values", sheet_id, column, start_row, values)
+
+    async def import_csv(self, sheet_id: str, chunks: AsyncIterator[bytes], start_row: int = 1) -> str:
+        # the shard parses the whole body; it is sent in one message
+        body = b"".join([chunk async for chunk in chunks])
+        return await self.shard_client.call_async(sheet_id, "cell", "import_csv", sheet_id, [body], start_row=start_row)
+
+
+def serve_shard(socket_path: str, authkey: bytes, data_dir: Optional[str] = None):
+    """
+    Run one shard worker: the regular services over this shard's own repository,
+    with one thread per front-end connection.
+    """
+    repository = DurableSheetRepository(data_dir) if data_dir else SheetRepository()
+    services = {"sheet": SheetService(repository), "cell": CellService(repository)}
+
+    def handle(connection: Connection):
+        with connection:
+            while True:
+                try:
+                    service, method, args, kwargs = connection.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    if method.startswith("_"):
+                        raise AttributeError(f"{method} is not a service method")
+                    result = (True, getattr(services[service], method)(*args, **kwargs))
+                except Exception as e:
+                    result = (False, e)
+                try:
+                    connection.send(result)
+                except (pickle.PicklingError, TypeError, AttributeError) as e:
+                    connection.send((False, RuntimeError(f"Shard result could not be sent: {e}")))
+
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+    with Listener(socket_path, family="AF_UNIX", authkey=authkey) as listener:
+        while True:
+            try:
+                connection = listener.accept()
+            except (OSError, EOFError, multiprocessing.AuthenticationError):
+                continue
+            threading.Thread(target=handle, args=(connection,), daemon=True).start()
+
+
+def start_shards(socket_dir: str, workers: int, authkey: bytes, data_dir: Optional[str] = None) -> List[multiprocessing.Process]:
+    """Start the shard worker processes and wait until each one accepts connections."""
+    os.makedirs(socket_dir, exist_ok=True)
+    context = multiprocessing.get_context("spawn")
+    processes = []
+    for shard in range(workers):
+        shard_data_dir = os.path.join(data_dir, f"shard-{shard}") if data_dir else None
+        process = context.Process(
+            target=serve_shard,
+            args=(shard_socket_path(socket_dir, shard), authkey, shard_data_dir),
+            daemon=True
+        )
+        process.start()
+        processes.append(process)
+
+    for shard in range(workers):
+        _wait_for_socket(shard_socket_path(socket_dir, shard), authkey)
+    return processes
+
+
+def _wait_for_socket(socket_path: str, authkey: bytes, attempts: int = 200):
+    for _ in range(attempts):
+        try:
+            Client(socket_path, family="AF_UNIX", authkey=authkey).close()
+            return
+        except (FileNotFoundError, ConnectionRefusedError):
+            time.sleep(0.05)
+    raise RuntimeError(f"Shard at {socket_path} did not start")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--socket-dir", required=True)
+    parser.add_argument("--data-dir", default=os.environ.get("SHEET_DATA_DIR"),
+                        help="persist each shard under <data-dir>/shard-<n> (in memory when omitted)")
+    args = parser.parse_args()
+
+    authkey = os.environ.get("SHEET_SHARD_AUTHKEY")
+    if not authkey:
+        parser.error("SHEET_SHARD_AUTHKEY must be set")
+
+    processes = start_shards(args.socket_dir, args.workers, authkey.encode(), args.data_dir)
+    print(f"{args.workers} shard workers listening in {args.socket_dir}")
+    for process in processes:
+        process.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+import codecs
+import csv
+import io
+import re
+from array import array
+from itertools import repeat
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from Models.sheet import Column, ColumnType, MAX_ROW, Sheet
+from exceptions import NotFoundError, ValidationError
+
+# Placeholder fields: an empty field leaves its cell untouched, so an empty string is
+# written as a quoted empty field "" and an empty cell as an empty field (a blank line
+# in a one-column file, where csv.writer would quote it). Lone surrogates, so they never
+# occur in text decoded from or encoded to UTF-8.
+EMPTY_STRING_FIELD = "\ud800"
+MISSING_FIELD = "\ud801"
+# csv.writer quotes a field holding "\n" but not one holding a lone "\r", which readers
+# take as a line break; "\r" is written as this pair so the field is quoted
+_CARRIAGE_RETURN = "\ud802\n"
+
+# A quoted field, matched from the start of a field so quoting is tracked field by field
+_QUOTED_FIELD = re.compile(r'(?<![^,\n])"(?:[^"]|"")*"')
+
+
+def _mark_empty_strings(text: str) -> str:
+    """The text with each quoted empty field replaced by EMPTY_STRING_FIELD."""
+    if '""' not in text:
+        return text
+    return _QUOTED_FIELD.sub(lambda match: EMPTY_STRING_FIELD if match.group() == '""' else match.group(), text)
+
+
+def csv_text(text: str) -> str:
+    """Text csv.writer wrote from format_value fields, with the placeholder fields written out."""
+    text = text.replace(MISSING_FIELD, "").replace(EMPTY_STRING_FIELD, '""')
+    return text.replace(_CARRIAGE_RETURN, "\r") if "\ud802" in text else text
+
+
+# Text of boolean fields, read case-insensitively
+_BOOLEAN_FIELDS = {"true": 1, "false": 0}
+
+
+def _parse_booleans(fields: Sequence[str]) -> List[int]:
+    return list(map(_BOOLEAN_FIELDS.__getitem__, map(str.lower, fields)))
+
+
+# Field parsers per column type, applied to a whole column of fields at once; each
+# returns values in typed buffer form and raises ValueError or KeyError on a bad field
+_PARSERS: Dict[ColumnType, Tuple[Callable[[Sequence[str]], List[Any]], Optional[str]]] = {
+    ColumnType.INT: (lambda fields: list(map(int, fields)), "q"),
+    ColumnType.DOUBLE: (lambda fields: list(map(float, fields)), "d"),
+    ColumnType.BOOLEAN: (_parse_booleans, "b"),
+    ColumnType.STRING: (list, None),
+}
+
+
+def format_value(value: Any) -> str:
+    """A cell value as CSV field text (see csv_text); read back by CsvImport into the same value."""
+    if value is None:
+        return MISSING_FIELD
+    if value == "":
+        return EMPTY_STRING_FIELD
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, str):
+        return value.replace("\r", _CARRIAGE_RETURN)
+    return str(value)
+
+
+def format_values(column_type: ColumnType, values: Sequence[Any]) -> List[str]:
+    """
+    format_value for a column's typed buffer values, a whole column at a time. Side-table
+    values (lookups, ints beyond 64 bits) may need format_value instead.
+    """
+    if column_type == ColumnType.STRING:
+        values = list(values)
+        if "" in values:
+            values = [value or EMPTY_STRING_FIELD for value in values]
+        if "\r" in "".join(values):
+            values = [value.replace("\r", _CARRIAGE_RETURN) for value in values]
+        return values
+    if column_type == ColumnType.BOOLEAN:
+        return list(map(_BOOLEAN_TEXT.get, values))
+    return list(map(str, values))
+
+
+_BOOLEAN_TEXT = {True: "true", False: "false"}
+
+
+class CsvImport:
+    """
+    Parses a CSV body, fed in chunks of bytes, into values ready to write to a sheet.
+    The header names sheet columns (any subset, in any order); data line n becomes
+    row start_row + n - 1. An empty field leaves its cell untouched; a quoted empty
+    field "" is an empty string. Fields are
+    parsed a column of one chunk at a time rather than field by field.
+
+    After close():
+      - runs maps a column index to (start row, values) runs of consecutive plain
+        values, as ColumnStore.set_values takes them;
+      - formulas lists (column index, row, text) for fields containing "(", which
+        may be lookups and are left to the caller;
+      - cells counts the non-empty fields.
+    """
+
+    def __init__(self, sheet: Sheet, start_row: int = 1):
+        if not 1 <= start_row <= MAX_ROW:
+            raise ValidationError(f"start_row must be between 1 and {MAX_ROW}")
+        self.sheet = sheet
+        self.next_row = start_row
+        self.columns: Optional[List[Column]] = None
+        self.runs: Dict[int, List[Tuple[int, Any]]] = {}
+        self.formulas: List[Tuple[int, int, str]] = []
+        self.cells = 0
+        self._decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self._text = ""
+
+    def feed(self, data: bytes):
+        try:
+            self._text += self._decoder.decode(data)
+        except UnicodeDecodeError as e:
+            raise ValidationError(f"CSV is not valid UTF-8: {e}")
+        # a line break ends a record only outside quotes, i.e. after an even number of them
+        end = self._text.rfind("\n") + 1
+        while end and self._text.count('"', 0, end) % 2:
+            end = self._text.rfind("\n", 0, end - 1) + 1
+        if end:
+            text, self._text = self._text[:end], self._text[end:]
+            self._parse(text)
+
+    def close(self):
+        try:
+            text = self._text + self._decoder.decode(b"", final=True)
+        except UnicodeDecodeError as e:
+            raise ValidationError(f"CSV is not valid UTF-8: {e}")
+        self._text = ""
+        if text:
+            self._parse(text)
+        if self.columns is None:
+            raise ValidationError("CSV has no header line")
+
+    def _parse(self, text: str):
+        """Parse whole records: split into columns of fields, then parse each column."""
+        columns = self._split_lines(text)
+        if columns is None:
+            return
+
+        start_row = self.next_row
+        row_count = len(columns[0])
+        self.next_row += row_count
+        if self.next_row - 1 > MAX_ROW:
+            raise ValidationError(f"Row number must not exceed {MAX_ROW}")
+        for column_def, fields in zip(self.columns, columns):
+            self._parse_column(column_def, fields, start_row)
+
+    def _split_lines(self, text: str) -> Optional[List[Sequence[str]]]:
+        """
+        Fast path: every field of the text in one split, sliced into columns. Lines with
+        quotes go through the csv module one by one and are patched in; text the fast
+        path cannot take (fields spanning lines, blank lines, stray carriage returns,
+        carriage returns next to quotes, ragged records) goes to _split_records whole.
+        None without records.
+        """
+        if "\r" in text:
+            # "\r\n" may sit inside a quoted field, where it is part of the value
+            if '"' in text or "\r" in text.replace("\r\n", ""):
+                return self._split_records(text)
+            text = text.replace("\r\n", "\n")
+        lines = text[:-1].split("\n") if text.endswith("\n") else text.split("\n")
+        quoted = [offset for offset, line in enumerate(lines) if '"' in line] if '"' in text else []
+        if any(lines[offset].count('"') % 2 for offset in quoted):
+            return self._split_records(text)
+        if self.columns is None:
+            self._set_header(self._read_records(lines[0])[0] if quoted[:1] == [0] else lines[0].split(","))
+            lines = lines[1:]
+            quoted = [offset - 1 for offset in quoted if offset]
+        if not lines or lines == [""]:
+            return None
+
+        width = len(self.columns)
+        records = self._read_records("\n".join([lines[offset] for offset in quoted])) if quoted else []
+        unquoted = lines
+        if quoted:
+            unquoted = list(lines)
+            blank = "," * (width - 1)
+            for offset in quoted:
+                unquoted[offset] = blank
+        # every line must hold width fields itself; a total that adds up is not enough
+        if set(map(str.count, unquoted, repeat(","))) != {width - 1} or any(len(record) != width for record in records):
+            return self._split_records("\n".join(lines) + "\n")
+        fields = ",".join(unquoted).split(",")
+        columns = [fields[index::width] for index in range(width)]
+        for offset, record in zip(quoted, records):
+            for fields, field in zip(columns, record):
+                fields[offset] = field
+        return columns
+
+    def _read_records(self, text: str) -> List[List[str]]:
+        try:
+            return list(csv.reader(io.StringIO(_mark_empty_strings(text), newline=""), strict=True))
+        except csv.Error as e:
+            raise ValidationError(f"Malformed CSV near row {self.next_row}: {e}")
+
+    def _split_records(self, text: str) -> Optional[List[Sequence[str]]]:
+        records = self._read_records(text)
+        if self.columns is None and records:
+            self._set_header(records.pop(0))
+        if not records:
+            return None
+
+        width = len(self.columns)
+        if set(map(len, records)) != {width}:
+            for offset, record in enumerate(records):
+                if not record:
+                    records[offset] = [""] * width
+                elif len(record) != width:
+                    raise ValidationError(f"Row {self.next_row + offset} has {len(record)} fields, expected {width}")
+        return list(zip(*records))
+
+    def _set_header(self, names: List[str]):
+        self.columns = self._header(names)
+        if not self.columns:
+            raise ValidationError("CSV header names no columns")
+
+    def _header(self, names: List[str]) -> List[Column]:
+        columns = []
+        for name in names:
+            column_def = self.sheet.get_column(name)
+            if column_def is None:
+                raise NotFoundError(f"Column '{name}' not found in sheet")
+            if column_def in columns:
+                raise ValidationError(f"Column '{name}' appears more than once in the CSV header")
+            columns.append(column_def)
+        return columns
+
+    def _parse_column(self, column_def: Column, fields: Sequence[str], start_row: int):
+        if "" not in fields and "(" not in "".join(fields):
+            self._add_run(column_def, start_row, fields)
+            return
+
+        # empty fields and formulas split the column into runs of plain values
+        run_start = None
+        for offset, field in enumerate(fields):
+            if field and "(" not in field:
+                if run_start is None:
+                    run_start = offset
+                continue
+            if run_start is not None:
+                self._add_run(column_def, start_row + run_start, fields[run_start:offset])
+                run_start = None
+            if field:
+                self.formulas.append((column_def.index, start_row + offset, field))
+                self.cells += 1
+        if run_start is not None:
+            self._add_run(column_def, start_row + run_start, fields[run_start:])
+
+    def _add_run(self, column_def: Column, start_row: int, fields: Sequence[str]):
+        if EMPTY_STRING_FIELD in fields:
+            fields = ["" if field == EMPTY_STRING_FIELD else field for field in fields]
+        parse, typecode = _PARSERS[column_def.type]
+        try:
+            values = parse(fields)
+        except (ValueError, KeyError):
+            self._raise_for_bad_field(column_def, start_row, fields)
+        if typecode is not None:
+            try:
+                values = array(typecode, values)
+            except OverflowError:
+                # ints beyond 64 bits stay a list and are set row by row
+                pass
+        self.cells += len(values)
+
+        runs = self.runs.setdefault(column_def.index, [])
+        if runs:
+            last_start, last_values = runs[-1]
+            if last_start + len(last_values) == start_row and type(last_values) is type(values):
+                last_values.extend(values)
+                return
+        runs.append((start_row, values))
+
+    def _raise_for_bad_field(self, column_def: Column, start_row: int, fields: Sequence[str]):
+        parse, _ = _PARSERS[column_def.type]
+        for offset, field in enumerate(fields):
+            try:
+                parse([field])
+            except (ValueError, KeyError):
+                raise ValidationError(
+                    f"Value type mismatch in {column_def.name}{start_row + offset}. "
+                    f"Expected {column_def.type.value}, got '{field}'"
+                )
@@ -0,0 +1,207 @@
+import asyncio
+import threading
+from typing import Any, Dict, List, Optional, Set, Tuple
+from Models.sheet import Sheet, split_cell_key
+from locks import resolve_future
+from serialization import dumps
+
+# Distinct cells a subscriber may have waiting before it is sent a fresh snapshot instead
+MAX_PENDING_CELLS = 10000
+
+
+def sse_event(name: str, version: str, data: bytes) -> bytes:
+    """One server-sent event; its id is the sheet version the data reflects."""
+    return b"event: " + name.encode() + b"\nid: " + version.encode() + b"\ndata: " + data + b"\n\n"
+
+
+def update_event(version: str, cells: List[Dict[str, Any]]) -> bytes:
+    return sse_event("update", version, dumps({"version": version, "cells": cells}))
+
+
+class ChangeBatch:
+    """
+    The cells one write changed, as (cell key, cell) in cell key order, shared by every
+    subscription it is offered to. Its update event is encoded at most once.
+    """
+    __slots__ = ("version", "changes", "_event")
+
+    def __init__(self, version: str, changes: List[Tuple[int, Dict[str, Any]]]):
+        self.version = version
+        self.changes = changes
+        self._event: Optional[bytes] = None
+
+    def event(self) -> bytes:
+        if self._event is None:
+            self._event = update_event(self.version, [cell for _, cell in self.changes])
+        return self._event
+
+
+class Subscription:
+    """
+    One subscriber's window on a sheet: the watched columns (all when None) and rows,
+    and the changes in it not yet delivered. Changes coalesce per cell, so a slow
+    consumer only ever receives the latest value of each cell; once more than
+    max_pending cells are waiting, they are dropped and the subscriber is flagged to
+    resync from a snapshot instead. A single waiting batch that lies wholly in the
+    window is kept as is, so subscribers that keep up share its encoded event.
+    Changes may be offered from any thread.
+    """
+
+    def __init__(self, column_indexes: Optional[Set[int]], start_row: int, end_row: int,
+                 max_pending: Optional[int] = None):
+        self.column_indexes = column_indexes
+        self.start_row = start_row
+        self.end_row = end_row
+        self.max_pending = MAX_PENDING_CELLS if max_pending is None else max_pending
+        self._loop = asyncio.get_running_loop()
+        self._ready = False
+        self._waiter: Optional[asyncio.Future] = None
+        self._lock = threading.Lock()
+        self._batch: Optional[ChangeBatch] = None
+        self._pending: Dict[int, Dict[str, Any]] = {}
+        self._version: Optional[str] = None
+        self._resync = False
+
+    def watches(self, cell_key: int) -> bool:
+        column_index, row = split_cell_key(cell_key)
+        if self.column_indexes is not None and column_index not in self.column_indexes:
+            return False
+        return self.start_row <= row <= self.end_row
+
+    def offer(self, batch: ChangeBatch):
+        """Queue the changes of the batch this subscriber watches."""
+        with self._lock:
+            if self._resync:
+                return
+            watched = [change for change in batch.changes if self.watches(change[0])]
+            if not watched:
+                return
+            if len(watched) > self.max_pending:
+                self._batch = None
+                self._pending.clear()
+                self._resync = True
+            elif self._batch is None and not self._pending and len(watched) == len(batch.changes):
+                self._batch = batch
+            else:
+                if self._batch is not None:
+                    self._pending.update(self._batch.changes)
+                    self._batch = None
+                self._pending.update(watched)
+                self._version = batch.version
+                if len(self._pending) > self.max_pending:
+                    self._pending.clear()
+                    self._resync = True
+        self._wake()
+
+    def request_resync(self):
+        with self._lock:
+            self._batch = None
+            self._pending.clear()
+            self._resync = True
+        self._wake()
+
+    async def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait until changes are waiting or timeout seconds pass; return whether changes are waiting."""
+        if self._ready:
+            return True
+        self._waiter = self._loop.create_future()
+        timer = self._loop.call_later(timeout, resolve_future, self._waiter) if timeout is not None else None
+        try:
+            await self._waiter
+        finally:
+            self._waiter = None
+            if timer is not None:
+                timer.cancel()
+        return self._ready
+
+    def take(self) -> Tuple[bool, Optional[bytes]]:
+        """(resync needed, update event for the waiting changes or None), clearing them."""
+        with self._lock:
+            self._ready = False
+            resync, batch, pending, version = self._resync, self._batch, self._pending, self._version
+            self._resync, self._batch, self._pending = False, None, {}
+        if batch is not None:
+            return resync, batch.event()
+        if pending:
+            return resync, update_event(version, [pending[cell_key] for cell_key in sorted(pending)])
+        return resync, None
+
+    def _wake(self):
+        try:
+            self._loop.call_soon_threadsafe(self._set_ready)
+        except RuntimeError:
+            # the subscriber's event loop is closed
+            pass
+
+    def _set_ready(self):
+        self._ready = True
+        if self._waiter is not None:
+            resolve_future(self._waiter)
+
+
+class _SheetFeed:
+    __slots__ = ("subscriptions", "epoch", "version")
+
+    def __init__(self, sheet: Sheet):
+        self.subscriptions: List[Subscription] = []
+        self.epoch = sheet.version_epoch
+        self.version = sheet.version
+
+
+class ChangeFeeds:
+    """
+    Fans sheet changes out to subscriptions. After each write, publish reads the cells
+    changed since the previous publish once (from the sheet's change log, so lookup
+    cells updated through their chain are included) and offers that one batch to every
+    subscription of the sheet. Sheets without subscribers cost one dict lookup.
+    """
+
+    def __init__(self):
+        self._feeds: Dict[str, _SheetFeed] = {}
+        self._mutex = threading.Lock()
+
+    def subscribe(self, sheet: Sheet, subscription: Subscription):
+        """Add a subscription; the caller holds the sheet's read lock while it takes its snapshot."""
+        with self._mutex:
+            feed = self._feeds.get(sheet.id)
+            if feed is None:
+                feed = self._feeds[sheet.id] = _SheetFeed(sheet)
+            feed.subscriptions.append(subscription)
+
+    def unsubscribe(self, sheet_id: str, subscription: Subscription):
+        with self._mutex:
+            feed = self._feeds.get(sheet_id)
+            if feed is None or subscription not in feed.subscriptions:
+                return
+            feed.subscriptions.remove(subscription)
+            if not feed.subscriptions:
+                del self._feeds[sheet_id]
+
+    def publish(self, sheet: Sheet):
+        """Offer the sheet's latest changes to its subscribers; the caller holds the sheet's write lock."""
+        with self._mutex:
+            feed = self._feeds.get(sheet.id)
+            if feed is None:
+                return
+            subscriptions = list(feed.subscriptions)
+            changed = sheet.changes_since(feed.version) if feed.epoch == sheet.version_epoch else None
+            feed.epoch, feed.version = sheet.version_epoch, sheet.version
+
+        if changed is None:
+            for subscription in subscriptions:
+                subscription.request_resync()
+            return
+        changes = []
+        for cell_key in changed:
+            column_index, row = split_cell_key(cell_key)
+            changes.append((cell_key, {
+                "column": sheet.column_name(column_index), "row": row, "value": sheet.get_resolved_value(cell_key)
+            }))
+        batch = ChangeBatch(sheet.version_token, changes)
+        for subscription in subscriptions:
+            subscription.offer(batch)
+
+
+# Used by services built without a ChangeFeeds of their own, as ServiceContainer
+# builds them: its cell service publishes writes here and its sheet service subscribes
+change_feeds = ChangeFeeds()
@@ -1,3 +1,4 @@
+import json
 import pytest
 from fastapi.testclient import TestClient
 from main import app
@@ -62,6 +63,140 @@ class TestSheetAPI:
         assert "not found" in response.json()["detail"].lower()
 
 
+    def test_get_sheet_answers_if_none_match_until_the_sheet_changes(self):
+        sheet_id = client.post("/sheets", json={"columns": [{"name": "A", "type": "int"}]}).json()["sheet_id"]
+        first = client.get(f"/sheets/{sheet_id}")
+        etag = first.headers["ETag"]
+
+        unchanged = client.get(f"/sheets/{sheet_id}", headers={"If-None-Match": etag})
+        assert unchanged.status_code == 304
+        assert unchanged.headers["ETag"] == etag
+        assert unchanged.content == b""
+
+        client.put(f"/cells/sheets/{sheet_id}", json={"column": "A", "row": 1, "value": 5})
+        changed = client.get(f"/sheets/{sheet_id}", headers={"If-None-Match": etag})
+        assert changed.status_code == 200
+        assert changed.headers["ETag"] != etag
+        assert changed.json()["cells"] == [{"column": "A", "row": 1, "value": 5}]
+
+    def test_get_sheet_changes_returns_cells_changed_since_a_version(self):
+        sheet_id = client.post("/sheets", json={"columns": [{"name": "A", "type": "int"}, {"name": "B", "type": "int"}]}).json()["sheet_id"]
+        client.put(f"/cells/sheets/{sheet_id}", json={"column": "B", "row": 1, "value": "lookup(A,1)"})
+        version = client.get(f"/sheets/{sheet_id}/changes").json()["version"]
+
+        client.put(f"/cells/sheets/{sheet_id}", json={"column": "A", "row": 1, "value": 3})
+        response = client.get(f"/sheets/{sheet_id}/changes", params={"since": version})
+
+        assert response.status_code == 200
+        assert response.json()["snapshot"] is False
+        assert response.json()["cells"] == [{"column": "A", "row": 1, "value": 3}, {"column": "B", "row": 1, "value": 3}]
+        assert client.get(f"/sheets/{sheet_id}/changes", params={"since": "bad"}).status_code == 422
+
+    def test_get_cell_dependents_lists_the_cells_looking_it_up(self):
+        sheet_id = client.post("/sheets", json={"columns": [{"name": "A", "type": "int"}, {"name": "B", "type": "int"}]}).json()["sheet_id"]
+        client.put(f"/cells/sheets/{sheet_id}", json={"column": "B", "row": 1, "value": "lookup(A,1)"})
+        client.put(f"/cells/sheets/{sheet_id}", json={"column": "B", "row": 2, "value": "lookup(B,1)"})
+
+        direct = client.get(f"/sheets/{sheet_id}/cells/A/1/dependents")
+        transitive = client.get(f"/sheets/{sheet_id}/cells/A/1/dependents", params={"transitive": True})
+
+        assert direct.status_code == 200
+        assert direct.json()["dependents"] == [{"column": "B", "row": 1}]
+        assert transitive.json()["dependents"] == [{"column": "B", "row": 1}, {"column": "B", "row": 2}]
+        client.put(f"/cells/sheets/{sheet_id}", json={"column": "B", "row": 1, "value": 4})
+        assert client.get(f"/sheets/{sheet_id}/cells/A/1/dependents").json()["dependents"] == []
+        assert client.get(f"/sheets/{sheet_id}/cells/C/1/dependents").status_code == 404
+
+    def test_import_then_export_csv(self):
+        sheet_id = client.post("/sheets", json={"columns": [{"name": "A", "type": "int"}, {"name": "B", "type": "int"}]}).json()["sheet_id"]
+
+        imported = client.post(f"/sheets/{sheet_id}/import", content=b'B,A\n"lookup(A,1)",3\n,4\n')
+        exported = client.get(f"/sheets/{sheet_id}/export")
+        resolved = client.get(f"/sheets/{sheet_id}/export", params={"resolved": True, "end_row": 1})
+
+        assert imported.status_code == 200
+        assert imported.json() == {"sheet_id": sheet_id, "message": "3 cell values imported successfully"}
+        assert exported.status_code == 200
+        assert exported.headers["content-type"].startswith("text/csv")
+        assert exported.text == 'A,B\n3,"lookup(A,1)"\n4,\n'
+        assert resolved.text == "A,B\n3,3\n"
+
+    def test_import_csv_errors_map_to_status_codes(self):
+        sheet_id = client.post("/sheets", json={"columns": [{"name": "A", "type": "int"}]}).json()["sheet_id"]
+
+        assert client.post(f"/sheets/{sheet_id}/import", content=b"A\nx\n").status_code == 422
+        assert client.post(f"/sheets/{sheet_id}/import", content=b"Z\n1\n").status_code == 404
+        assert client.post("/sheets/nonexistent-id/import", content=b"A\n1\n").status_code == 404
+        assert client.get("/sheets/nonexistent-id/export").status_code == 404
+
+    def test_get_sheet_cells_paginates_with_cursor(self):
+        create_response = client.post("/sheets", json={"columns": [{"name": "A", "type": "int"}]})
+        sheet_id = create_response.json()["sheet_id"]
+        client.put(f"/cells/sheets/{sheet_id}/batch", json={
+            "cells": [{"column": "A", "row": row, "value": row} for row in range(1, 6)]
+        })
+
+        first = client.get(f"/sheets/{sheet_id}/cells", params={"limit": 3}).json()
+        second = client.get(f"/sheets/{sheet_id}/cells", params={"limit": 3, "cursor": first["next_cursor"]}).json()
+
+        assert [cell["row"] for cell in first["cells"]] == [1, 2, 3]
+        assert [cell["row"] for cell in second["cells"]] == [4, 5]
+        assert second["next_cursor"] is None
+
+    def test_get_sheet_cells_with_invalid_cursor_returns_422(self):
+        create_response = client.post("/sheets", json={"columns": [{"name": "A", "type": "int"}]})
+        sheet_id = create_response.json()["sheet_id"]
+
+        response = client.get(f"/sheets/{sheet_id}/cells", params={"cursor": "abc"})
+
+        assert response.status_code == 422
+
+    def test_query_sheet_returns_column_subset_and_row_range(self):
+        create_response = client.post("/sheets", json={"columns": [
+            {"name": "A", "type": "int"}, {"name": "B", "type": "int"}, {"name": "C", "type": "int"}
+        ]})
+        sheet_id = create_response.json()["sheet_id"]
+        client.put(f"/cells/sheets/{sheet_id}/batch", json={"cells": [
+            {"column": column, "row": row, "value": row}
+            for column in ("A", "B") for row in range(1, 11)
+        ] + [{"column": "C", "row": 3, "value": "lookup(A,3)"}]})
+
+        response = client.get(f"/sheets/{sheet_id}/query", params={"columns": ["B", "C"], "start_row": 2, "end_row": 3})
+
+        assert response.status_code == 200
+        data = response.json()
+        assert [col["name"] for col in data["columns"]] == ["B", "C"]
+        assert [(cell["column"], cell["row"], cell["value"]) for cell in data["cells"]] == [
+            ("B", 2, 2), ("B", 3, 3), ("C", 3, 3)
+        ]
+
+    def test_query_sheet_with_unknown_column_returns_404(self):
+        create_response = client.post("/sheets", json={"columns": [{"name": "A", "type": "int"}]})
+        sheet_id = create_response.json()["sheet_id"]
+
+        response = client.get(f"/sheets/{sheet_id}/query", params={"columns": ["Z"]})
+
+        assert response.status_code == 404
+
+    def test_stream_sheet_returns_ndjson(self):
+        create_response = client.post("/sheets", json={"columns": [{"name": "A", "type": "string"}]})
+        sheet_id = create_response.json()["sheet_id"]
+        client.put(f"/cells/sheets/{sheet_id}", json={"column": "A", "row": 1, "value": "hello"})
+
+        response = client.get(f"/sheets/{sheet_id}/stream")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert lines[0]["sheet_id"] == sheet_id
+        assert lines[1:] == [{"column": "A", "row": 1, "value": "hello"}]
+
+    def test_stream_nonexistent_sheet_returns_404(self):
+        response = client.get("/sheets/nonexistent-id/stream")
+
+        assert response.status_code == 404
+
+
 class TestCellAPI:
     def test_set_cell_with_valid_data(self):
         create_data = {
@@ -125,6 +260,78 @@ class TestCellAPI:
         assert response.status_code == 404
         assert "column" in response.json()["detail"].lower()
 
+    def test_set_cells_batch_with_valid_data(self):
+        create_data = {
+            "columns": [
+                {"name": "A", "type": "string"},
+                {"name": "B", "type": "string"}
+            ]
+        }
+        create_response = client.post("/sheets", json=create_data)
+        sheet_id = create_response.json()["sheet_id"]
+
+        response = client.put(f"/cells/sheets/{sheet_id}/batch", json={"cells": [
+            {"column": "A", "row": 1, "value": "hello"},
+            {"column": "B", "row": 1, "value": "lookup(A,1)"}
+        ]})
+
+        assert response.status_code == 200
+        assert response.json()["message"] == "2 cell values set successfully"
+
+        data = client.get(f"/sheets/{sheet_id}").json()
+        cell_values = {(cell["column"], cell["row"]): cell["value"] for cell in data["cells"]}
+        assert cell_values == {("A", 1): "hello", ("B", 1): "hello"}
+
+    def test_set_cells_batch_with_invalid_cell_returns_422_and_writes_nothing(self):
+        create_data = {
+            "columns": [{"name": "A", "type": "int"}]
+        }
+        create_response = client.post("/sheets", json=create_data)
+        sheet_id = create_response.json()["sheet_id"]
+
+        response = client.put(f"/cells/sheets/{sheet_id}/batch", json={"cells": [
+            {"column": "A", "row": 1, "value": 1},
+            {"column": "A", "row": 2, "value": "not_int"}
+        ]})
+
+        assert response.status_code == 422
+        assert "type mismatch" in response.json()["detail"].lower()
+        assert client.get(f"/sheets/{sheet_id}").json()["cells"] == []
+
+
+    def test_set_column_values(self):
+        sheet_id = client.post("/sheets", json={"columns": [{"name": "A", "type": "int"}]}).json()["sheet_id"]
+
+        response = client.put(f"/cells/sheets/{sheet_id}/columns/A", json={"start_row": 2, "values": [1, None, "lookup(A,2)"]})
+        invalid = client.put(f"/cells/sheets/{sheet_id}/columns/A", json={"values": [1, "x"]})
+        missing = client.put(f"/cells/sheets/{sheet_id}/columns/Z", json={"values": [1]})
+
+        assert response.status_code == 200
+        assert response.json() == {"message": "2 cell values set successfully"}
+        cells = client.get(f"/sheets/{sheet_id}").json()["cells"]
+        assert [(cell["row"], cell["value"]) for cell in cells] == [(2, 1), (4, 1)]
+        assert invalid.status_code == 422
+        assert missing.status_code == 404
+
+
+    def test_ints_are_kept_as_written_in_double_columns(self):
+        sheet_id = client.post("/sheets", json={"columns": [{"name": "A", "type": "double"}]}).json()["sheet_id"]
+
+        single = client.put(f"/cells/sheets/{sheet_id}", json={"column": "A", "row": 1, "value": 10 ** 400})
+        batch = client.put(f"/cells/sheets/{sheet_id}/batch", json={"cells": [
+            {"column": "A", "row": 2, "value": 2.5}, {"column": "A", "row": 3, "value": 2 ** 60 + 1}
+        ]})
+        column = client.put(f"/cells/sheets/{sheet_id}/columns/A", json={"start_row": 4, "values": [1.5, 10 ** 400, 2 ** 60 + 1, 5]})
+
+        assert (single.status_code, batch.status_code, column.status_code) == (200, 200, 200)
+        cells = client.get(f"/sheets/{sheet_id}").json()["cells"]
+        assert [(cell["row"], cell["value"]) for cell in cells] == [
+            (1, 10 ** 400), (2, 2.5), (3, 2 ** 60 + 1), (4, 1.5), (5, 10 ** 400), (6, 2 ** 60 + 1), (7, 5)
+        ]
+        assert type(cells[6]["value"]) is int
+        export = client.get(f"/sheets/{sheet_id}/export", params={"start_row": 7})
+        assert export.text.splitlines()[1] == "5"
+
 
 class TestLookupIntegration:
     def test_set_lookup_cell_and_resolve_value(self):
@@ -1,7 +1,14 @@
+import asyncio
+import random
+import threading
 import pytest
 from unittest.mock import Mock
+from Services import async_cell_service
 from Services.cell_service import CellService
-from Models.sheet import Sheet, Cell, ColumnType
+from Services.async_cell_service import AsyncCellService
+from Repository.sheet_repository import SheetRepository
+from Repository.async_sheet_repository import make_async_repository
+from Models.sheet import Sheet, Cell, ColumnType, MAX_ROW
 from exceptions import NotFoundError, ValidationError
 
 
@@ -15,9 +22,9 @@ class TestCellService:
         result = service.set_cell_value("sheet-id", "A", 1, "hello")
         
         assert result == "Cell value set successfully"
-        assert "A_1" in mock_sheet.cells
-        assert mock_sheet.cells["A_1"].value == "hello"
-        assert mock_sheet.cells["A_1"].is_lookup is False
+        assert mock_sheet.cell_key("A", 1) in mock_sheet.cells
+        assert mock_sheet.cells[mock_sheet.cell_key("A", 1)].value == "hello"
+        assert mock_sheet.cells[mock_sheet.cell_key("A", 1)].is_lookup is False
         mock_repo.save.assert_called_once_with(mock_sheet)
 
     def test_set_cell_value_raises_not_found_for_missing_sheet(self):
@@ -99,6 +106,17 @@ class TestCellService:
         assert service._parse_lookup_string("LOOKUP(A,1)") is None
         assert service._parse_lookup_string(123) is None
 
+    def test_parse_lookup_string_edge_cases(self):
+        service = CellService(Mock())
+
+        assert service._parse_lookup_string("  lookup(a,7)\n") == ("A", 7)
+        assert service._parse_lookup_string("lookup(A,1,2)") is None
+        assert service._parse_lookup_string("lookup(A,)") is None
+        assert service._parse_lookup_string("lookup(,1)") is None
+        assert service._parse_lookup_string("lookup(A, 1)") is None
+        assert service._parse_lookup_string("lookup(\u00e9,1)") is None
+        assert service._parse_lookup_string("lookup(A,\u00b2)") is None
+
     def test_is_lookup_string(self):
         service = CellService(Mock())
         
@@ -114,17 +132,16 @@ class TestCellService:
             {"name": "B", "type": "string"}
         ])
         mock_repo.get_by_id.return_value = mock_sheet
-        mock_sheet.cells["A_1"] = Cell(value="hello")
+        mock_sheet.cells[mock_sheet.cell_key("A", 1)] = Cell(value="hello")
         service = CellService(mock_repo)
 
         result = service.set_cell_value("sheet-id", "B", 1, "lookup(A,1)")
         
         assert result == "Cell value set successfully"
-        assert "B_1" in mock_sheet.cells
-        cell = mock_sheet.cells["B_1"]
+        assert mock_sheet.cell_key("B", 1) in mock_sheet.cells
+        cell = mock_sheet.cells[mock_sheet.cell_key("B", 1)]
         assert cell.is_lookup is True
-        assert cell.lookup_column == "A"
-        assert cell.lookup_row == "1"
+        assert cell.lookup_key == mock_sheet.cell_key("A", 1)
         assert cell.value == "lookup(A,1)"
 
     def test_set_lookup_cell_with_type_mismatch_raises_error(self):
@@ -199,7 +216,7 @@ class TestCellService:
     def test_resolve_cell_value_with_regular_cell(self):
         mock_repo = Mock()
         mock_sheet = Sheet([{"name": "A", "type": "string"}])
-        mock_sheet.cells["A_1"] = Cell(value="hello")
+        mock_sheet.cells[mock_sheet.cell_key("A", 1)] = Cell(value="hello")
         
         service = CellService(mock_repo)
         result = service._resolve_cell_value(mock_sheet, "A", 1)
@@ -214,20 +231,16 @@ class TestCellService:
             {"name": "C", "type": "string"}
         ])
 
-        mock_sheet.cells["A_1"] = Cell(value="final_value")
-        mock_sheet.cells["B_1"] = Cell(
+        mock_sheet.cells[mock_sheet.cell_key("A", 1)] = Cell(value="final_value")
+        mock_sheet.cells[mock_sheet.cell_key("B", 1)] = Cell(
             value="lookup(A,1)",
-            is_lookup=True,
-            lookup_column="A",
-            lookup_row="1"
+            lookup_key=mock_sheet.cell_key("A", 1)
         )
         
         # C1 looks up B1 (which looks up A1)
-        mock_sheet.cells["C_1"] = Cell(
+        mock_sheet.cells[mock_sheet.cell_key("C", 1)] = Cell(
             value="lookup(B,1)",
-            is_lookup=True,
-            lookup_column="B",
-            lookup_row="1"
+            lookup_key=mock_sheet.cell_key("B", 1)
         )
         
         service = CellService(mock_repo)
@@ -235,6 +248,29 @@ class TestCellService:
         
         assert result == "final_value"
 
+    def test_lookup_sources_follow_rewritten_links(self):
+        mock_repo = Mock()
+        mock_sheet = Sheet([{"name": "A", "type": "int"}])
+        mock_repo.get_by_id.return_value = mock_sheet
+        service = CellService(mock_repo)
+        a1, a3, a4 = (mock_sheet.cell_key("A", row) for row in (1, 3, 4))
+        service.set_cell_value("sheet-id", "A", 4, 4)
+        service.set_cell_value("sheet-id", "A", 3, "lookup(A,4)")
+        service.set_cell_value("sheet-id", "A", 2, "lookup(A,3)")
+        service.set_cell_value("sheet-id", "A", 1, "lookup(A,2)")
+
+        assert mock_sheet.get_lookup_cell(a1).source_key == a4
+
+        service.set_cell_value("sheet-id", "A", 4, 40)
+        assert mock_sheet.get_lookup_cell(a1).source_key == a4
+        service.set_cell_value("sheet-id", "A", 2, 2)
+        assert mock_sheet.get_lookup_cell(a1).source_key == mock_sheet.cell_key("A", 2)
+        assert service._resolve_cell_value(mock_sheet, "A", 1) == 2
+        service.set_cell_values("sheet-id", [("A", 2, "lookup(A,3)"), ("A", 3, "lookup(A,5)")])
+        assert mock_sheet.get_lookup_cell(a1).source_key == mock_sheet.cell_key("A", 5)
+        assert mock_sheet.get_lookup_cell(a3).source_key == mock_sheet.cell_key("A", 5)
+        assert service._resolve_cell_value(mock_sheet, "A", 1) is None
+
     def test_resolve_cell_value_for_nonexistent_cell_returns_none(self):
         mock_repo = Mock()
         mock_sheet = Sheet([{"name": "A", "type": "string"}])
@@ -242,4 +278,439 @@ class TestCellService:
         service = CellService(mock_repo)
         result = service._resolve_cell_value(mock_sheet, "A", 1)
         
-        assert result is None
\ No newline at end of file
+        assert result is None
+
+    def test_resolved_value_is_materialized_on_write(self):
+        mock_repo = Mock()
+        mock_sheet = Sheet([
+            {"name": "A", "type": "string"},
+            {"name": "B", "type": "string"}
+        ])
+        mock_repo.get_by_id.return_value = mock_sheet
+        service = CellService(mock_repo)
+
+        service.set_cell_value("sheet-id", "A", 1, "hello")
+        service.set_cell_value("sheet-id", "B", 1, "lookup(A,1)")
+
+        assert mock_sheet.cells[mock_sheet.cell_key("A", 1)].resolved_value == "hello"
+        assert mock_sheet.cells[mock_sheet.cell_key("B", 1)].resolved_value == "hello"
+
+    def test_write_propagates_to_transitive_dependents(self):
+        mock_repo = Mock()
+        mock_sheet = Sheet([
+            {"name": "A", "type": "string"},
+            {"name": "B", "type": "string"},
+            {"name": "C", "type": "string"}
+        ])
+        mock_repo.get_by_id.return_value = mock_sheet
+        service = CellService(mock_repo)
+
+        service.set_cell_value("sheet-id", "A", 1, "first")
+        service.set_cell_value("sheet-id", "B", 1, "lookup(A,1)")
+        service.set_cell_value("sheet-id", "C", 1, "lookup(B,1)")
+        service.set_cell_value("sheet-id", "A", 1, "second")
+
+        assert mock_sheet.cells[mock_sheet.cell_key("B", 1)].resolved_value == "second"
+        assert mock_sheet.cells[mock_sheet.cell_key("C", 1)].resolved_value == "second"
+
+    def test_writes_log_the_dependents_they_change_through_lookup_chains(self):
+        mock_repo = Mock()
+        mock_sheet = Sheet([{"name": "A", "type": "int"}, {"name": "B", "type": "int"}, {"name": "C", "type": "int"}])
+        mock_repo.get_by_id.return_value = mock_sheet
+        service = CellService(mock_repo)
+        a1, b1, c1, c2 = (mock_sheet.cell_key(column, row) for column, row in (("A", 1), ("B", 1), ("C", 1), ("C", 2)))
+
+        service.set_cell_value("sheet-id", "B", 1, "lookup(A,1)")
+        service.set_cell_value("sheet-id", "C", 1, "lookup(B,1)")
+        service.set_cell_value("sheet-id", "C", 2, 7)
+        version = mock_sheet.version
+        service.set_cell_value("sheet-id", "A", 1, 1)
+        assert mock_sheet.changes_since(version) == [a1, b1, c1]
+
+        version = mock_sheet.version
+        service.set_cell_values("sheet-id", [("A", 1, 2), ("C", 2, 8)])
+        assert mock_sheet.changes_since(version) == [a1, b1, c1, c2]
+
+    def test_lookup_written_before_its_target_picks_up_target_value(self):
+        mock_repo = Mock()
+        mock_sheet = Sheet([
+            {"name": "A", "type": "string"},
+            {"name": "B", "type": "string"}
+        ])
+        mock_repo.get_by_id.return_value = mock_sheet
+        service = CellService(mock_repo)
+
+        service.set_cell_value("sheet-id", "B", 1, "lookup(A,1)")
+        assert mock_sheet.cells[mock_sheet.cell_key("B", 1)].resolved_value is None
+
+        service.set_cell_value("sheet-id", "A", 1, "late")
+
+        assert mock_sheet.cells[mock_sheet.cell_key("B", 1)].resolved_value == "late"
+        assert list(mock_sheet.dependents[mock_sheet.cell_key("A", 1)]) == [mock_sheet.cell_key("B", 1)]
+
+    def test_overwriting_lookup_keeps_dependents_and_drops_old_edge(self):
+        mock_repo = Mock()
+        mock_sheet = Sheet([
+            {"name": "A", "type": "string"},
+            {"name": "B", "type": "string"},
+            {"name": "C", "type": "string"}
+        ])
+        mock_repo.get_by_id.return_value = mock_sheet
+        service = CellService(mock_repo)
+
+        service.set_cell_value("sheet-id", "A", 1, "from_a")
+        service.set_cell_value("sheet-id", "A", 2, "from_a2")
+        service.set_cell_value("sheet-id", "B", 1, "lookup(A,1)")
+        service.set_cell_value("sheet-id", "C", 1, "lookup(B,1)")
+        service.set_cell_value("sheet-id", "B", 1, "lookup(A,2)")
+
+        assert mock_sheet.cell_key("A", 1) not in mock_sheet.dependents
+        assert list(mock_sheet.dependents[mock_sheet.cell_key("B", 1)]) == [mock_sheet.cell_key("C", 1)]
+        assert mock_sheet.cells[mock_sheet.cell_key("C", 1)].resolved_value == "from_a2"
+
+        service.set_cell_value("sheet-id", "A", 1, "ignored")
+        assert mock_sheet.cells[mock_sheet.cell_key("C", 1)].resolved_value == "from_a2"
+
+    def test_topological_order_keeps_lookup_targets_first(self):
+        mock_repo = Mock()
+        mock_sheet = Sheet([{"name": "A", "type": "int"}])
+        mock_repo.get_by_id.return_value = mock_sheet
+        service = CellService(mock_repo)
+
+        # Build the chain A1 -> A2 -> ... -> A20 in both directions
+        for row in range(1, 20):
+            service.set_cell_value("sheet-id", "A", row, f"lookup(A,{row + 1})")
+        service.set_cell_value("sheet-id", "A", 40, 7)
+        for row in range(39, 20, -1):
+            service.set_cell_value("sheet-id", "A", row, f"lookup(A,{row + 1})")
+        service.set_cell_value("sheet-id", "A", 20, "lookup(A,21)")
+
+        order = mock_sheet.topological_order
+        for cell_key, cell in mock_sheet.cells.items():
+            if cell.is_lookup:
+                assert order[cell.lookup_key] < order[cell_key]
+        assert mock_sheet.cells[mock_sheet.cell_key("A", 1)].resolved_value == 7
+
+    def test_cycle_detection_reports_full_size_after_reordering(self):
+        mock_repo = Mock()
+        mock_sheet = Sheet([{"name": "A", "type": "int"}])
+        mock_repo.get_by_id.return_value = mock_sheet
+        service = CellService(mock_repo)
+
+        for row in range(1, 10):
+            service.set_cell_value("sheet-id", "A", row, f"lookup(A,{row + 1})")
+        service.set_cell_value("sheet-id", "A", 10, "lookup(A,11)")
+
+        with pytest.raises(ValidationError) as exc_info:
+            service.set_cell_value("sheet-id", "A", 11, "lookup(A,1)")
+
+        assert "cycle of size 11" in str(exc_info.value)
+
+    def test_long_lookup_chain_does_not_hit_recursion_limit(self):
+        mock_repo = Mock()
+        mock_sheet = Sheet([{"name": "A", "type": "int"}])
+        mock_repo.get_by_id.return_value = mock_sheet
+        service = CellService(mock_repo)
+        chain_length = 5000
+
+        service.set_cell_value("sheet-id", "A", chain_length, 99)
+        for row in range(chain_length - 1, 0, -1):
+            service.set_cell_value("sheet-id", "A", row, f"lookup(A,{row + 1})")
+
+        assert service._resolve_cell_value(mock_sheet, "A", 1) == 99
+
+        with pytest.raises(ValidationError) as exc_info:
+            service.set_cell_value("sheet-id", "A", chain_length, "lookup(A,1)")
+
+        assert f"cycle of size {chain_length}" in str(exc_info.value)
+
+    def test_set_cell_values_applies_whole_batch(self):
+        mock_repo = Mock()
+        mock_sheet = Sheet([
+            {"name": "A", "type": "int"},
+            {"name": "B", "type": "int"}
+        ])
+        mock_repo.get_by_id.return_value = mock_sheet
+        service = CellService(mock_repo)
+
+        # Lookups may point at cells written later in the same batch
+        result = service.set_cell_values("sheet-id", [
+            ("B", 2, "lookup(B,1)"),
+            ("B", 1, "lookup(A,1)"),
+            ("A", 1, 5)
+        ])
+
+        assert result == "3 cell values set successfully"
+        assert mock_sheet.cells[mock_sheet.cell_key("B", 1)].resolved_value == 5
+        assert mock_sheet.cells[mock_sheet.cell_key("B", 2)].resolved_value == 5
+        assert list(mock_sheet.dependents[mock_sheet.cell_key("A", 1)]) == [mock_sheet.cell_key("B", 1)]
+        mock_repo.save.assert_called_once_with(mock_sheet)
+
+    def test_set_cell_values_writes_nothing_when_any_value_is_invalid(self):
+        mock_repo = Mock()
+        mock_sheet = Sheet([{"name": "A", "type": "int"}])
+        mock_repo.get_by_id.return_value = mock_sheet
+        service = CellService(mock_repo)
+
+        with pytest.raises(ValidationError):
+            service.set_cell_values("sheet-id", [("A", 1, 1), ("A", 2, "not_int")])
+
+        assert mock_sheet.cells == {}
+        mock_repo.save.assert_not_called()
+
+    def test_set_cell_values_rejects_cycle_formed_within_batch(self):
+        mock_repo = Mock()
+        mock_sheet = Sheet([{"name": "A", "type": "int"}])
+        mock_repo.get_by_id.return_value = mock_sheet
+        service = CellService(mock_repo)
+
+        with pytest.raises(ValidationError) as exc_info:
+            service.set_cell_values("sheet-id", [
+                ("A", 1, "lookup(A,2)"),
+                ("A", 2, "lookup(A,3)"),
+                ("A", 3, "lookup(A,1)")
+            ])
+
+        assert "cycle of size 3" in str(exc_info.value)
+        assert mock_sheet.cells == {}
+
+    def test_set_cell_values_allows_batch_that_breaks_an_existing_cycle_path(self):
+        mock_repo = Mock()
+        mock_sheet = Sheet([
+            {"name": "A", "type": "int"},
+            {"name": "B", "type": "int"}
+        ])
+        mock_repo.get_by_id.return_value = mock_sheet
+        service = CellService(mock_repo)
+        service.set_cell_value("sheet-id", "A", 1, "lookup(B,1)")
+
+        # B1 -> A1 is only valid because A1 stops looking up B1 in the same batch
+        service.set_cell_values("sheet-id", [("B", 1, "lookup(A,1)"), ("A", 1, 3)])
+
+        assert mock_sheet.cells[mock_sheet.cell_key("B", 1)].resolved_value == 3
+        assert list(mock_sheet.dependents[mock_sheet.cell_key("A", 1)]) == [mock_sheet.cell_key("B", 1)]
+
+    def test_set_cell_value_with_underscore_column_name(self):
+        mock_repo = Mock()
+        mock_sheet = Sheet([{"name": "first_name", "type": "string"}])
+        mock_repo.get_by_id.return_value = mock_sheet
+        service = CellService(mock_repo)
+
+        service.set_cell_value("sheet-id", "first_name", 3, "ada")
+
+        assert list(mock_sheet.iter_cells()) == [("first_name", 3, "ada")]
+
+    def test_set_cell_value_rejects_row_beyond_cell_key_range(self):
+        mock_repo = Mock()
+        mock_sheet = Sheet([{"name": "A", "type": "int"}])
+        mock_repo.get_by_id.return_value = mock_sheet
+        service = CellService(mock_repo)
+
+        with pytest.raises(ValidationError) as exc_info:
+            service.set_cell_value("sheet-id", "A", MAX_ROW + 1, 1)
+
+        assert "row number" in str(exc_info.value).lower()
+
+    def test_concurrent_writes_to_one_sheet_keep_lookup_graph_consistent(self):
+        mock_repo = Mock()
+        mock_sheet = Sheet([{"name": "A", "type": "int"}])
+        mock_repo.get_by_id.return_value = mock_sheet
+        service = CellService(mock_repo)
+
+        def write(seed):
+            rng = random.Random(seed)
+            for _ in range(200):
+                row = rng.randint(1, 30)
+                value = rng.choice([rng.randint(0, 9), f"lookup(A,{rng.randint(1, 30)})"])
+                try:
+                    service.set_cell_value("sheet-id", "A", row, value)
+                except ValidationError:
+                    pass
+
+        threads = [threading.Thread(target=write, args=(seed,)) for seed in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        order = mock_sheet.topological_order
+        edges = []
+        for row in range(1, 31):
+            cell_key = mock_sheet.cell_key("A", row)
+            cell = mock_sheet.get_lookup_cell(cell_key)
+            if cell is not None:
+                edges.append((cell.lookup_key, cell_key))
+                assert order[cell.lookup_key] < order[cell_key]
+                assert cell.resolved_value == mock_sheet.get_resolved_value(cell.lookup_key)
+        assert sorted(edges) == sorted(
+            (target_key, dependent_key)
+            for target_key, dependents in mock_sheet.dependents.items()
+            for dependent_key in dependents
+        )
+
+
+    def test_import_csv_writes_runs_and_lookups_and_refreshes_dependents(self):
+        repo = SheetRepository()
+        sheet = Sheet([{"name": "A", "type": "int"}, {"name": "B", "type": "int"}])
+        repo.save(sheet)
+        service = CellService(repo)
+        service.set_cell_values(sheet.id, [("B", 1, "lookup(A,2)"), ("A", 3, "lookup(B,1)")])
+
+        result = service.import_csv(sheet.id, [b'A,B\n1,"lookup(A', b',1)"\n2,\n', b"4,5\n"])
+
+        assert result == "5 cell values imported successfully"
+        assert sheet.get_resolved_value(sheet.cell_key("B", 1)) == 1
+        assert sheet.get_resolved_value(sheet.cell_key("A", 3)) == 4
+        assert sheet.get_lookup_cell(sheet.cell_key("A", 3)) is None
+        assert list(sheet.dependents) == [sheet.cell_key("A", 1)]
+        assert sheet.get_cell(sheet.cell_key("B", 2)) is None
+
+    def test_import_csv_writes_nothing_when_any_cell_is_invalid(self):
+        repo = SheetRepository()
+        sheet = Sheet([{"name": "A", "type": "int"}])
+        repo.save(sheet)
+        service = CellService(repo)
+        version = sheet.version
+
+        with pytest.raises(ValidationError):
+            service.import_csv(sheet.id, [b"A\n1\n2\n(3)\n"])
+
+        assert sheet.version == version
+        assert sheet.get_cell(sheet.cell_key("A", 1)) is None
+
+
+    def test_set_column_values_writes_typed_blocks(self):
+        repo = SheetRepository()
+        sheet = Sheet([{"name": "A", "type": "double"}, {"name": "B", "type": "double"}])
+        repo.save(sheet)
+        service = CellService(repo)
+        service.set_cell_value(sheet.id, "B", 1, "lookup(A,3)")
+
+        result = service.set_column_values(sheet.id, "A", 2, [1, 2.5, 3.0])
+
+        assert result == "3 cell values set successfully"
+        values = [sheet.get_resolved_value(sheet.cell_key("A", row)) for row in (1, 2, 3, 4)]
+        assert values == [None, 1, 2.5, 3.0]
+        assert type(values[1]) is int
+        assert list(sheet.column_stores[0].sparse) == [2]
+        assert sheet.get_resolved_value(sheet.cell_key("B", 1)) == 2.5
+
+    def test_set_column_values_skips_none_and_writes_lookups_and_other_values_per_cell(self):
+        repo = SheetRepository()
+        sheet = Sheet([{"name": "A", "type": "int"}])
+        repo.save(sheet)
+        service = CellService(repo)
+        service.set_cell_value(sheet.id, "A", 2, 9)
+
+        result = service.set_column_values(sheet.id, "A", 1, [1, None, "lookup(A,1)", 2 ** 70, 5])
+
+        assert result == "4 cell values set successfully"
+        assert [sheet.get_resolved_value(sheet.cell_key("A", row)) for row in range(1, 6)] == [1, 9, 1, 2 ** 70, 5]
+        assert list(sheet.dependents[sheet.cell_key("A", 1)]) == [sheet.cell_key("A", 3)]
+
+    @pytest.mark.parametrize("column, start_row, values, error, message", [
+        ("A", 1, [1, "x"], ValidationError, "A2"),
+        ("A", 1, [1, 1.5], ValidationError, "A2"),
+        ("A", 1, ["lookup(A,1)"], ValidationError, "ycle"),
+        ("A", MAX_ROW, [1, 2], ValidationError, str(MAX_ROW)),
+        ("Z", 1, [1], NotFoundError, "Z"),
+    ])
+    def test_set_column_values_writes_nothing_when_any_value_is_invalid(self, column, start_row, values, error, message):
+        repo = SheetRepository()
+        sheet = Sheet([{"name": "A", "type": "int"}])
+        repo.save(sheet)
+        version = sheet.version
+
+        with pytest.raises(error) as exc_info:
+            CellService(repo).set_column_values(sheet.id, column, start_row, values)
+
+        assert message in str(exc_info.value)
+        assert sheet.version == version
+
+
+class TestAsyncCellService:
+    def _service_with_sheet(self):
+        repo = SheetRepository()
+        sheet = Sheet([{"name": "A", "type": "int"}])
+        repo.save(sheet)
+        return AsyncCellService(make_async_repository(repo)), sheet
+
+    def test_set_cell_value_and_batch(self):
+        service, sheet = self._service_with_sheet()
+
+        async def scenario():
+            await service.set_cell_value(sheet.id, "A", 1, 5)
+            return await service.set_cell_values(sheet.id, [("A", 2, "lookup(A,1)"), ("A", 3, "lookup(A,2)")])
+
+        assert asyncio.run(scenario()) == "2 cell values set successfully"
+        assert sheet.get_resolved_value(sheet.cell_key("A", 3)) == 5
+
+    def test_errors_propagate_and_missing_sheet_raises_not_found(self):
+        service, sheet = self._service_with_sheet()
+
+        with pytest.raises(ValidationError):
+            asyncio.run(service.set_cell_value(sheet.id, "A", 1, "not an int"))
+        with pytest.raises(NotFoundError):
+            asyncio.run(service.set_cell_value("missing-id", "A", 1, 1))
+
+    def test_set_column_values_runs_on_the_executor_for_large_payloads(self, monkeypatch):
+        service, sheet = self._service_with_sheet()
+        monkeypatch.setattr(async_cell_service, "OFFLOAD_MIN_BATCH_SIZE", 2)
+        threads = set()
+        apply_column_values = service._apply_column_values
+        service._apply_column_values = lambda *args: threads.add(threading.get_ident()) or apply_column_values(*args)
+
+        assert asyncio.run(service.set_column_values(sheet.id, "A", 1, [4, 5])) == "2 cell values set successfully"
+        assert sheet.get_resolved_value(sheet.cell_key("A", 2)) == 5
+        assert threads and threading.get_ident() not in threads
+
+    def test_import_csv_reads_the_body_as_it_arrives(self, monkeypatch):
+        service, sheet = self._service_with_sheet()
+        monkeypatch.setattr(async_cell_service, "OFFLOAD_MIN_IMPORT_BYTES", 4)
+
+        async def body():
+            yield b"A\n1\n"
+            yield b"2\n3"
+
+        assert asyncio.run(service.import_csv(sheet.id, body(), start_row=5)) == "3 cell values imported successfully"
+        assert [sheet.get_resolved_value(sheet.cell_key("A", row)) for row in (5, 6, 7)] == [1, 2, 3]
+
+    def test_writes_on_large_graphs_run_on_the_executor(self, monkeypatch):
+        service, sheet = self._service_with_sheet()
+        monkeypatch.setattr(async_cell_service, "OFFLOAD_MIN_GRAPH_SIZE", 0)
+        threads = set()
+        apply_cell_value = service._apply_cell_value
+        service._apply_cell_value = lambda *args: threads.add(threading.get_ident()) or apply_cell_value(*args)
+
+        asyncio.run(service.set_cell_value(sheet.id, "A", 1, 5))
+
+        assert sheet.get_resolved_value(sheet.cell_key("A", 1)) == 5
+        assert threads and threading.get_ident() not in threads
+
+    def test_concurrent_writes_to_one_sheet_keep_lookup_graph_consistent(self, monkeypatch):
+        service, sheet = self._service_with_sheet()
+        # half of the writes run on the executor while others wait on the sheet lock
+        monkeypatch.setattr(async_cell_service, "OFFLOAD_MIN_GRAPH_SIZE", 10)
+
+        async def write(seed):
+            rng = random.Random(seed)
+            for _ in range(100):
+                row = rng.randint(1, 30)
+                value = rng.choice([rng.randint(0, 9), f"lookup(A,{rng.randint(1, 30)})"])
+                try:
+                    await service.set_cell_value(sheet.id, "A", row, value)
+                except ValidationError:
+                    pass
+
+        async def scenario():
+            await asyncio.gather(*(write(seed) for seed in range(8)))
+
+        asyncio.run(scenario())
+
+        order = sheet.topological_order
+        for row in range(1, 31):
+            cell_key = sheet.cell_key("A", row)
+            cell = sheet.get_lookup_cell(cell_key)
+            if cell is not None:
+                assert order[cell.lookup_key] < order[cell_key]
+                assert cell.resolved_value == sheet.get_resolved_value(cell.lookup_key)
@@ -0,0 +1,36 @@
+import asyncio
+from dependencies import ServiceContainer, get_cell_service, get_sheet_service
+from Repository.sheet_repository import SheetRepository
+from Repository.durable_sheet_repository import DurableSheetRepository
+from Services.async_cell_service import AsyncCellService
+from Services.async_sheet_service import AsyncSheetService
+
+
+class TestServiceContainer:
+    def test_services_share_the_container_repository(self):
+        repo = SheetRepository()
+        container = ServiceContainer(sheet_repository=repo)
+
+        async def scenario():
+            sheet_id = await container.sheet_service.create_sheet([{"name": "A", "type": "int"}])
+            await container.cell_service.set_cell_value(sheet_id, "A", 1, 3)
+            return await container.sheet_service.get_sheet_by_id(sheet_id)
+
+        response = asyncio.run(scenario())
+
+        assert isinstance(container.sheet_service, AsyncSheetService)
+        assert isinstance(container.cell_service, AsyncCellService)
+        assert [cell.value for cell in response.cells] == [3]
+        assert repo.exists(response.sheet_id)
+
+    def test_dependencies_return_the_same_services_every_request(self):
+        assert asyncio.run(get_sheet_service()) is asyncio.run(get_sheet_service())
+        assert asyncio.run(get_cell_service()) is asyncio.run(get_cell_service())
+
+    def test_close_closes_a_durable_repository(self, tmp_path):
+        repo = DurableSheetRepository(str(tmp_path))
+        container = ServiceContainer(sheet_repository=repo)
+
+        container.close()
+
+        assert not repo._committer.is_alive()
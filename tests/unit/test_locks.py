@@ -0,0 +1,137 @@
+import asyncio
+import threading
+import time
+from locks import ReadWriteLock, SheetLocks
+
+
+class TestReadWriteLock:
+    def test_readers_share_the_lock(self):
+        lock = ReadWriteLock()
+        inside = threading.Barrier(3, timeout=2)
+
+        def read():
+            with lock.read():
+                inside.wait()
+
+        threads = [threading.Thread(target=read) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert not inside.broken
+
+    def test_writer_waits_for_readers_and_blocks_new_readers(self):
+        lock = ReadWriteLock()
+        events = []
+        lock.acquire_read()
+
+        writer = threading.Thread(target=lambda: (lock.acquire_write(), events.append("write"), lock.release_write()))
+        writer.start()
+        time.sleep(0.05)
+        reader = threading.Thread(target=lambda: (lock.acquire_read(), events.append("read"), lock.release_read()))
+        reader.start()
+        time.sleep(0.05)
+
+        assert events == []
+        lock.release_read()
+        writer.join(2)
+        reader.join(2)
+        assert events == ["write", "read"]
+
+    def test_async_writer_waits_without_blocking_the_event_loop(self):
+        lock = ReadWriteLock()
+        lock.acquire_read()
+        events = []
+
+        async def write():
+            async with lock.write_async():
+                events.append("write")
+
+        async def scenario():
+            writer = asyncio.ensure_future(write())
+            await asyncio.sleep(0.05)
+            # the loop keeps running while the writer waits
+            events.append("loop")
+            lock.release_read()
+            await writer
+
+        asyncio.run(scenario())
+
+        assert events == ["loop", "write"]
+        assert lock.try_acquire_write()
+
+    def test_waiting_async_writers_get_the_lock_in_arrival_order(self):
+        lock = ReadWriteLock()
+        order = []
+
+        async def write(number):
+            async with lock.write_async():
+                order.append(number)
+                await asyncio.sleep(0.001)
+
+        async def scenario():
+            async with lock.write_async():
+                writers = [asyncio.ensure_future(write(number)) for number in range(5)]
+                await asyncio.sleep(0.01)
+            # a late writer queues behind the ones already waiting
+            await asyncio.gather(*writers, write(5))
+
+        asyncio.run(scenario())
+
+        assert order == [0, 1, 2, 3, 4, 5]
+
+    def test_cancelled_async_acquire_leaves_the_lock_free(self):
+        lock = ReadWriteLock()
+        lock.acquire_write()
+
+        async def scenario():
+            reader = asyncio.ensure_future(lock.read_async().__aenter__())
+            await asyncio.sleep(0.05)
+            reader.cancel()
+            await asyncio.sleep(0.01)
+            lock.release_write()
+            # the cancelled reader never ends up holding the lock
+            await asyncio.sleep(0.01)
+            acquired = lock.try_acquire_write()
+            if acquired:
+                lock.release_write()
+            return acquired
+
+        assert asyncio.run(scenario())
+
+
+class TestSheetLocks:
+    def test_same_sheet_shares_one_lock(self):
+        sheet_locks = SheetLocks()
+
+        assert sheet_locks.get("a") is sheet_locks.get("a")
+
+    def test_writes_to_different_sheets_do_not_block(self):
+        sheet_locks = SheetLocks()
+        done = threading.Event()
+
+        def write_other_sheet():
+            with sheet_locks.write("b"):
+                done.set()
+
+        with sheet_locks.write("a"):
+            thread = threading.Thread(target=write_other_sheet)
+            thread.start()
+            assert done.wait(2)
+        thread.join()
+
+    def test_reads_wait_for_a_writer_on_the_same_sheet(self):
+        sheet_locks = SheetLocks()
+        done = threading.Event()
+
+        def read_sheet():
+            with sheet_locks.read("a"):
+                done.set()
+
+        with sheet_locks.write("a"):
+            thread = threading.Thread(target=read_sheet)
+            thread.start()
+            assert not done.wait(0.05)
+        assert done.wait(2)
+        thread.join()
@@ -1,17 +1,167 @@
 import pytest
+from array import array
 import uuid
-from Models.sheet import Sheet, Cell
+from Models.sheet import Sheet, Cell, ColumnStore, ColumnType, BLOCK_SIZE, CHANGE_LOG_SIZE, buffer_values, make_cell_key, split_cell_key
 
 
 class TestCell:
-    def test_cell_post_init_creates_empty_dependents_when_none(self):
-        cell = Cell(value="test", dependents=None)
-        assert cell.dependents == []
+    def test_cell_post_init_resolves_regular_cell_to_its_value(self):
+        cell = Cell(value=42)
+        assert cell.resolved_value == 42
 
-    def test_cell_post_init_preserves_existing_dependents(self):
-        existing_deps = [("A", "1"), ("B", "2")]
-        cell = Cell(value="test", dependents=existing_deps)
-        assert cell.dependents == existing_deps
+    def test_cell_post_init_keeps_lookup_resolved_value(self):
+        cell = Cell(value="lookup(A,1)", lookup_key=make_cell_key(0, 1))
+        assert cell.is_lookup is True
+        assert cell.resolved_value is None
+
+    def test_cell_has_no_instance_dict(self):
+        cell = Cell(value=1)
+        assert not hasattr(cell, "__dict__")
+        with pytest.raises(AttributeError):
+            cell.dependents = []
+
+
+class TestColumnStore:
+    def test_int_values_are_stored_in_typed_blocks(self):
+        store = ColumnStore(ColumnType.INT)
+        store.set_value(1, 42)
+        store.set_value(BLOCK_SIZE * 3 + 5, -7)
+
+        assert store.get_resolved_value(1) == 42
+        assert store.get_resolved_value(BLOCK_SIZE * 3 + 5) == -7
+        assert sorted(store.blocks) == [0, 3]
+        assert store.sparse == {}
+        assert len(store) == 2
+
+    def test_rows_reads_only_the_requested_range(self):
+        store = ColumnStore(ColumnType.INT)
+        for row in (1, 5, BLOCK_SIZE + 2, BLOCK_SIZE * 4):
+            store.set_value(row, row)
+        store.set_cell(7, Cell(value="lookup(A,1)", lookup_key=0, resolved_value=1))
+        store.set_value(2 ** 70, 2 ** 70)
+
+        assert list(store.rows(5, BLOCK_SIZE + 2)) == [5, 7, BLOCK_SIZE + 2]
+        assert list(store.rows(6, 6)) == []
+        assert list(store.rows(BLOCK_SIZE * 4)) == [BLOCK_SIZE * 4, 2 ** 70]
+
+    def test_row_index_follows_removals(self):
+        store = ColumnStore(ColumnType.INT)
+        store.set_value(3, 3)
+        store.set_value(4, True)
+        store.remove(3)
+        store.remove(4)
+        store.set_value(BLOCK_SIZE, 1)
+
+        assert list(store.rows()) == [BLOCK_SIZE]
+        assert list(store.rows(0, BLOCK_SIZE - 1)) == []
+
+    def test_missing_row_is_not_in_store(self):
+        store = ColumnStore(ColumnType.INT)
+        store.set_value(2, 1)
+
+        assert 1 not in store
+        assert store.get_cell(1) is None
+        assert store.get_resolved_value(1) is None
+
+    def test_boolean_and_double_values_round_trip_with_their_types(self):
+        booleans = ColumnStore(ColumnType.BOOLEAN)
+        booleans.set_value(1, True)
+        booleans.set_value(2, False)
+        doubles = ColumnStore(ColumnType.DOUBLE)
+        doubles.set_value(1, 2.5)
+
+        assert booleans.get_resolved_value(1) is True
+        assert booleans.get_resolved_value(2) is False
+        assert doubles.get_resolved_value(1) == 2.5
+
+    def test_ints_in_double_columns_go_to_side_table_as_written(self):
+        store = ColumnStore(ColumnType.DOUBLE)
+        store.set_value(1, 10 ** 400)
+        store.set_value(2, 2 ** 60 + 1)
+        store.set_value(3, 5)
+        store.set_value(4, 2.5)
+
+        values = [store.get_resolved_value(row) for row in range(1, 5)]
+        assert values == [10 ** 400, 2 ** 60 + 1, 5, 2.5]
+        assert list(map(type, values)) == [int, int, int, float]
+        assert sorted(store.sparse) == [1, 2, 3]
+        assert buffer_values(ColumnType.DOUBLE, [1.5, 5]) is None
+        assert buffer_values(ColumnType.DOUBLE, [1.5, 10 ** 400]) is None
+
+    def test_values_outside_the_typed_buffer_go_to_side_table(self):
+        store = ColumnStore(ColumnType.INT)
+        store.set_value(1, 2 ** 70)
+        store.set_value(2, True)
+
+        assert store.get_resolved_value(1) == 2 ** 70
+        assert store.get_resolved_value(2) is True
+        assert store.blocks == {}
+
+    def test_lookup_cell_replaces_buffered_value_and_back(self):
+        store = ColumnStore(ColumnType.STRING)
+        store.set_value(1, "plain")
+        lookup = Cell(value="lookup(A,2)", lookup_key=make_cell_key(0, 2), resolved_value="x")
+
+        store.set_cell(1, lookup)
+        assert store.get_lookup_cell(1) is lookup
+        assert store.get_resolved_value(1) == "x"
+        assert store.blocks == {}
+
+        store.set_value(1, "plain again")
+        assert store.get_lookup_cell(1) is None
+        assert store.get_resolved_value(1) == "plain again"
+
+    def test_items_are_in_row_order(self):
+        store = ColumnStore(ColumnType.INT)
+        store.set_value(BLOCK_SIZE + 1, 3)
+        store.set_cell(2, Cell(value="lookup(A,1)", lookup_key=make_cell_key(0, 1), resolved_value=2))
+        store.set_value(1, 1)
+
+        assert list(store.items()) == [(1, 1), (2, 2), (BLOCK_SIZE + 1, 3)]
+
+    @pytest.mark.parametrize("column_type, value", [(ColumnType.INT, lambda row: row), (ColumnType.BOOLEAN, lambda row: row % 3 == 0)])
+    def test_item_list_matches_items_for_full_partial_and_sparse_blocks(self, column_type, value):
+        store = ColumnStore(column_type)
+        for row in list(range(BLOCK_SIZE, 2 * BLOCK_SIZE)) + list(range(1, 300, 7)) + [5 * BLOCK_SIZE + 9]:
+            store.set_value(row, value(row))
+        store.set_value(40, "not typed")
+        store.set_cell(BLOCK_SIZE + 10, Cell(value="lookup(A,1)", lookup_key=make_cell_key(0, 1), resolved_value=11))
+
+        assert store.item_list() == list(store.items())
+        for start_row, end_row in [(8, 8), (3, BLOCK_SIZE + 10), (BLOCK_SIZE + 10, None), (2 * BLOCK_SIZE, 5 * BLOCK_SIZE)]:
+            assert store.item_list(start_row, end_row) == list(store.items(start_row, end_row))
+
+
+    def test_set_values_writes_block_slices_over_side_table_rows(self):
+        store = ColumnStore(ColumnType.INT)
+        store.set_cell(BLOCK_SIZE, Cell(value="lookup(A,1)", lookup_key=make_cell_key(0, 1), resolved_value=1))
+        store.set_value(BLOCK_SIZE + 3, 2 ** 70)
+        store.set_value(3 * BLOCK_SIZE, 9)
+
+        store.set_values(BLOCK_SIZE - 2, array("q", range(10)))
+
+        assert store.item_list() == [(BLOCK_SIZE - 2 + offset, offset) for offset in range(10)] + [(3 * BLOCK_SIZE, 9)]
+        assert store.sparse == {}
+        assert store.last_row() == 3 * BLOCK_SIZE
+        assert store.sparse_items() == []
+
+    def test_set_values_takes_other_sequences_row_by_row(self):
+        store = ColumnStore(ColumnType.INT)
+        store.set_values(1, [1, 2 ** 70])
+
+        assert store.item_list() == [(1, 1), (2, 2 ** 70)]
+        assert store.sparse_items(2, 2) == [(2, store.sparse[2])]
+        assert store.last_row() == 2
+
+
+    def test_buffer_values_converts_whole_columns_or_declines(self):
+        assert buffer_values(ColumnType.INT, [1, -2]) == array("q", [1, -2])
+        assert buffer_values(ColumnType.DOUBLE, [1.0, 2.5]) == array("d", [1.0, 2.5])
+        assert buffer_values(ColumnType.BOOLEAN, [True, False]) == array("b", [1, 0])
+        assert buffer_values(ColumnType.STRING, ("a", "b")) == ["a", "b"]
+        for column_type, values in [(ColumnType.INT, [1, True]), (ColumnType.INT, [2 ** 63]),
+                                    (ColumnType.DOUBLE, ["1"]), (ColumnType.BOOLEAN, [1]), (ColumnType.STRING, [None])]:
+            assert buffer_values(column_type, values) is None
 
 
 class TestSheet:
@@ -35,4 +185,185 @@ class TestSheet:
         columns = [{"name": "A", "type": "string"}]
         sheet = Sheet(columns)
         
-        assert sheet.cells == {}
\ No newline at end of file
+        assert sheet.cells == {}
+
+    def test_sheet_creates_column_store_on_first_write(self):
+        sheet = Sheet([{"name": "A", "type": "string"}, {"name": "B", "type": "int"}])
+        sheet.set_value(sheet.cell_key("B", 3), 9)
+
+        assert list(sheet.column_stores) == [1]
+        assert sheet.column_stores[1].type == ColumnType.INT
+        assert list(sheet.iter_cells()) == [("B", 3, 9)]
+
+    def test_iter_cells_starts_at_key(self):
+        sheet = Sheet([{"name": "A", "type": "int"}, {"name": "B", "type": "int"}])
+        for row in (1, 2, 2000):
+            sheet.set_value(sheet.cell_key("A", row), row)
+        sheet.set_value(sheet.cell_key("B", 1), 7)
+
+        assert list(sheet.iter_cells(sheet.cell_key("A", 2))) == [("A", 2, 2), ("A", 2000, 2000), ("B", 1, 7)]
+        assert list(sheet.iter_cells(sheet.cell_key("A", 1500))) == [("A", 2000, 2000), ("B", 1, 7)]
+
+    def test_iter_range_projects_columns_and_rows(self):
+        sheet = Sheet([{"name": "A", "type": "int"}, {"name": "B", "type": "int"}, {"name": "C", "type": "int"}])
+        for column in ("A", "B", "C"):
+            for row in range(1, 11):
+                sheet.set_value(sheet.cell_key(column, row), row)
+
+        assert list(sheet.iter_range(["C", "B"], 4, 5)) == [("C", 4, 4), ("C", 5, 5), ("B", 4, 4), ("B", 5, 5)]
+
+    def test_column_items_groups_the_cells_of_iter_cells_by_column(self):
+        sheet = Sheet([{"name": "A", "type": "int"}, {"name": "B", "type": "int"}, {"name": "C", "type": "int"}])
+        for column in ("C", "A"):
+            for row in range(1, 11):
+                sheet.set_value(sheet.cell_key(column, row), row)
+
+        assert [(column, row, value) for column, items in sheet.column_items() for row, value in items] == list(sheet.iter_cells())
+        assert list(sheet.column_items(["C", "B"], 4, 5)) == [("C", [(4, 4), (5, 5)])]
+
+    def test_every_write_bumps_the_version(self):
+        sheet = Sheet([{"name": "A", "type": "int"}])
+        a1 = sheet.cell_key("A", 1)
+
+        versions = [sheet.version]
+        for write in (lambda: sheet.set_value(a1, 1), lambda: sheet.set_lookup_cell(a1, Cell(value="lookup(A,2)", lookup_key=a1 + 1)),
+                      lambda: sheet.remove_cell(a1)):
+            write()
+            versions.append(sheet.version)
+
+        assert versions == sorted(set(versions))
+        assert Sheet(sheet.columns, sheet_id=sheet.id).version_epoch != sheet.version_epoch
+
+    def test_changes_since_lists_changed_keys_until_the_log_is_truncated(self):
+        sheet = Sheet([{"name": "A", "type": "int"}])
+        sheet.set_value(sheet.cell_key("A", 2), 1)
+        version = sheet.version
+        for row in (3, 1, 3):
+            sheet.set_value(sheet.cell_key("A", row), row)
+
+        assert sheet.changes_since(version) == [sheet.cell_key("A", 1), sheet.cell_key("A", 3)]
+        assert sheet.changes_since(sheet.version) == []
+        assert sheet.changes_since(sheet.version + 1) is None
+
+        for row in range(CHANGE_LOG_SIZE):
+            sheet.set_value(sheet.cell_key("A", 5), row)
+        assert sheet.changes_since(version) is None
+        assert sheet.changes_since(sheet.version - CHANGE_LOG_SIZE) == [sheet.cell_key("A", 5)]
+
+    def test_set_values_records_each_cell_as_a_change(self):
+        sheet = Sheet([{"name": "A", "type": "string"}, {"name": "B", "type": "int"}])
+        version = sheet.version
+
+        sheet.set_values(1, 4, array("q", [7, 8, 9]))
+
+        assert sheet.version == version + 3
+        assert sheet.changes_since(version) == [sheet.cell_key("B", row) for row in (4, 5, 6)]
+        assert sheet.get_resolved_value(sheet.cell_key("B", 5)) == 8
+        assert sheet.last_row() == 6
+
+    def test_record_changes_beyond_the_log_size_truncates_the_log(self):
+        sheet = Sheet([{"name": "A", "type": "int"}])
+        version = sheet.version
+
+        sheet.record_changes(range(CHANGE_LOG_SIZE + 1))
+
+        assert sheet.version == version + CHANGE_LOG_SIZE + 1
+        assert sheet.changes_since(version) is None
+        assert sheet.changes_since(version + 1) == list(range(1, CHANGE_LOG_SIZE + 1))
+
+    def test_rebuild_lookups_restores_graph_from_lookup_cells(self):
+        sheet = Sheet([{"name": "A", "type": "int"}])
+        a1, a2, a3, a4 = (sheet.cell_key("A", row) for row in range(1, 5))
+        sheet.set_value(a1, 5)
+        sheet.set_lookup_cell(a3, Cell(value="lookup(A,2)", lookup_key=a2))
+        sheet.set_lookup_cell(a2, Cell(value="lookup(A,1)", lookup_key=a1))
+        sheet.set_lookup_cell(a4, Cell(value="lookup(A,9)", lookup_key=sheet.cell_key("A", 9)))
+
+        sheet.rebuild_lookups()
+
+        assert list(sheet.dependents[a1]) == [a2]
+        assert list(sheet.dependents[a2]) == [a3]
+        order = sheet.topological_order
+        assert order[a1] < order[a2] < order[a3]
+        assert sheet.get_resolved_value(a3) == 5
+        assert sheet.get_resolved_value(a4) is None
+        assert sheet.get_lookup_cell(a3).source_key == a1
+
+    def test_dependency_graph_tracks_edges_to_unwritten_cells(self):
+        sheet = Sheet([{"name": "A", "type": "int"}])
+        a1, a2, a3, a4 = (sheet.cell_key("A", row) for row in range(1, 5))
+        sheet.add_dependency(a1, a2)
+        sheet.add_dependency(a1, a3)
+        sheet.add_dependency(a3, a4)
+
+        assert sheet.transitive_dependents(a1) == [a2, a3, a4]
+        sheet.remove_dependency(a1, a3)
+        sheet.remove_dependency(a1, a3)
+        assert sheet.transitive_dependents(a1) == [a2]
+        sheet.remove_dependency(a1, a2)
+        assert a1 not in sheet.dependents
+
+    def test_lookup_source_compresses_the_walked_chain(self):
+        sheet = Sheet([{"name": "A", "type": "int"}])
+        a1, a2, a3, a4 = (sheet.cell_key("A", row) for row in range(1, 5))
+        sheet.set_value(a4, 7)
+        for cell_key, target_key in ((a3, a4), (a2, a3), (a1, a2)):
+            sheet.set_lookup_cell(cell_key, Cell(value="lookup", lookup_key=target_key))
+
+        assert sheet.lookup_source(a1) == a4
+        assert [sheet.get_lookup_cell(key).source_key for key in (a1, a2, a3)] == [a4, a4, a4]
+        assert sheet.lookup_source(a4) == a4
+
+    def test_cells_view_reads_and_writes_column_stores(self):
+        sheet = Sheet([{"name": "A", "type": "string"}])
+        sheet.cells[sheet.cell_key("A", 1)] = Cell(value="hello")
+
+        assert sheet.cell_key("A", 1) in sheet.cells
+        assert sheet.cells[sheet.cell_key("A", 1)].value == "hello"
+        assert sheet.get_resolved_value(sheet.cell_key("A", 1)) == "hello"
+        assert list(sheet.cells) == [sheet.cell_key("A", 1)]
+
+    def test_cell_keys_pack_column_index_and_row(self):
+        sheet = Sheet([{"name": "A_B", "type": "string"}, {"name": "C", "type": "int"}])
+
+        cell_key = sheet.cell_key("C", 12)
+
+        assert cell_key == make_cell_key(1, 12)
+        assert split_cell_key(cell_key) == (1, 12)
+        assert sheet.column_name(split_cell_key(sheet.cell_key("A_B", 3))[0]) == "A_B"
+
+    def test_get_column_returns_indexed_definition_with_validator(self):
+        sheet = Sheet([{"name": "A", "type": "string"}, {"name": "B", "type": "int"}])
+
+        column = sheet.get_column("B")
+
+        assert (column.name, column.type, column.index) == ("B", ColumnType.INT, 1)
+        assert column.validate(3) is True
+        assert column.validate("3") is False
+        assert sheet.get_column("Z") is None
+
+    def test_get_column_sees_columns_added_after_creation(self):
+        columns = [{"name": "A", "type": "string"}]
+        sheet = Sheet(columns)
+        assert sheet.get_column("B") is None
+
+        columns.append({"name": "B", "type": "boolean"})
+
+        assert sheet.get_column("B").type == ColumnType.BOOLEAN
+
+    def test_get_column_returns_first_of_duplicate_names(self):
+        sheet = Sheet([{"name": "A", "type": "int"}, {"name": "A", "type": "string"}])
+
+        column = sheet.get_column("A")
+
+        assert (column.type, column.index) == (ColumnType.INT, 0)
+        assert sheet.get_column("A") is column
+
+    def test_get_column_misses_do_not_rebuild_unchanged_index(self, monkeypatch):
+        sheet = Sheet([{"name": "A", "type": "int"}, {"name": "A", "type": "string"}])
+        assert sheet.get_column("A").index == 0
+        builds = []
+        monkeypatch.setattr(sheet, "_build_column_index", lambda: builds.append(True))
+
+        assert [sheet.get_column("Z") for _ in range(3)] == [None] * 3
+        assert builds == []
@@ -1,6 +1,18 @@
+import asyncio
+import os
+import sys
+import threading
 import pytest
 from Repository.sheet_repository import SheetRepository
+from Repository.durable_sheet_repository import DurableSheetRepository
+from Repository.bounded_sheet_repository import BoundedSheetRepository
+from Repository.async_sheet_repository import (
+    AsyncDurableSheetRepository, AsyncSheetRepositoryAdapter, make_async_repository
+)
+from Repository.sheet_file import LazyColumnStores, open_sheet_file, write_sheet_file
+from Services.cell_service import CellService
 from Models.sheet import Sheet
+from locks import SheetLocks
 
 
 class TestSheetRepository:
@@ -90,4 +102,351 @@ class TestSheetRepository:
         repo1.save(sheet)
         
         assert repo1.exists(sheet.id)
-        assert not repo2.exists(sheet.id)
\ No newline at end of file
+        assert not repo2.exists(sheet.id)
+
+
+class TestDurableSheetRepository:
+    def _create_sheet(self, repo):
+        sheet = Sheet([{"name": "A", "type": "int"}, {"name": "B", "type": "int"}])
+        repo.save(sheet)
+        return sheet
+
+    def _resolved(self, repo, sheet_id, column, row):
+        sheet = repo.get_by_id(sheet_id)
+        return sheet.get_resolved_value(sheet.cell_key(column, row))
+
+    def test_sheets_and_lookups_survive_restart(self, tmp_path):
+        repo = DurableSheetRepository(str(tmp_path))
+        sheet = self._create_sheet(repo)
+        service = CellService(repo)
+        service.set_cell_value(sheet.id, "A", 1, 5)
+        service.set_cell_value(sheet.id, "B", 1, "lookup(A,1)")
+        service.set_cell_value(sheet.id, "B", 2, "lookup(B,1)")
+        service.set_cell_value(sheet.id, "A", 1, 7)
+        repo.close()
+
+        recovered = DurableSheetRepository(str(tmp_path))
+
+        assert recovered.exists(sheet.id)
+        assert self._resolved(recovered, sheet.id, "A", 1) == 7
+        assert self._resolved(recovered, sheet.id, "B", 2) == 7
+        # the recovered lookup graph keeps propagating and rejecting cycles
+        CellService(recovered).set_cell_value(sheet.id, "A", 1, 9)
+        assert self._resolved(recovered, sheet.id, "B", 2) == 9
+        with pytest.raises(Exception, match="cycle of size 3"):
+            CellService(recovered).set_cell_value(sheet.id, "A", 1, "lookup(B,2)")
+        recovered.close()
+
+    def test_snapshot_compacts_log_and_recovers(self, tmp_path):
+        repo = DurableSheetRepository(str(tmp_path))
+        sheet = self._create_sheet(repo)
+        service = CellService(repo)
+        for value in range(10):
+            service.set_cell_value(sheet.id, "A", 1, value)
+        repo.snapshot()
+        service.set_cell_value(sheet.id, "A", 2, 42)
+        repo.close()
+
+        assert sorted(os.listdir(tmp_path)) == ["checkpoint", "sheets", "wal-00000002.log"]
+        assert os.listdir(tmp_path / "sheets") == [f"{sheet.id}.sheet"]
+        recovered = DurableSheetRepository(str(tmp_path))
+        assert self._resolved(recovered, sheet.id, "A", 1) == 9
+        assert self._resolved(recovered, sheet.id, "A", 2) == 42
+        recovered.close()
+
+    def test_snapshotted_sheets_are_opened_lazily(self, tmp_path):
+        repo = DurableSheetRepository(str(tmp_path))
+        sheet = self._create_sheet(repo)
+        service = CellService(repo)
+        service.set_cell_value(sheet.id, "A", 1, 3)
+        service.set_cell_value(sheet.id, "B", 1, "lookup(A,1)")
+        repo.snapshot()
+        repo.close()
+
+        recovered = DurableSheetRepository(str(tmp_path))
+        assert recovered.exists(sheet.id)
+        assert recovered._sheets == {}
+
+        loaded = recovered.get_by_id(sheet.id)
+        assert isinstance(loaded.column_stores, LazyColumnStores)
+        assert dict.__len__(loaded.column_stores) == 0
+        assert loaded.get_resolved_value(loaded.cell_key("B", 1)) == 3
+        assert list(dict.keys(loaded.column_stores)) == [1]
+
+        CellService(recovered).set_cell_value(sheet.id, "A", 1, 4)
+        assert loaded.get_resolved_value(loaded.cell_key("B", 1)) == 4
+        recovered.close()
+
+    def test_delete_is_persisted(self, tmp_path):
+        repo = DurableSheetRepository(str(tmp_path))
+        sheet = self._create_sheet(repo)
+        repo.delete(sheet.id)
+        repo.close()
+
+        recovered = DurableSheetRepository(str(tmp_path))
+        assert not recovered.exists(sheet.id)
+        recovered.close()
+
+    def test_torn_tail_of_log_is_ignored(self, tmp_path):
+        repo = DurableSheetRepository(str(tmp_path))
+        sheet = self._create_sheet(repo)
+        CellService(repo).set_cell_value(sheet.id, "A", 1, 1)
+        repo.close()
+        with open(tmp_path / "wal-00000001.log", "a") as wal:
+            wal.write('{"op":"cells","sheet_id":')
+
+        recovered = DurableSheetRepository(str(tmp_path))
+        assert self._resolved(recovered, sheet.id, "A", 1) == 1
+        recovered.close()
+
+    def test_concurrent_writers_share_commits(self, tmp_path):
+        repo = DurableSheetRepository(str(tmp_path), commit_interval=0.005)
+        sheets = [self._create_sheet(repo) for _ in range(8)]
+        commits_before = repo.commit_count
+
+        def write(sheet):
+            service = CellService(repo)
+            for row in range(1, 26):
+                service.set_cell_value(sheet.id, "A", row, row)
+
+        threads = [threading.Thread(target=write, args=(sheet,)) for sheet in sheets]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        repo.close()
+
+        assert repo.commit_count - commits_before < 8 * 25
+        recovered = DurableSheetRepository(str(tmp_path))
+        for sheet in sheets:
+            assert self._resolved(recovered, sheet.id, "A", 25) == 25
+        recovered.close()
+
+
+    def test_snapshots_taken_under_write_load_succeed(self, tmp_path, monkeypatch):
+        errors = []
+        monkeypatch.setattr(threading, "excepthook", lambda args: errors.append(args.exc_value))
+        repo = DurableSheetRepository(str(tmp_path), commit_interval=0, snapshot_every=50)
+        sheet = self._create_sheet(repo)
+
+        def write(column):
+            service = CellService(repo)
+            for row in range(1, 301):
+                service.set_cell_values(sheet.id, [(column, row, row), ("B" if column == "A" else "A", row + 1000, f"lookup({column},{row})")])
+
+        threads = [threading.Thread(target=write, args=(column,)) for column in "ABAB"]
+        switch_interval = sys.getswitchinterval()
+        # switch threads often, so snapshots overlap writes
+        sys.setswitchinterval(1e-6)
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            sys.setswitchinterval(switch_interval)
+        repo.close()
+
+        assert errors == []
+        assert len(os.listdir(tmp_path)) < 10
+        recovered = DurableSheetRepository(str(tmp_path))
+        assert self._resolved(recovered, sheet.id, "B", 1300) == 300
+        recovered.close()
+
+class TestAsyncSheetRepository:
+    def test_in_memory_repository_is_called_inline(self):
+        repo = make_async_repository(SheetRepository())
+        sheet = Sheet([{"name": "A", "type": "int"}])
+
+        async def scenario():
+            await repo.save(sheet)
+            return await repo.get_by_id(sheet.id), await repo.exists(sheet.id), await repo.get_all_ids()
+
+        assert isinstance(repo, AsyncSheetRepositoryAdapter) and not repo.blocking
+        assert asyncio.run(scenario()) == (sheet, True, [sheet.id])
+
+    def test_blocking_repository_runs_on_the_executor(self, tmp_path):
+        sync_repo = BoundedSheetRepository(spill_dir=str(tmp_path), max_sheets=1)
+        repo = make_async_repository(sync_repo)
+        sheets = [Sheet([{"name": "A", "type": "int"}]) for _ in range(2)]
+        threads = set()
+        save = sync_repo.save
+        sync_repo.save = lambda sheet: threads.add(threading.get_ident()) or save(sheet)
+
+        async def scenario():
+            for sheet in sheets:
+                await repo.save(sheet)
+            return await repo.get_by_id(sheets[0].id)
+
+        assert repo.blocking
+        assert asyncio.run(scenario()).id == sheets[0].id
+        assert threading.get_ident() not in threads
+
+    def test_durable_save_async_is_committed_when_it_returns(self, tmp_path):
+        sync_repo = DurableSheetRepository(str(tmp_path))
+        repo = make_async_repository(sync_repo)
+        sheet = Sheet([{"name": "A", "type": "int"}])
+
+        async def scenario():
+            await repo.save(sheet)
+            sheet.set_value(sheet.cell_key("A", 1), 42)
+            await asyncio.gather(*(repo.save(sheet) for _ in range(5)))
+            return sync_repo._committed_seq, sync_repo._appended_seq
+
+        assert isinstance(repo, AsyncDurableSheetRepository)
+        committed, appended = asyncio.run(scenario())
+        assert committed == appended
+        sync_repo.close()
+
+        recovered = DurableSheetRepository(str(tmp_path))
+        assert recovered.get_by_id(sheet.id).get_resolved_value(sheet.cell_key("A", 1)) == 42
+        recovered.close()
+
+
+class TestBoundedSheetRepository:
+    def _create_sheet(self, repo, value):
+        sheet = Sheet([{"name": "A", "type": "int"}, {"name": "B", "type": "int"}])
+        repo.save(sheet)
+        service = CellService(repo)
+        service.set_cell_value(sheet.id, "A", 1, value)
+        service.set_cell_value(sheet.id, "B", 1, "lookup(A,1)")
+        return sheet.id
+
+    def test_least_recently_used_sheets_are_spilled_and_reloaded(self, tmp_path):
+        repo = BoundedSheetRepository(str(tmp_path), max_sheets=2)
+        first, second, third = (self._create_sheet(repo, value) for value in (1, 2, 3))
+
+        assert repo.evictions == 1
+        assert os.listdir(tmp_path) == [f"{first}.sheet"]
+        assert repo.exists(first)
+        assert sorted(repo.get_all_ids()) == sorted([first, second, third])
+
+        reloaded = repo.get_by_id(first)
+        assert reloaded.get_resolved_value(reloaded.cell_key("B", 1)) == 1
+        assert repo.misses == 1
+        assert repo.evictions == 2
+        assert repo.stats()["sheets_in_memory"] == 2
+
+        # the reloaded sheet keeps its lookup graph
+        CellService(repo).set_cell_value(first, "A", 1, 10)
+        assert reloaded.get_resolved_value(reloaded.cell_key("B", 1)) == 10
+
+    def test_sheets_in_use_are_not_spilled(self, tmp_path):
+        locks = SheetLocks()
+        repo = BoundedSheetRepository(str(tmp_path), max_sheets=1, sheet_locks=locks)
+        first = Sheet([{"name": "A", "type": "int"}])
+        repo.save(first)
+
+        with locks.read(first.id):
+            second = Sheet([{"name": "A", "type": "int"}])
+            repo.save(second)
+            assert repo.evictions == 0
+            assert repo.stats()["sheets_in_memory"] == 2
+
+        repo.save(Sheet([{"name": "A", "type": "int"}]))
+        assert repo.evictions == 2
+        assert sorted(os.listdir(tmp_path)) == sorted([f"{first.id}.sheet", f"{second.id}.sheet"])
+
+    def test_concurrent_writers_never_lose_writes_to_eviction(self, tmp_path, monkeypatch):
+        errors = []
+        monkeypatch.setattr(threading, "excepthook", lambda args: errors.append(args.exc_value))
+        repo = BoundedSheetRepository(str(tmp_path), max_sheets=1)
+        sheet_ids = [self._create_sheet(repo, 0) for _ in range(4)]
+
+        def write(sheet_id):
+            service = CellService(repo)
+            for row in range(1, 201):
+                service.set_cell_values(sheet_id, [("A", row, row), ("B", row + 1, f"lookup(A,{row})")] +
+                                        [("A", row * 1000 + offset, offset) for offset in range(50)])
+
+        threads = [threading.Thread(target=write, args=(sheet_id,)) for sheet_id in sheet_ids]
+        switch_interval = sys.getswitchinterval()
+        # switch threads often, so evictions overlap writes
+        sys.setswitchinterval(1e-6)
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            sys.setswitchinterval(switch_interval)
+
+        assert errors == []
+        for sheet_id in sheet_ids:
+            sheet = repo.get_by_id(sheet_id)
+            assert [sheet.get_resolved_value(sheet.cell_key("B", row + 1)) for row in range(1, 201)] == list(range(1, 201))
+
+    def test_hits_move_sheet_to_most_recently_used(self, tmp_path):
+        repo = BoundedSheetRepository(str(tmp_path), max_sheets=2)
+        first = self._create_sheet(repo, 1)
+        second = self._create_sheet(repo, 2)
+        hits_before = repo.hits
+
+        repo.get_by_id(first)
+        assert repo.hits == hits_before + 1
+        self._create_sheet(repo, 3)
+
+        assert repo.stats()["sheets_spilled"] == 1
+        assert os.listdir(tmp_path) == [f"{second}.sheet"]
+
+    def test_max_bytes_bounds_memory(self, tmp_path):
+        repo = BoundedSheetRepository(str(tmp_path), max_bytes=20000)
+        sheet_ids = [self._create_sheet(repo, value) for value in range(10)]
+
+        assert repo.stats()["bytes_in_memory"] <= 20000
+        assert repo.evictions > 0
+        for value, sheet_id in enumerate(sheet_ids):
+            sheet = repo.get_by_id(sheet_id)
+            assert sheet.get_resolved_value(sheet.cell_key("B", 1)) == value
+
+    def test_delete_removes_spilled_sheet(self, tmp_path):
+        repo = BoundedSheetRepository(str(tmp_path), max_sheets=1)
+        first = self._create_sheet(repo, 1)
+        self._create_sheet(repo, 2)
+
+        assert repo.delete(first)
+        assert not repo.exists(first)
+        assert repo.get_by_id(first) is None
+        assert os.listdir(tmp_path) == []
+
+
+class TestSheetFile:
+    def test_round_trip_keeps_cells_and_lookup_graph(self, tmp_path):
+        repo = SheetRepository()
+        sheet = Sheet([
+            {"name": "A", "type": "int"}, {"name": "B", "type": "string"},
+            {"name": "C", "type": "double"}, {"name": "D", "type": "boolean"}
+        ])
+        repo.save(sheet)
+        service = CellService(repo)
+        service.set_cell_value(sheet.id, "A", 1, 2 ** 70)
+        service.set_cell_value(sheet.id, "A", 5000, -3)
+        service.set_cell_value(sheet.id, "A", 2, "lookup(A,5000)")
+        service.set_cell_value(sheet.id, "B", 1, "héllo")
+        service.set_cell_value(sheet.id, "B", 2, "")
+        service.set_cell_value(sheet.id, "C", 1, 1.5)
+        service.set_cell_value(sheet.id, "D", 1, False)
+        path = str(tmp_path / "sheet.sheet")
+
+        write_sheet_file(sheet, path)
+        loaded = open_sheet_file(path)
+
+        assert loaded.id == sheet.id
+        assert loaded.columns == sheet.columns
+        assert list(loaded.iter_cells()) == list(sheet.iter_cells())
+        assert loaded.dependents == sheet.dependents
+        assert loaded.topological_order == sheet.topological_order
+
+    def test_untouched_columns_are_copied_when_rewritten(self, tmp_path):
+        sheet = Sheet([{"name": "A", "type": "int"}, {"name": "B", "type": "string"}])
+        sheet.set_value(sheet.cell_key("A", 1), 1)
+        sheet.set_value(sheet.cell_key("B", 1), "b")
+        write_sheet_file(sheet, str(tmp_path / "first.sheet"))
+
+        loaded = open_sheet_file(str(tmp_path / "first.sheet"))
+        loaded.set_value(loaded.cell_key("A", 2), 2)
+        write_sheet_file(loaded, str(tmp_path / "second.sheet"))
+
+        assert dict.__len__(loaded.column_stores) == 1
+        rewritten = open_sheet_file(str(tmp_path / "second.sheet"))
+        assert list(rewritten.iter_cells()) == [("A", 1, 1), ("A", 2, 2), ("B", 1, "b")]
@@ -1,6 +1,7 @@
 import pytest
 from pydantic import ValidationError
 from Schemas.sheet_schemas import ColumnRequest, CreateSheetRequest
+from Schemas.cell_schemas import SetColumnRequest
 
 
 class TestColumnRequest:
@@ -45,4 +46,11 @@ class TestCreateSheetRequest:
         }
         with pytest.raises(ValidationError) as exc_info:
             CreateSheetRequest(**request_data)
-        assert "invalid_type" in str(exc_info.value)
\ No newline at end of file
+        assert "invalid_type" in str(exc_info.value)
+
+
+class TestSetColumnRequest:
+    def test_start_row_defaults_to_one_and_must_be_positive(self):
+        assert SetColumnRequest(values=[1, None]).start_row == 1
+        with pytest.raises(ValidationError):
+            SetColumnRequest(start_row=0, values=[1])
@@ -0,0 +1,46 @@
+import json
+import pytest
+import serialization
+from serialization import ResponseCache
+
+
+@pytest.fixture(params=["orjson", "json"])
+def encoder(request, monkeypatch):
+    if request.param == "json":
+        monkeypatch.setattr(serialization, "orjson", None)
+    elif serialization.orjson is None:
+        pytest.skip("orjson is not installed")
+    return serialization.dumps
+
+
+class TestDumps:
+    def test_writes_compact_utf8_json(self, encoder):
+        payload = {"sheet_id": "s", "cells": [{"column": "A", "row": 1, "value": "é"}, {"column": "B", "row": 2, "value": 1.5}]}
+
+        assert encoder(payload) == '{"sheet_id":"s","cells":[{"column":"A","row":1,"value":"é"},{"column":"B","row":2,"value":1.5}]}'.encode()
+
+    def test_non_finite_floats_become_null(self, encoder):
+        assert encoder([float("nan"), float("inf"), -float("inf"), 2.0]) == b"[null,null,null,2.0]"
+
+    def test_ints_beyond_64_bits_are_kept(self, encoder):
+        assert json.loads(encoder({"value": 2 ** 70})) == {"value": 2 ** 70}
+
+
+class TestResponseCache:
+    def test_hits_only_for_the_cached_tag(self):
+        cache = ResponseCache()
+        cache.put("sheet", "v1", b"body")
+
+        assert cache.get("sheet", "v1") == b"body"
+        assert cache.get("sheet", "v2") is None
+        assert cache.stats() == {"hits": 1, "misses": 1, "entries": 1, "bytes": 4}
+
+    def test_evicts_least_recently_used_bodies_past_max_bytes(self):
+        cache = ResponseCache(max_bytes=10)
+        cache.put("a", "v", b"1234")
+        cache.put("b", "v", b"1234")
+        cache.get("a", "v")
+        cache.put("c", "v", b"1234")
+        cache.put("d", "v", b"x" * 11)
+
+        assert [cache.get(key, "v") for key in "abcd"] == [b"1234", None, b"1234", None]
@@ -0,0 +1,94 @@
+import asyncio
+import pytest
+from sharding import ConsistentHashRing, ShardClient, ShardedCellService, ShardedSheetService, start_shards
+from exceptions import NotFoundError, ValidationError
+
+
+@pytest.fixture(scope="module")
+def shard_client(tmp_path_factory):
+    socket_dir = str(tmp_path_factory.mktemp("shards"))
+    processes = start_shards(socket_dir, 2, b"test-key")
+    client = ShardClient(socket_dir, 2, b"test-key")
+    yield client
+    client.close()
+    for process in processes:
+        process.terminate()
+        process.join()
+
+
+class TestConsistentHashRing:
+    def test_keys_spread_over_all_nodes(self):
+        ring = ConsistentHashRing([0, 1, 2, 3])
+        counts = {node: 0 for node in range(4)}
+        for key in range(4000):
+            counts[ring.node_for(f"sheet-{key}")] += 1
+
+        assert all(count > 600 for count in counts.values())
+
+    def test_adding_a_node_only_moves_its_share_of_keys(self):
+        before = ConsistentHashRing([0, 1, 2, 3])
+        after = ConsistentHashRing([0, 1, 2, 3, 4])
+        keys = [f"sheet-{key}" for key in range(4000)]
+
+        moved = [key for key in keys if before.node_for(key) != after.node_for(key)]
+
+        assert all(after.node_for(key) == 4 for key in moved)
+        assert len(moved) < 4000 * 0.35
+
+
+class TestShardedServices:
+    def test_sheets_are_created_and_read_on_their_owning_shard(self, shard_client):
+        sheet_service = ShardedSheetService(shard_client)
+        cell_service = ShardedCellService(shard_client)
+
+        async def scenario():
+            sheet_ids = [await sheet_service.create_sheet([{"name": "A", "type": "int"}, {"name": "B", "type": "int"}])
+                         for _ in range(6)]
+            for value, sheet_id in enumerate(sheet_ids):
+                await cell_service.set_cell_value(sheet_id, "A", 1, value)
+                await cell_service.set_cell_values(sheet_id, [("B", 1, "lookup(A,1)")])
+            return sheet_ids, [await sheet_service.get_sheet_by_id(sheet_id) for sheet_id in sheet_ids]
+
+        sheet_ids, responses = asyncio.run(scenario())
+
+        assert len({shard_client.shard_for(sheet_id) for sheet_id in sheet_ids}) == 2
+        for value, response in enumerate(responses):
+            assert [(cell.column, cell.row, cell.value) for cell in response.cells] == [("A", 1, value), ("B", 1, value)]
+
+    def test_service_errors_are_raised_in_the_front_end(self, shard_client):
+        sheet_service = ShardedSheetService(shard_client)
+        cell_service = ShardedCellService(shard_client)
+        sheet_id = asyncio.run(sheet_service.create_sheet([{"name": "A", "type": "int"}]))
+
+        with pytest.raises(NotFoundError):
+            asyncio.run(sheet_service.get_sheet_by_id("missing-id"))
+        with pytest.raises(ValidationError):
+            asyncio.run(cell_service.set_cell_value(sheet_id, "A", 1, "not an int"))
+
+    def test_stream_sheet_pages_through_the_shard(self, shard_client):
+        sheet_service = ShardedSheetService(shard_client)
+
+        async def scenario():
+            sheet_id = await sheet_service.create_sheet([{"name": "A", "type": "int"}])
+            await ShardedCellService(shard_client).set_cell_values(sheet_id, [("A", row, row) for row in range(1, 2501)])
+            return b"".join([chunk async for chunk in await sheet_service.stream_sheet(sheet_id)])
+
+        lines = asyncio.run(scenario()).decode().splitlines()
+
+        assert len(lines) == 2501
+        assert lines[-1] == '{"column":"A","row":2500,"value":2500}'
+
+    def test_csv_import_and_export_run_on_the_shard(self, shard_client):
+        sheet_service = ShardedSheetService(shard_client)
+
+        async def scenario():
+            sheet_id = await sheet_service.create_sheet([{"name": "A", "type": "int"}])
+
+            async def body():
+                yield b"A\n1\n"
+                yield b"2\n"
+
+            message = await ShardedCellService(shard_client).import_csv(sheet_id, body(), start_row=3)
+            return message, b"".join([chunk async for chunk in await sheet_service.export_csv(sheet_id, start_row=3)])
+
+        assert asyncio.run(scenario()) == ("2 cell values imported successfully", b"A\n1\n2\n")
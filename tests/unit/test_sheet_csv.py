@@ -0,0 +1,96 @@
+import pytest
+from array import array
+from Models.sheet import ColumnType, Sheet
+from exceptions import NotFoundError, ValidationError
+from sheet_csv import CsvImport, csv_text, format_value, format_values
+
+
+def make_sheet():
+    return Sheet([{"name": "A", "type": "int"}, {"name": "B", "type": "string"}, {"name": "C", "type": "boolean"}])
+
+
+def parse(body: bytes, chunk_size: int = None, start_row: int = 1) -> CsvImport:
+    parsed = CsvImport(make_sheet(), start_row)
+    chunk_size = chunk_size or len(body) or 1
+    for offset in range(0, len(body), chunk_size):
+        parsed.feed(body[offset:offset + chunk_size])
+    parsed.close()
+    return parsed
+
+
+class TestCsvImport:
+    @pytest.mark.parametrize("chunk_size", [None, 1, 5])
+    def test_chunks_split_anywhere_parse_the_same(self, chunk_size):
+        body = 'B,A\n"x, ""y""\nz",1\nw,2\n'.encode()
+
+        parsed = parse(body, chunk_size)
+
+        assert parsed.runs == {0: [(1, array("q", [1, 2]))], 1: [(1, ['x, "y"\nz', "w"])]}
+        assert parsed.cells == 4
+        assert parsed.next_row == 3
+
+    def test_empty_fields_split_runs_and_formulas_are_set_aside(self):
+        parsed = parse(b'A,B,C\n1,a,true\n,"lookup(A,1)",FALSE\n3,b,\n', start_row=10)
+
+        assert parsed.runs[0] == [(10, array("q", [1])), (12, array("q", [3]))]
+        assert parsed.runs[1] == [(10, ["a"]), (12, ["b"])]
+        assert parsed.runs[2] == [(10, array("b", [1, 0]))]
+        assert parsed.formulas == [(1, 11, "lookup(A,1)")]
+        assert parsed.cells == 7
+
+    def test_quoted_empty_field_is_an_empty_string(self):
+        parsed = parse(b'B,A\n"",1\nx,2\n,3\n"a,""""",4\n"",5\n')
+
+        assert parsed.runs[1] == [(1, ["", "x"]), (4, ['a,""', ""])]
+
+    def test_quoted_empty_field_spanning_records_is_an_empty_string(self):
+        parsed = parse(b'B,A\n"x\ny",1\n"",2\n')
+
+        assert parsed.runs[1] == [(1, ["x\ny", ""])]
+
+    @pytest.mark.parametrize("rest", [b"x,2\n", b'"x\ry",2\n', b"x,2\r\n"])
+    def test_carriage_return_in_quoted_field_is_kept(self, rest):
+        parsed = parse(b'B,A\n"a\r\nb",1\n' + rest)
+
+        assert parsed.runs[1] == [(1, ["a\r\nb", rest.split(b",")[0].strip(b'"').decode()])]
+
+    def test_carriage_returns_and_byte_order_mark_are_accepted(self):
+        parsed = parse("﻿A,B\r\n1,a\r\n2,b".encode())
+
+        assert parsed.runs == {0: [(1, array("q", [1, 2]))], 1: [(1, ["a", "b"])]}
+
+    def test_ints_beyond_64_bits_stay_a_list(self):
+        parsed = parse(f"A\n{2 ** 70}\n".encode())
+
+        assert parsed.runs == {0: [(1, [2 ** 70])]}
+
+    def test_type_mismatch_names_the_cell(self):
+        with pytest.raises(ValidationError) as exc_info:
+            parse(b"B,A\nx,1\ny,two\n", start_row=4)
+
+        assert "A5" in str(exc_info.value)
+
+    @pytest.mark.parametrize("body, error", [
+        (b"Z\n1\n", NotFoundError),
+        (b"A,A\n1,2\n", ValidationError),
+        (b"", ValidationError),
+        (b"A,B\n1\n", ValidationError),
+        (b"A,B\n1,2,3\n4\n", ValidationError),
+        (b'A,B\n1,"x",3\n4\n', ValidationError),
+        (b'A\n"1\n', ValidationError),
+        (b"A\n\xff\n", ValidationError),
+    ])
+    def test_bad_bodies_are_rejected(self, body, error):
+        with pytest.raises(error):
+            parse(body)
+
+
+class TestFormat:
+    def test_values_format_as_import_reads_them(self):
+        assert [csv_text(format_value(value)) for value in (None, "", True, False, 3, 1.5, "x")] == [
+            "", '""', "true", "false", "3", "1.5", "x"
+        ]
+        assert [csv_text(field) for field in format_values(ColumnType.STRING, ["", "y"])] == ['""', "y"]
+        assert csv_text(format_value("a\rb")) == csv_text(format_values(ColumnType.STRING, ["a\rb"])[0]) == "a\rb"
+        assert format_values(ColumnType.BOOLEAN, array("b", [1, 0])) == ["true", "false"]
+        assert format_values(ColumnType.DOUBLE, array("d", [0.25])) == ["0.25"]
@@ -1,8 +1,18 @@
+import asyncio
 import pytest
 from unittest.mock import Mock
+from Services import sheet_service
 from Services.sheet_service import SheetService
-from Models.sheet import Sheet
-from exceptions import NotFoundError
+from Services.cell_service import CellService
+from Services.async_sheet_service import AsyncSheetService, OFFLOAD_MIN_CELLS
+from Services.async_cell_service import AsyncCellService
+import subscriptions
+from subscriptions import ChangeFeeds
+from Repository.sheet_repository import SheetRepository
+from Repository.async_sheet_repository import make_async_repository
+from Models.sheet import Cell, Sheet
+import json
+from exceptions import NotFoundError, ValidationError
 
 
 class TestSheetService:
@@ -36,7 +46,7 @@ class TestSheetService:
         mock_sheet = Mock()
         mock_sheet.id = "test-id"
         mock_sheet.columns = [{"name": "A", "type": "string"}]
-        mock_sheet.cells = {}
+        mock_sheet.iter_cells.return_value = iter([])
         mock_repo.get_by_id.return_value = mock_sheet
         
         service = SheetService(mock_repo)
@@ -47,3 +57,341 @@ class TestSheetService:
         assert response.columns[0].name == "A"
         assert response.columns[0].type == "string"
         assert response.cells == []
+
+    def _sheet_with_rows(self, rows):
+        sheet = Sheet([{"name": "A", "type": "int"}, {"name": "B", "type": "string"}])
+        for row in range(1, rows + 1):
+            sheet.set_value(sheet.cell_key("A", row), row)
+        sheet.set_value(sheet.cell_key("B", 1), "x")
+        return sheet
+
+    def test_get_sheet_page_walks_all_cells_with_cursor(self):
+        mock_repo = Mock()
+        sheet = self._sheet_with_rows(5)
+        mock_repo.get_by_id.return_value = sheet
+        service = SheetService(mock_repo)
+
+        seen = []
+        cursor = None
+        while True:
+            page = service.get_sheet_page(sheet.id, cursor=cursor, limit=2)
+            assert len(page.cells) <= 2
+            seen.extend((cell.column, cell.row, cell.value) for cell in page.cells)
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+
+        assert seen == [("A", 1, 1), ("A", 2, 2), ("A", 3, 3), ("A", 4, 4), ("A", 5, 5), ("B", 1, "x")]
+
+    def test_get_sheet_page_rejects_invalid_cursor(self):
+        mock_repo = Mock()
+        mock_repo.get_by_id.return_value = self._sheet_with_rows(1)
+        service = SheetService(mock_repo)
+
+        with pytest.raises(ValidationError):
+            service.get_sheet_page("test-id", cursor="not-a-cursor")
+
+    def test_query_sheet_returns_only_requested_columns_and_rows(self):
+        mock_repo = Mock()
+        sheet = self._sheet_with_rows(300)
+        mock_repo.get_by_id.return_value = sheet
+        service = SheetService(mock_repo)
+
+        response = service.query_sheet(sheet.id, columns=["A"], start_row=100, end_row=102)
+
+        assert [col.name for col in response.columns] == ["A"]
+        assert [(cell.column, cell.row, cell.value) for cell in response.cells] == [
+            ("A", 100, 100), ("A", 101, 101), ("A", 102, 102)
+        ]
+
+    def test_query_sheet_rejects_unknown_column_and_empty_range(self):
+        mock_repo = Mock()
+        mock_repo.get_by_id.return_value = self._sheet_with_rows(1)
+        service = SheetService(mock_repo)
+
+        with pytest.raises(NotFoundError):
+            service.query_sheet("test-id", columns=["Z"])
+        with pytest.raises(ValidationError):
+            service.query_sheet("test-id", start_row=5, end_row=4)
+
+    def test_export_csv_writes_lookups_as_written_or_resolved(self):
+        repo = SheetRepository()
+        sheet = Sheet([{"name": "A", "type": "int"}, {"name": "B", "type": "string"}, {"name": "C", "type": "boolean"}])
+        repo.save(sheet)
+        CellService(repo).set_cell_values(sheet.id, [
+            ("A", 1, 7), ("B", 1, 'x, "y"'), ("C", 1, True), ("A", 3, "lookup(A,1)"), ("C", 3, False)
+        ])
+        service = SheetService(repo)
+
+        assert b"".join(service.export_csv(sheet.id)) == b'A,B,C\n7,"x, ""y""",true\n,,\n"lookup(A,1)",,false\n'
+        assert b"".join(service.export_csv(sheet.id, start_row=2, resolved=True)) == b"A,B,C\n,,\n7,,false\n"
+        with pytest.raises(ValidationError):
+            list(service.export_csv(sheet.id, start_row=3, end_row=2))
+
+    @pytest.mark.parametrize("columns", [["A"], ["A", "B"]])
+    def test_export_csv_keeps_empty_strings_apart_from_empty_cells(self, columns):
+        repo = SheetRepository()
+        source = Sheet([{"name": name, "type": "string"} for name in columns])
+        repo.save(source)
+        CellService(repo).set_cell_values(source.id, [("A", 1, ""), ("A", 3, "x"), ("A", 4, '""')])
+        body = b"".join(SheetService(repo).export_csv(source.id))
+
+        copy = Sheet([{"name": name, "type": "string"} for name in columns])
+        repo.save(copy)
+        CellService(repo).import_csv(copy.id, [body])
+
+        assert body.splitlines()[1:3] == [b'""' + b"," * (len(columns) - 1), b"," * (len(columns) - 1)]
+        assert list(copy.cells.items()) == list(source.cells.items())
+
+    @pytest.mark.parametrize("others", [["x"], ["x\ry"]])
+    def test_export_csv_round_trips_carriage_returns_in_strings(self, others):
+        repo = SheetRepository()
+        columns = [{"name": "A", "type": "string"}, {"name": "B", "type": "int"}]
+        source = Sheet(columns)
+        repo.save(source)
+        values = ["a\r\nb", *others]
+        CellService(repo).set_cell_values(source.id, [("A", row, value) for row, value in enumerate(values, 1)])
+        body = b"".join(SheetService(repo).export_csv(source.id))
+
+        copy = Sheet(columns)
+        repo.save(copy)
+        CellService(repo).import_csv(copy.id, [body])
+
+        assert [copy.get_cell(copy.cell_key("A", row)).value for row in range(1, len(values) + 1)] == values
+
+    def test_export_csv_round_trips_through_import_in_chunks(self, monkeypatch):
+        monkeypatch.setattr(sheet_service, "EXPORT_CHUNK_ROWS", 100)
+        repo = SheetRepository()
+        columns = [{"name": "A", "type": "int"}, {"name": "B", "type": "double"}]
+        source = Sheet(columns)
+        for row in range(1, 251):
+            source.set_value(source.cell_key("A", row), row)
+        for row in range(1, 251, 3):
+            source.set_value(source.cell_key("B", row), row / 8)
+        repo.save(source)
+        service = SheetService(repo)
+        chunks = list(service.export_csv(source.id))
+
+        copy = Sheet(columns)
+        repo.save(copy)
+        CellService(repo).import_csv(copy.id, chunks)
+
+        assert len(chunks) == 3
+        assert list(copy.cells.items()) == list(source.cells.items())
+
+    def test_json_reads_match_the_response_models(self):
+        mock_repo = Mock()
+        sheet = Sheet([{"name": "A", "type": "int"}, {"name": "B", "type": "double"},
+                       {"name": "C", "type": "string"}, {"name": "D", "type": "boolean"}])
+        for row in range(1, 2500):
+            sheet.set_value(sheet.cell_key("A", row), row)
+        sheet.set_value(sheet.cell_key("A", 3000), 2 ** 70)
+        for row, value in enumerate([0.5, 3, float("nan"), float("inf")], start=1):
+            sheet.set_value(sheet.cell_key("B", row), value)
+        sheet.set_value(sheet.cell_key("C", 1), "héllo \"quoted\"")
+        sheet.set_lookup_cell(sheet.cell_key("C", 2), Cell(value="lookup(A,1)", lookup_key=sheet.cell_key("A", 1), resolved_value=1))
+        sheet.set_value(sheet.cell_key("D", 7), True)
+        mock_repo.get_by_id.return_value = sheet
+        service = SheetService(mock_repo)
+
+        assert service.get_sheet_json(sheet.id) == service.get_sheet_by_id(sheet.id).model_dump_json().encode()
+        assert service.get_sheet_page_json(sheet.id, cursor=str(sheet.cell_key("A", 2499)), limit=5) == \
+            service.get_sheet_page(sheet.id, cursor=str(sheet.cell_key("A", 2499)), limit=5).model_dump_json().encode()
+        for columns, start_row, end_row in [(None, 1, 3000), (["D", "B"], 2, 7), (["C"], 10, 20)]:
+            assert service.query_sheet_json(sheet.id, columns, start_row, end_row) == \
+                service.query_sheet(sheet.id, columns, start_row, end_row).model_dump_json().encode()
+
+    def test_get_sheet_json_if_changed_caches_per_version(self):
+        mock_repo = Mock()
+        sheet = self._sheet_with_rows(3)
+        mock_repo.get_by_id.return_value = sheet
+        service = SheetService(mock_repo)
+
+        etag, body = service.get_sheet_json_if_changed(sheet.id)
+        assert service.get_sheet_json_if_changed(sheet.id, etag) == (etag, None)
+        assert service.get_sheet_json_if_changed(sheet.id, f'W/"other", W/{etag}') == (etag, None)
+        assert service.get_sheet_json_if_changed(sheet.id, '"other"') == (etag, body)
+        assert service.response_cache.stats()["hits"] == 1
+
+        sheet.set_value(sheet.cell_key("A", 1), 100)
+        new_etag, new_body = service.get_sheet_json_if_changed(sheet.id, etag)
+        assert new_etag != etag
+        assert json.loads(new_body)["cells"][0] == {"column": "A", "row": 1, "value": 100}
+
+    def test_get_sheet_changes_json_returns_changed_cells_or_a_snapshot(self):
+        mock_repo = Mock()
+        sheet = self._sheet_with_rows(3)
+        mock_repo.get_by_id.return_value = sheet
+        service = SheetService(mock_repo)
+
+        snapshot = json.loads(service.get_sheet_changes_json(sheet.id))
+        assert snapshot["snapshot"] is True and len(snapshot["cells"]) == 4
+
+        sheet.set_value(sheet.cell_key("A", 2), 20)
+        sheet.remove_cell(sheet.cell_key("B", 1))
+        delta = json.loads(service.get_sheet_changes_json(sheet.id, since=snapshot["version"]))
+        assert delta["snapshot"] is False
+        assert delta["cells"] == [{"column": "A", "row": 2, "value": 20}, {"column": "B", "row": 1, "value": None}]
+
+        etag, _ = service.get_sheet_json_if_changed(sheet.id)
+        assert json.loads(service.get_sheet_changes_json(sheet.id, since=etag))["cells"] == []
+        other_copy = f"{'0' * 32}-{sheet.version}"
+        assert json.loads(service.get_sheet_changes_json(sheet.id, since=other_copy))["snapshot"] is True
+        with pytest.raises(ValidationError):
+            service.get_sheet_changes_json(sheet.id, since="not-a-version")
+
+    def test_get_cell_dependents_json_follows_lookups_to_unwritten_cells(self):
+        mock_repo = Mock()
+        sheet = Sheet([{"name": "A", "type": "int"}, {"name": "B", "type": "int"}])
+        mock_repo.get_by_id.return_value = sheet
+        CellService(mock_repo).set_cell_values(sheet.id, [
+            ("B", 2, "lookup(A,1)"), ("B", 1, "lookup(A,1)"), ("A", 3, "lookup(B,2)"), ("B", 3, "lookup(A,3)")
+        ])
+        service = SheetService(mock_repo)
+
+        direct = json.loads(service.get_cell_dependents_json(sheet.id, "A", 1))
+        transitive = json.loads(service.get_cell_dependents_json(sheet.id, "A", 1, transitive=True))
+
+        assert direct == {"sheet_id": sheet.id, "column": "A", "row": 1, "transitive": False,
+                          "dependents": [{"column": "B", "row": 1}, {"column": "B", "row": 2}]}
+        assert transitive["dependents"] == [{"column": "A", "row": 3}, {"column": "B", "row": 1},
+                                            {"column": "B", "row": 2}, {"column": "B", "row": 3}]
+        assert json.loads(service.get_cell_dependents_json(sheet.id, "B", 3))["dependents"] == []
+        with pytest.raises(NotFoundError):
+            service.get_cell_dependents_json(sheet.id, "Z", 1)
+        with pytest.raises(ValidationError):
+            service.get_cell_dependents_json(sheet.id, "A", 0)
+
+    def test_stream_sheet_yields_header_then_cells_as_ndjson(self):
+        mock_repo = Mock()
+        sheet = self._sheet_with_rows(3)
+        mock_repo.get_by_id.return_value = sheet
+        service = SheetService(mock_repo)
+
+        lines = b"".join(service.stream_sheet(sheet.id)).decode().splitlines()
+        header = json.loads(lines[0])
+
+        assert header["sheet_id"] == sheet.id
+        assert [col["name"] for col in header["columns"]] == ["A", "B"]
+        assert [json.loads(line) for line in lines[1:]] == [
+            {"column": "A", "row": 1, "value": 1},
+            {"column": "A", "row": 2, "value": 2},
+            {"column": "A", "row": 3, "value": 3},
+            {"column": "B", "row": 1, "value": "x"},
+        ]
+
+    def test_stream_sheet_writes_non_finite_doubles_as_null(self):
+        repo = SheetRepository()
+        sheet = Sheet([{"name": "A", "type": "double"}])
+        for row, value in enumerate([float("nan"), float("inf"), -float("inf"), 1.5], 1):
+            sheet.set_value(sheet.cell_key("A", row), value)
+        repo.save(sheet)
+
+        lines = b"".join(SheetService(repo).stream_sheet(sheet.id)).decode().splitlines()
+
+        assert [json.loads(line, parse_constant=pytest.fail)["value"] for line in lines[1:]] == [None, None, None, 1.5]
+
+    def test_stream_sheet_raises_not_found_before_streaming(self):
+        mock_repo = Mock()
+        mock_repo.get_by_id.return_value = None
+        service = SheetService(mock_repo)
+
+        with pytest.raises(NotFoundError):
+            service.stream_sheet("missing-id")
+
+
+class TestAsyncSheetService:
+    def _service_with_sheet(self, rows):
+        repo = SheetRepository()
+        sheet = Sheet([{"name": "A", "type": "int"}])
+        for row in range(1, rows + 1):
+            sheet.set_value(sheet.cell_key("A", row), row)
+        repo.save(sheet)
+        return AsyncSheetService(make_async_repository(repo)), sheet
+
+    def test_small_and_large_reads_return_the_same_cells(self):
+        small_service, small_sheet = self._service_with_sheet(3)
+        large_service, large_sheet = self._service_with_sheet(OFFLOAD_MIN_CELLS + 1)
+
+        small = asyncio.run(small_service.get_sheet_by_id(small_sheet.id))
+        large = asyncio.run(large_service.get_sheet_by_id(large_sheet.id))
+        page = asyncio.run(large_service.get_sheet_page(large_sheet.id, limit=OFFLOAD_MIN_CELLS))
+        query = asyncio.run(large_service.query_sheet(large_sheet.id, start_row=10, end_row=12))
+
+        assert [cell.value for cell in small.cells] == [1, 2, 3]
+        assert [cell.value for cell in large.cells] == list(range(1, OFFLOAD_MIN_CELLS + 2))
+        assert len(page.cells) == OFFLOAD_MIN_CELLS and page.next_cursor is not None
+        assert [cell.value for cell in query.cells] == [10, 11, 12]
+
+    def test_get_sheet_json_if_changed_answers_from_the_cache(self):
+        service, sheet = self._service_with_sheet(OFFLOAD_MIN_CELLS + 1)
+
+        etag, body = asyncio.run(service.get_sheet_json_if_changed(sheet.id))
+
+        assert asyncio.run(service.get_sheet_json_if_changed(sheet.id, etag)) == (etag, None)
+        assert asyncio.run(service.get_sheet_json(sheet.id)) is body
+
+    def test_subscribe_sends_a_snapshot_then_coalesced_updates(self, monkeypatch):
+        monkeypatch.setattr(subscriptions, "MAX_PENDING_CELLS", 3)
+        repo = make_async_repository(SheetRepository())
+        feeds = ChangeFeeds()
+        service = AsyncSheetService(repo, change_feeds=feeds)
+        cell_service = AsyncCellService(repo, change_feeds=feeds)
+
+        def event(chunk):
+            fields = dict(line.split(": ", 1) for line in chunk.decode().strip().split("\n"))
+            return fields["event"], json.loads(fields["data"])
+
+        async def scenario():
+            sheet_id = await service.create_sheet([{"name": "A", "type": "int"}, {"name": "B", "type": "int"}])
+            await cell_service.set_cell_value(sheet_id, "A", 1, 1)
+            events = await service.subscribe(sheet_id, columns=["B"], start_row=1, end_row=10)
+            received = [event(await events.__anext__())]
+
+            await cell_service.set_cell_value(sheet_id, "B", 1, "lookup(A,1)")
+            await cell_service.set_cell_value(sheet_id, "A", 1, 2)
+            await cell_service.set_cell_value(sheet_id, "A", 2, 3)
+            received.append(event(await events.__anext__()))
+
+            await cell_service.set_cell_values(sheet_id, [("B", row, row) for row in range(2, 7)])
+            received.append(event(await events.__anext__()))
+            await events.aclose()
+            return received, feeds._feeds
+
+        (snapshot, update, resync), feeds_left = asyncio.run(scenario())
+
+        assert snapshot[0] == "snapshot" and snapshot[1]["cells"] == []
+        assert update == ("update", {"version": update[1]["version"], "cells": [{"column": "B", "row": 1, "value": 2}]})
+        assert resync[0] == "snapshot" and [cell["row"] for cell in resync[1]["cells"]] == [1, 2, 3, 4, 5, 6]
+        assert feeds_left == {}
+
+    def test_json_reads_offload_large_sheets(self):
+        service, sheet = self._service_with_sheet(OFFLOAD_MIN_CELLS + 1)
+
+        body = json.loads(asyncio.run(service.get_sheet_json(sheet.id)))
+        page = json.loads(asyncio.run(service.get_sheet_page_json(sheet.id, limit=2)))
+        query = json.loads(asyncio.run(service.query_sheet_json(sheet.id, start_row=10, end_row=12)))
+
+        assert [cell["value"] for cell in body["cells"]] == list(range(1, OFFLOAD_MIN_CELLS + 2))
+        assert [cell["row"] for cell in page["cells"]] == [1, 2] and page["next_cursor"] is not None
+        assert [cell["value"] for cell in query["cells"]] == [10, 11, 12]
+
+    def test_create_sheet_and_stream(self):
+        service = AsyncSheetService(make_async_repository(SheetRepository()))
+
+        async def scenario():
+            sheet_id = await service.create_sheet([{"name": "A", "type": "int"}])
+            return sheet_id, [chunk async for chunk in await service.stream_sheet(sheet_id)]
+
+        sheet_id, chunks = asyncio.run(scenario())
+
+        assert json.loads(chunks[0])["sheet_id"] == sheet_id
+        assert len(chunks) == 1
+
+    def test_missing_sheet_raises_not_found(self):
+        service = AsyncSheetService(make_async_repository(SheetRepository()))
+
+        with pytest.raises(NotFoundError):
+            asyncio.run(service.get_sheet_by_id("missing-id"))
+        with pytest.raises(NotFoundError):
+            asyncio.run(service.stream_sheet("missing-id"))
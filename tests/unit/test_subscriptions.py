@@ -0,0 +1,101 @@
+import asyncio
+import json
+from unittest.mock import Mock
+from Models.sheet import Sheet
+from Services.cell_service import CellService
+from subscriptions import ChangeBatch, ChangeFeeds, Subscription
+
+
+def run(coroutine_function):
+    return asyncio.run(coroutine_function())
+
+
+def cells_of(update: bytes):
+    return json.loads(update.split(b"data: ", 1)[1])["cells"]
+
+
+class TestSubscription:
+    def test_changes_coalesce_per_cell_and_stay_in_the_window(self):
+        sheet = Sheet([{"name": "A", "type": "int"}, {"name": "B", "type": "int"}])
+        a1, a2, a9, b1 = (sheet.cell_key(column, row) for column, row in (("A", 1), ("A", 2), ("A", 9), ("B", 1)))
+
+        async def scenario():
+            subscription = Subscription({0}, 1, 5)
+            subscription.offer(ChangeBatch("v1", [(a1, {"value": 1}), (b1, {"value": 2}), (a9, {"value": 3})]))
+            subscription.offer(ChangeBatch("v2", [(a1, {"value": 5}), (a2, {"value": 4})]))
+            assert await subscription.wait(1)
+            return subscription.take()
+
+        resync, update = run(scenario)
+
+        assert resync is False
+        assert update.startswith(b"event: update\nid: v2\n")
+        assert cells_of(update) == [{"value": 5}, {"value": 4}]
+
+    def test_subscribers_that_keep_up_share_the_encoded_batch(self):
+        batch = ChangeBatch("v1", [(1, {"value": 1})])
+
+        async def scenario():
+            first, second = Subscription(None, 1, 10), Subscription(None, 1, 10)
+            first.offer(batch)
+            second.offer(batch)
+            return first.take()[1], second.take()[1]
+
+        first, second = run(scenario)
+
+        assert first is second is batch.event()
+
+    def test_too_many_pending_cells_turn_into_a_resync(self):
+        async def scenario():
+            subscription = Subscription(None, 1, 100, max_pending=2)
+            subscription.offer(ChangeBatch("v1", [(row, {"value": row}) for row in (1, 2)]))
+            subscription.offer(ChangeBatch("v2", [(3, {"value": 3})]))
+            subscription.offer(ChangeBatch("v3", [(4, {"value": 4})]))
+            assert await subscription.wait(1)
+            return subscription.take()
+
+        assert run(scenario) == (True, None)
+
+    def test_wait_times_out_without_changes(self):
+        async def scenario():
+            return await Subscription(None, 1, 1).wait(0.01)
+
+        assert run(scenario) is False
+
+
+class TestChangeFeeds:
+    def test_publish_fans_out_written_cells_and_their_lookup_dependents(self):
+        feeds = ChangeFeeds()
+        sheet = Sheet([{"name": "A", "type": "int"}, {"name": "B", "type": "int"}])
+        repository = Mock()
+        repository.get_by_id.return_value = sheet
+        service = CellService(repository, change_feeds=feeds)
+        service.set_cell_value(sheet.id, "B", 1, "lookup(A,1)")
+
+        async def scenario():
+            whole_sheet = Subscription(None, 1, 10)
+            column_b = Subscription({1}, 1, 10)
+            feeds.subscribe(sheet, whole_sheet)
+            feeds.subscribe(sheet, column_b)
+            service.set_cell_value(sheet.id, "A", 1, 7)
+            assert await column_b.wait(1)
+            feeds.unsubscribe(sheet.id, column_b)
+            service.set_cell_value(sheet.id, "A", 2, 8)
+            return whole_sheet.take()[1], column_b.take()[1]
+
+        whole_update, b_update = run(scenario)
+
+        assert f"id: {sheet.version_token}".encode() in whole_update
+        assert cells_of(whole_update) == [
+            {"column": "A", "row": 1, "value": 7}, {"column": "A", "row": 2, "value": 8}, {"column": "B", "row": 1, "value": 7}
+        ]
+        assert cells_of(b_update) == [{"column": "B", "row": 1, "value": 7}]
+
+    def test_publish_without_subscribers_does_nothing(self):
+        feeds = ChangeFeeds()
+        sheet = Sheet([{"name": "A", "type": "int"}])
+        sheet.set_value(sheet.cell_key("A", 1), 1)
+
+        feeds.publish(sheet)
+
+        assert feeds._feeds == {}